@@ -0,0 +1,341 @@
+import sys
+import os
+import math
+import time
+import random
+import argparse
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import game_utils
+import snake_main
+from batch_runner import DEATH_TIMEOUT, MAX_ROUNDS, parse_seeds
+from headless_display import HeadlessDisplay
+from replay import KEYS
+from snake_game import SnakeGame, GameSnapshot, SPAWN_LEGACY, SPAWN_MODES
+
+# seconds of search per move, rounds looked ahead
+BUDGET = 0.05
+HORIZON = 5
+EXPLORATION = 1.0
+# taken off the value of a future where the snake dies
+DEATH_PENALTY = 3.0
+# value of ending a future on an apple, halved one cell away, a third two cells away...
+APPROACH_BONUS = 1.0
+# rollouts press a random key (or nothing) every round, as batch_runner's random policy
+ROLLOUT_KEYS = KEYS[1:] + [None] * 4
+
+# (visits, total value) of every root action, by index in replay.KEYS
+RootStats = List[Tuple[int, float]]
+
+
+class Simulator:
+    """
+    A SnakeGame that snapshots are restored into and played forward,
+    one round per step as snake_main.play_round plays them, without drawing.
+    """
+
+    def __init__(self, width: int, height: int, spawn_mode: str = SPAWN_LEGACY) -> None:
+        # restore brings in the snake, walls, apples and generator state
+        self.rng = game_utils.GameRandom(0, width, height)
+        self.game = SnakeGame(width, height, [], [], False, spawn_mode, self.rng)
+        self.wall_list = self.game.get_wall_list()
+        self.apple_list = self.game.get_apple_list()
+
+    def restore(self, snapshot: GameSnapshot) -> None:
+        self.game.restore(snapshot)
+
+    def step(self, key: Optional[str]) -> None:
+        self.game.read_key(key)
+        self.game.update_objects()
+        snake_main.change_apple_list(self.apple_list, self.rng)
+        snake_main.change_wall_list(self.wall_list, self.rng)
+
+
+# one Simulator per board setting and process, reused by every search
+_simulators: Dict[Tuple[int, int, str], Simulator] = {}
+
+
+def get_simulator(width: int, height: int, spawn_mode: str = SPAWN_LEGACY) -> Simulator:
+    key = (width, height, spawn_mode)
+    if key not in _simulators:
+        _simulators[key] = Simulator(width, height, spawn_mode)
+    return _simulators[key]
+
+
+class _Node:
+    """
+    A state of the search tree, reached from the root by a fixed sequence of
+    keys. The game is deterministic given its generator state, so the snapshot
+    is the same every time the node is reached.
+    """
+    __slots__ = ('snapshot', 'depth', 'over', 'value', 'children', 'untried', 'visits', 'total')
+
+    def __init__(self, snapshot: GameSnapshot, depth: int, over: bool, value: float) -> None:
+        self.snapshot = snapshot
+        self.depth = depth
+        self.over = over
+        # of a future that ends here
+        self.value = value
+        self.children: Dict[int, '_Node'] = {}
+        self.untried = list(range(len(KEYS)))
+        self.visits = 0
+        self.total = 0.0
+
+    def select(self, exploration: float) -> '_Node':
+        """
+        The child with the best UCB1 bound.
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children.values(),
+                   key=lambda child: child.total / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+
+def rollout(sim: Simulator, rounds: int, rnd: random.Random) -> None:
+    """
+    Plays up to rounds random rounds from the simulator's current state,
+    stopping early if the game ends.
+    """
+    game = sim.game
+    for _ in range(rounds):
+        if game.is_over():
+            return
+        sim.step(rnd.choice(ROLLOUT_KEYS))
+
+
+def approach_bonus(game: SnakeGame) -> float:
+    """
+    APPROACH_BONUS divided by one plus the distance from the head to the nearest
+    apple, so that futures that eat nothing within the horizon still lead somewhere.
+    """
+    apples = game.get_active_apple_list()
+    if not apples:
+        return 0.0
+    x, y = game.get_head()
+    distance = min(abs(x - ax) + abs(y - ay) for ax, ay in (a.get_location() for a in apples))
+    return APPROACH_BONUS / (1 + distance)
+
+
+def evaluate(game: SnakeGame, root_score: int) -> float:
+    """
+    The value of a future that ends in the game's current state, see search.
+    """
+    if game.is_over():
+        return game.get_score() - root_score - DEATH_PENALTY
+    return game.get_score() - root_score + approach_bonus(game)
+
+
+def search(sim: Simulator, snapshot: GameSnapshot, horizon: int = HORIZON,
+           budget: Optional[float] = BUDGET, rollouts: Optional[int] = None,
+           seed: int = 0, exploration: float = EXPLORATION) -> Tuple[RootStats, int]:
+    """
+    Monte Carlo tree search (UCT) from a snapshot. Every rollout descends the
+    tree, adds one node, then plays random keys until horizon rounds from the
+    root. Its value is the score gained, less DEATH_PENALTY if the snake died,
+    or plus the approach_bonus of where it ended if it lived.
+
+    :param budget: Seconds to search for, None to only stop after rollouts.
+    :param rollouts: Most rollouts to play, None to only stop on the budget.
+    :return: The stats of the root actions and the number of rollouts played.
+    """
+    deadline = time.perf_counter() + budget if budget is not None else None
+    rnd = random.Random(seed)
+    # the simulator's own snapshot of the root restores without copying the
+    # free cell index, which one taken from another game cannot
+    sim.restore(snapshot)
+    root = _Node(sim.game.snapshot(), 0, False, 0.0)
+    count = 0
+    while (rollouts is None or count < rollouts) and \
+            (deadline is None or time.perf_counter() < deadline):
+        node = root
+        path = [root]
+        while not node.untried and not node.over:
+            node = node.select(exploration)
+            path.append(node)
+        if node.over or node.depth >= horizon:
+            value = node.value
+        else:
+            sim.restore(node.snapshot)
+            action = node.untried.pop(rnd.randrange(len(node.untried)))
+            sim.step(KEYS[action])
+            game = sim.game
+            child = _Node(game.snapshot(), node.depth + 1, game.is_over(),
+                          evaluate(game, snapshot.score))
+            node.children[action] = child
+            path.append(child)
+            rollout(sim, horizon - child.depth, rnd)
+            value = evaluate(game, snapshot.score)
+        for node in path:
+            node.visits += 1
+            node.total += value
+        count += 1
+    stats = [(0, 0.0)] * len(KEYS)
+    for action, child in root.children.items():
+        stats[action] = (child.visits, child.total)
+    return stats, count
+
+
+def search_task(width: int, height: int, spawn_mode: str, snapshot: GameSnapshot,
+                horizon: int, budget: Optional[float], rollouts: Optional[int],
+                seed: int, exploration: float) -> Tuple[RootStats, int, float]:
+    """
+    Internal: searches in a worker process.
+
+    :return: The root stats, the number of rollouts and the CPU seconds they took.
+    """
+    start = time.process_time()
+    stats, count = search(get_simulator(width, height, spawn_mode), snapshot, horizon,
+                          budget, rollouts, seed, exploration)
+    return stats, count, time.process_time() - start
+
+
+class Autopilot:
+    """
+    Chooses the key of every round by Monte Carlo tree search over snapshots
+    of the game. Every worker searches its own tree from the same state and
+    the visits of the root actions are added up (root parallelization).
+    Pass it as the key_source of snake_main.run_game.
+    """
+
+    def __init__(self, width: int, height: int, spawn_mode: str = SPAWN_LEGACY,
+                 budget: Optional[float] = BUDGET, rollouts: Optional[int] = None,
+                 horizon: int = HORIZON, workers: int = 1, seed: int = 0,
+                 exploration: float = EXPLORATION) -> None:
+        """
+        :param width: Board width of the games played.
+        :param height: Board height of the games played.
+        :param budget: Seconds of search per move, None to only stop after rollouts.
+        :param rollouts: Most rollouts per move and worker, None to only stop on the budget.
+        :param workers: Number of worker processes, 1 searches in the calling process.
+        :param seed: Seed of the rollouts' keys.
+        """
+        if budget is None and rollouts is None:
+            raise ValueError("a search needs a budget or a number of rollouts")
+        self.width = width
+        self.height = height
+        self.spawn_mode = spawn_mode
+        self.budget = budget
+        self.rollouts = rollouts
+        self.horizon = horizon
+        self.workers = workers
+        self.exploration = exploration
+        self._seed = seed
+        self._executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        # rollouts played and the CPU seconds the searches took, summed over workers
+        self.total_rollouts = 0
+        self.total_seconds = 0.0
+
+    def __call__(self, game: SnakeGame) -> Optional[str]:
+        return KEYS[self.choose(game.snapshot())]
+
+    def choose(self, snapshot: GameSnapshot) -> int:
+        """
+        Searches from a snapshot.
+
+        :return: Index in replay.KEYS of the most visited root action.
+        """
+        args = (self.width, self.height, self.spawn_mode, snapshot, self.horizon,
+                self.budget, self.rollouts)
+        if self._executor is None:
+            results = [search_task(*args, self._seed, self.exploration)]
+        else:
+            futures = [self._executor.submit(search_task, *args, self._seed + i,
+                                             self.exploration)
+                       for i in range(self.workers)]
+            results = [future.result() for future in futures]
+        self._seed += self.workers
+        visits = [0] * len(KEYS)
+        totals = [0.0] * len(KEYS)
+        for stats, count, seconds in results:
+            for action, (num, total) in enumerate(stats):
+                visits[action] += num
+                totals[action] += total
+            self.total_rollouts += count
+            self.total_seconds += seconds
+        return max(range(len(KEYS)),
+                   key=lambda action: (visits[action],
+                                       totals[action] / visits[action] if visits[action] else 0.0))
+
+    def rollouts_per_core(self) -> float:
+        """
+        Rollouts per CPU second of search, that is per second of a single core.
+        """
+        return self.total_rollouts / self.total_seconds if self.total_seconds else 0.0
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> 'Autopilot':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def play_one(seed, pilot: Autopilot, apples: int, walls: int,
+             max_rounds: int = MAX_ROUNDS) -> Tuple[int, int, Optional[str]]:
+    """
+    Plays a seeded game headlessly with the autopilot choosing the keys.
+
+    :return: The score, the number of rounds and the death cause.
+    """
+    rng = game_utils.GameRandom(seed, pilot.width, pilot.height)
+    wall_list = snake_main.make_wall_list(walls, rng)
+    apple_list = snake_main.make_apple_list(apples, rng)
+    game = SnakeGame(pilot.width, pilot.height, wall_list, apple_list, False,
+                     pilot.spawn_mode, rng)
+    gd = HeadlessDisplay(pilot.width, pilot.height, 0, 0, Namespace())
+    gd.show_score(0)
+    snake_main.run_game(game, gd, wall_list, apple_list, max_rounds, rng, key_source=pilot)
+    death_cause = game.get_death_cause()
+    if death_cause is None and not game.is_over():
+        death_cause = DEATH_TIMEOUT
+    return game.get_score(), gd.get_round_num(), death_cause
+
+
+def parse_args(argv: List[str]) -> Namespace:
+    parser = argparse.ArgumentParser(
+        prog='autopilot.py',
+        description='Plays seeded snake games with the tree search autopilot',
+    )
+    parser.add_argument('-s', '--seeds', type=parse_seeds, default=range(1),
+                        help="Seeds to play, 'start:stop' or a count")
+    parser.add_argument('-x', '--width', type=int, default=game_utils.WIDTH,
+                        help='Board width')
+    parser.add_argument('-y', '--height', type=int, default=game_utils.HEIGHT,
+                        help='Board height')
+    parser.add_argument('-a', '--apples', type=int, default=3,
+                        help='Number of apples')
+    parser.add_argument('-w', '--walls', type=int, default=2,
+                        help='Number of walls')
+    parser.add_argument('-m', '--max-rounds', type=int, default=1000,
+                        help='Rounds after which a game is stopped')
+    parser.add_argument('--spawn', choices=SPAWN_MODES, default=SPAWN_LEGACY,
+                        help='How new apples and walls are placed')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='Number of worker processes searching every move')
+    parser.add_argument('-t', '--budget', type=float, default=BUDGET * 1000,
+                        help='Milliseconds of search per move, 0 to only stop after --rollouts')
+    parser.add_argument('-r', '--rollouts', type=int, default=None,
+                        help='Most rollouts per move and worker')
+    parser.add_argument('--horizon', type=int, default=HORIZON,
+                        help='Rounds looked ahead')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    start = time.perf_counter()
+    budget = args.budget / 1000 if args.budget > 0 else None
+    with Autopilot(args.width, args.height, args.spawn, budget, args.rollouts,
+                   args.horizon, args.workers) as pilot:
+        for seed in args.seeds:
+            score, rounds, death_cause = play_one(seed, pilot, args.apples, args.walls,
+                                                  args.max_rounds)
+            print(f'seed={seed} score={score} rounds={rounds} death={death_cause}')
+        print(f'{pilot.total_rollouts} rollouts in {time.perf_counter() - start:.2f}s, '
+              f'{pilot.rollouts_per_core():.0f} rollouts/s per core ({args.workers} workers)')
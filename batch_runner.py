@@ -0,0 +1,158 @@
+import sys
+import os
+import time
+import random
+import argparse
+from argparse import Namespace
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, Iterable, List, Optional
+
+import game_utils
+import snake_main
+from snake_game import SnakeGame, SPAWN_LEGACY, SPAWN_MODES
+from headless_display import HeadlessDisplay
+
+KEYS = ["Up", "Down", "Left", "Right"]
+CHUNK_SIZE = 64
+MAX_ROUNDS = 10000
+DEATH_TIMEOUT = "timeout"
+
+GameResult = namedtuple('GameResult', ['seed', 'score', 'rounds', 'death_cause'])
+
+
+def policy_none(seed) -> Iterator[Optional[str]]:
+    """Never presses a key, the snake keeps its direction."""
+    while True:
+        yield None
+
+
+def policy_random(seed) -> Iterator[Optional[str]]:
+    """Presses a random key (or nothing) every round, seeded by the game seed."""
+    rnd = random.Random(f'keys{seed}')
+    choices = KEYS + [None] * 4
+    while True:
+        yield rnd.choice(choices)
+
+
+POLICIES = {
+    'none': policy_none,
+    'random': policy_random,
+}
+
+
+def run_one(seed, width: int, height: int, apples: int, walls: int,
+            policy: str = 'none', max_rounds: int = MAX_ROUNDS,
+            spawn_mode: str = SPAWN_LEGACY) -> GameResult:
+    """
+    Plays a single seeded game headlessly.
+
+    :param seed: Seed for the random number generator.
+    :param width: Game board width.
+    :param height: Game board height.
+    :param apples: Number of apples.
+    :param walls: Number of walls.
+    :param policy: Name of the input policy in POLICIES.
+    :param max_rounds: Number of turns after which the game is stopped.
+    :param spawn_mode: One of snake_game.SPAWN_MODES.
+    :return: The GameResult of the game.
+    """
+    rng = game_utils.GameRandom(seed, width, height)
+    wall_list = snake_main.make_wall_list(walls, rng)
+    apple_list = snake_main.make_apple_list(apples, rng)
+    game = SnakeGame(width, height, wall_list, apple_list, False, spawn_mode, rng)
+    gd = HeadlessDisplay(width, height, 0, 0, Namespace(),
+                         inputs=POLICIES[policy](seed))
+    gd.show_score(0)
+    snake_main.run_game(game, gd, wall_list, apple_list, max_rounds, rng)
+    death_cause = game.get_death_cause()
+    if death_cause is None and not game.is_over():
+        death_cause = DEATH_TIMEOUT
+    return GameResult(seed, game.get_score(), gd.get_round_num(), death_cause)
+
+
+def run_chunk(seeds: List, width: int, height: int, apples: int, walls: int,
+              policy: str, max_rounds: int, spawn_mode: str) -> List[GameResult]:
+    """
+    Internal: plays a chunk of games in a worker process.
+    """
+    return [run_one(seed, width, height, apples, walls, policy, max_rounds, spawn_mode)
+            for seed in seeds]
+
+
+def run_batch(seeds: Iterable, width: int, height: int, apples: int, walls: int,
+              policy: str = 'none', max_rounds: int = MAX_ROUNDS,
+              workers: Optional[int] = None,
+              chunk_size: int = CHUNK_SIZE,
+              spawn_mode: str = SPAWN_LEGACY) -> Iterator[GameResult]:
+    """
+    Plays one game per seed over a pool of processes.
+    Results are yielded as soon as their chunk completes, not in seed order.
+
+    :param seeds: Seeds of the games to play.
+    :param workers: Number of worker processes, defaults to the number of cores.
+    :param chunk_size: Number of games sent to a worker at once.
+    :param spawn_mode: One of snake_game.SPAWN_MODES.
+    :return: Iterator of GameResult.
+    """
+    if policy not in POLICIES:
+        raise ValueError("unknown policy: " + str(policy))
+    seeds = list(seeds)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_chunk, seeds[i:i + chunk_size], width, height,
+                                   apples, walls, policy, max_rounds, spawn_mode)
+                   for i in range(0, len(seeds), chunk_size)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def parse_seeds(text: str) -> range:
+    """Parses a seed range given as 'start:stop' or 'count'."""
+    if ':' in text:
+        start, stop = text.split(':')
+        return range(int(start), int(stop))
+    return range(int(text))
+
+
+def parse_args(argv: List[str]) -> Namespace:
+    parser = argparse.ArgumentParser(
+        prog='batch_runner.py',
+        description='Runs many seeded snake games in parallel',
+    )
+    parser.add_argument('-s', '--seeds', type=parse_seeds, default=range(100),
+                        help="Seed range as 'start:stop' or a count")
+    parser.add_argument('-x', '--width', type=int, default=game_utils.WIDTH,
+                        help='Game board width')
+    parser.add_argument('-y', '--height', type=int, default=game_utils.HEIGHT,
+                        help='Game board height')
+    parser.add_argument('-a', '--apples', type=int, default=3,
+                        help='Number of apples')
+    parser.add_argument('-w', '--walls', type=int, default=2,
+                        help='Number of walls')
+    parser.add_argument('-p', '--policy', choices=sorted(POLICIES), default='random',
+                        help='Input policy')
+    parser.add_argument('-m', '--max-rounds', type=int, default=MAX_ROUNDS,
+                        help='Turns after which a game is stopped')
+    parser.add_argument('--spawn', choices=SPAWN_MODES, default=SPAWN_LEGACY,
+                        help='How new apples and walls are placed')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='Number of worker processes')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='Only print the summary')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    start = time.perf_counter()
+    games = 0
+    for result in run_batch(args.seeds, args.width, args.height, args.apples,
+                            args.walls, args.policy, args.max_rounds, args.workers,
+                            spawn_mode=args.spawn):
+        games += 1
+        if not args.quiet:
+            print(f'seed={result.seed} score={result.score} '
+                  f'rounds={result.rounds} death={result.death_cause}')
+    elapsed = time.perf_counter() - start
+    print(f'{games} games in {elapsed:.2f}s '
+          f'({games / elapsed if elapsed else 0:.1f} games/sec, {args.workers} workers)')
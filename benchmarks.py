@@ -0,0 +1,549 @@
+import os
+import sys
+import json
+import subprocess
+import time
+import random
+import argparse
+from argparse import Namespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import autopilot
+import game_utils
+import snake_main
+from snake import Snake
+from snake_env import SnakeEnv, bench_steps
+from snake_game import SnakeGame, SPAWN_LEGACY, SPAWN_FREE
+from wall import Wall
+
+UP = "Up"
+DOWN = "Down"
+LEFT = "Left"
+RIGHT = "Right"
+
+WIDTH = 200
+HEIGHT = 200
+
+BOARD_SIZES = [(40, 30), (200, 200)]
+SNAKE_LENGTHS = [3, 30, 300, 3000]
+OBJECT_COUNTS = [(3, 2), (100, 50)]
+# board of the spawn=free snapshot case, where the free cell index grows with the board
+LARGE_BOARD = (400, 300)
+WALL_COUNTS = [10, 1000]
+REPEAT = 5
+THRESHOLD = 0.10
+
+# modules a headless worker loads, none of them may pull in tkinter
+ENGINE_MODULES = ["snake", "snake_game", "snake_main", "wall", "apple", "game_utils",
+                  "headless_display", "batch_runner", "snake_env", "autopilot"]
+# headless command lines, run from this directory, that must not load tkinter either
+HEADLESS_COMMANDS = [["game_display.py", "--headless", "-r", "0", "-s", "0"]]
+# cold start import time of ENGINE_MODULES, in microseconds
+IMPORT_TARGET = 50000
+
+
+class NullDisplay:
+    """A display that ignores everything drawn on it."""
+
+    def draw_cell(self, x, y, color):
+        pass
+
+    def show_score(self, val):
+        pass
+
+
+class StubCanvas:
+    """A canvas that only hands out item ids, for timing the drawing code."""
+
+    def __init__(self):
+        self._items = 0
+
+    def create_rectangle(self, *coords, **options):
+        self._items += 1
+        return self._items
+
+    def itemconfig(self, item, **options):
+        pass
+
+
+class StubVar:
+    """Stands in for tkinter.StringVar."""
+
+    def set(self, value):
+        pass
+
+
+class FrameRecorder(NullDisplay):
+    """Keeps the cells drawn in every round."""
+
+    def __init__(self):
+        self.frames = []
+        self._to_draw = {}
+
+    def draw_cell(self, x, y, color):
+        self._to_draw[x, y] = color
+
+    def end_round(self):
+        self.frames.append(self._to_draw)
+        self._to_draw = {}
+
+    def get_key_clicked(self):
+        return None
+
+
+class LegacyWall:
+    """
+    The Wall implementation before the geometry was cached, kept here only
+    as the reference point for bench_walls.
+    """
+
+    def __init__(self, x, y, direction):
+        self._x = x
+        self._y = y
+        self._direction = direction
+        self._wall_body = self.get_wall_body()
+
+    def get_wall_body(self) -> list:
+        if self._direction == UP or self._direction == DOWN:
+            return [(self._x, self._y - 1), (self._x, self._y), (self._x, self._y + 1)]
+        else:
+            return [(self._x - 1, self._y), (self._x, self._y), (self._x + 1, self._y)]
+
+    def get_wall_edge(self):
+        if self._direction == UP or self._direction == RIGHT:
+            return self._wall_body[2]
+        else:
+            return self._wall_body[0]
+
+    def move_wall(self):
+        if self._direction == UP:
+            self._y += 1
+        elif self._direction == DOWN:
+            self._y -= 1
+        elif self._direction == RIGHT:
+            self._x += 1
+        elif self._direction == LEFT:
+            self._x -= 1
+        self._wall_body = self.get_wall_body()
+
+    def draw_cell(self, loc, gd):
+        if loc in self.get_wall_body():
+            x, y = loc
+            gd.draw_cell(x, y, "blue")
+
+    def is_wall_out(self, len_x, len_y):
+        for x, y in self._wall_body:
+            if self._direction == UP:
+                if y < len_y:
+                    return False
+            elif self._direction == DOWN:
+                if y >= 0:
+                    return False
+            elif self._direction == RIGHT:
+                if x < len_x:
+                    return False
+            elif self._direction == LEFT:
+                if x >= 0:
+                    return False
+        return True
+
+
+def wall_round(walls: list, move: bool, gd) -> None:
+    """
+    The per-round wall work SnakeGame does: moving every other round,
+    the body checks of valid_loc, the edge checks of the eat phases,
+    the out of board check and drawing.
+    """
+    for wall in walls:
+        if move:
+            wall.move_wall()
+        wall.get_wall_body()
+        wall.get_wall_edge()
+        wall.get_wall_edge()
+        wall.is_wall_out(WIDTH, HEIGHT)
+        for cell in wall.get_wall_body():
+            x, y = cell
+            if 0 <= x < WIDTH and 0 <= y < HEIGHT:
+                wall.draw_cell(cell, gd)
+
+
+def bench_walls(wall_class, num_walls: int = 1000, rounds: int = 200) -> float:
+    """
+    Measures the per-round overhead of num_walls active walls.
+
+    :return: Seconds per round.
+    """
+    rnd = random.Random(0)
+    walls = [wall_class(rnd.randrange(WIDTH), rnd.randrange(HEIGHT),
+                        rnd.choice([UP, DOWN, LEFT, RIGHT]))
+             for _ in range(num_walls)]
+    gd = NullDisplay()
+    start = time.perf_counter()
+    for i in range(rounds):
+        wall_round(walls, i % 2 == 1, gd)
+    return (time.perf_counter() - start) / rounds
+
+
+def time_op(op: Callable[[], Any], number: int, repeat: int = REPEAT) -> float:
+    """
+    Runs op number times, repeat times over, and keeps the fastest run.
+
+    :return: Seconds per call.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            op()
+        best = min(best, time.perf_counter() - start)
+    return best / number
+
+
+def make_snake(length: int) -> Snake:
+    """
+    A snake of the given length (3 plus a multiple of 3) heading up from (0, 0).
+    """
+    snake = Snake(0, 0)
+    for _ in range((length - snake.get_length()) // 3):
+        snake.eat()
+    while snake.get_length() < length:
+        snake.move()
+    return snake
+
+
+def make_game(width: int, height: int, apples: int, walls: int, seed: int = 0,
+              spawn_mode: str = SPAWN_LEGACY) -> Tuple[SnakeGame, list, list, game_utils.GameRandom]:
+    """
+    A started game with its own generator, as batch_runner plays them.
+    """
+    rng = game_utils.GameRandom(seed, width, height)
+    wall_list = snake_main.make_wall_list(walls, rng)
+    apple_list = snake_main.make_apple_list(apples, rng)
+    game = SnakeGame(width, height, wall_list, apple_list, False, spawn_mode, rng)
+    game.add_objects()
+    return game, wall_list, apple_list, rng
+
+
+def bench_snake_move(length: int, number: int) -> float:
+    snake = make_snake(length)
+    return time_op(snake.move, number)
+
+
+def bench_snake_cut(length: int, number: int) -> float:
+    """
+    Cuts a fresh snake in the middle every call, only the cut is timed.
+    """
+    best = float('inf')
+    for _ in range(REPEAT):
+        total = 0.0
+        for _ in range(number):
+            snake = make_snake(length)
+            middle = snake.get_snake_body()[length // 2]
+            start = time.perf_counter()
+            snake.cut(middle)
+            total += time.perf_counter() - start
+        best = min(best, total)
+    return best / number
+
+
+def bench_snapshot_restore(length: int, number: int, width: int = 40, height: int = 30,
+                           spawn_mode: str = SPAWN_LEGACY) -> float:
+    """
+    SnakeGame.snapshot followed by restore, on a game given a snake of the given length.
+    The snake does not move in between, so snapshot reuses the body copy of the
+    last restore and only restore rebuilds the body. Under SPAWN_FREE the free
+    cell index must not be copied either, or the time grows with the board.
+    """
+    game = make_game(width, height, 3, 2, spawn_mode=spawn_mode)[0]
+    game.restore(game.snapshot()._replace(snake=make_snake(length).get_state()))
+    return time_op(lambda: game.restore(game.snapshot()), number)
+
+
+def bench_snake_state_after_move(length: int, number: int) -> float:
+    """
+    Snake.get_state after every move, which has to copy the changed body.
+    """
+    snake = make_snake(length)
+
+    def op():
+        snake.move()
+        snake.get_state()
+    return time_op(op, number)
+
+
+def bench_valid_loc(width: int, height: int, apples: int, walls: int, number: int) -> float:
+    game = make_game(width, height, apples, walls)[0]
+    rnd = random.Random(0)
+    locs = [(rnd.randrange(-1, width + 1), rnd.randrange(-1, height + 1)) for _ in range(1000)]
+
+    def op():
+        for loc in locs:
+            game.valid_loc(loc)
+    return time_op(op, max(1, number // len(locs))) / len(locs)
+
+
+def bench_update_objects(width: int, height: int, apples: int, walls: int, number: int) -> float:
+    """
+    Plays rounds with random keys, starting a new game when one ends,
+    and times update_objects only.
+    """
+    seed = 0
+    game, wall_list, apple_list, rng = make_game(width, height, apples, walls, seed)
+    rnd = random.Random(0)
+    gd = NullDisplay()
+    best = float('inf')
+    for _ in range(REPEAT):
+        total = 0.0
+        for _ in range(number):
+            game.read_key(rnd.choice([None, None, UP, DOWN, LEFT, RIGHT]))
+            start = time.perf_counter()
+            game.update_objects()
+            total += time.perf_counter() - start
+            game.draw_board(gd)
+            snake_main.change_apple_list(apple_list, rng)
+            snake_main.change_wall_list(wall_list, rng)
+            if game.is_over():
+                # a fresh game, rest_game cannot bring back a snake of length 0
+                seed += 1
+                game, wall_list, apple_list, rng = make_game(width, height, apples, walls, seed)
+        best = min(best, total)
+    return best / number
+
+
+def bench_env_step(width: int, height: int, apples: int, walls: int, number: int) -> float:
+    """
+    SnakeEnv.step with random actions, the resets of the games that end included.
+    """
+    env = SnakeEnv(width, height, apples, walls)
+    return min(bench_steps(env, number)[0] for _ in range(REPEAT)) / number
+
+
+def bench_autopilot_rollout(width: int, height: int, apples: int, walls: int,
+                            number: int) -> float:
+    """
+    An autopilot search of number rollouts from a new game, in this process:
+    seconds per rollout, the inverse of the rollouts per second of one core.
+    """
+    game = make_game(width, height, apples, walls)[0]
+    sim = autopilot.get_simulator(width, height)
+    snapshot = game.snapshot()
+    return time_op(lambda: autopilot.search(sim, snapshot, budget=None, rollouts=number), 1) / number
+
+
+def make_walls(wall_class, num_walls: int) -> list:
+    rnd = random.Random(0)
+    return [wall_class(rnd.randrange(WIDTH), rnd.randrange(HEIGHT),
+                       rnd.choice([UP, DOWN, LEFT, RIGHT]))
+            for _ in range(num_walls)]
+
+
+def bench_wall_body(num_walls: int, number: int) -> float:
+    walls = make_walls(Wall, num_walls)
+
+    def op():
+        for wall in walls:
+            wall.get_wall_body()
+    return time_op(op, max(1, number // num_walls)) / num_walls
+
+
+def bench_wall_out(num_walls: int, number: int) -> float:
+    walls = make_walls(Wall, num_walls)
+
+    def op():
+        for wall in walls:
+            wall.is_wall_out(WIDTH, HEIGHT)
+    return time_op(op, max(1, number // num_walls)) / num_walls
+
+
+def bench_wall_round(wall_class, num_walls: int, number: int) -> float:
+    return bench_walls(wall_class, num_walls, max(1, number // num_walls))
+
+
+def bench_update_drawing(width: int, height: int, apples: int, walls: int, number: int) -> float:
+    """
+    GameDisplay._update_drawing on a stub canvas, presenting the frames
+    of a seeded game one after the other.
+    """
+    # built without __init__, so neither tkinter nor a display is needed
+    from game_display import GameDisplay
+    from frame_buffer import FrameBuffer, make_frame
+    from renderers import CanvasRenderer
+
+    recorder = FrameRecorder()
+    seed = 0
+    while len(recorder.frames) < 200:
+        game, wall_list, apple_list, rng = make_game(width, height, apples, walls, seed)
+        snake_main.run_game(game, recorder, wall_list, apple_list, 200, rng)
+        seed += 1
+    frames = [make_frame(i, cells, 0) for i, cells in enumerate(recorder.frames)]
+
+    gd = GameDisplay.__new__(GameDisplay)
+    gd.profiler = None
+    gd._frames = FrameBuffer()
+    gd._score_var = StubVar()
+    gd._renderer = CanvasRenderer(StubCanvas(), width, height, 1)
+    index = [0]
+
+    def op():
+        gd._frames.publish(frames[index[0] % len(frames)])
+        index[0] += 1
+        gd._update_drawing()
+    return time_op(op, number)
+
+
+def bench_engine_import() -> float:
+    """
+    Imports ENGINE_MODULES in a fresh interpreter and times it.
+    Raises RuntimeError if tkinter got loaded on the way.
+    """
+    script = ("import sys, time\n"
+              "start = time.perf_counter()\n"
+              f"import {', '.join(ENGINE_MODULES)}\n"
+              "print(time.perf_counter() - start, 'tkinter' in sys.modules)")
+    best = float('inf')
+    for _ in range(REPEAT):
+        output = subprocess.run([sys.executable, '-c', script], check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True).stdout.split()
+        if output[1] != 'False':
+            raise RuntimeError("importing the engine modules loaded tkinter")
+        best = min(best, float(output[0]))
+    return best
+
+
+def check_no_tkinter() -> List[str]:
+    """
+    Imports ENGINE_MODULES, then runs every HEADLESS_COMMANDS entry, each in a
+    fresh interpreter where importing tkinter fails as on a machine without Tk.
+
+    :return: A message for every import or command that failed, empty if all ran.
+    """
+    block = "import sys, runpy\nsys.modules['tkinter'] = None\n"
+    scripts = {'import ' + ', '.join(ENGINE_MODULES): block + f"import {', '.join(ENGINE_MODULES)}\n"}
+    for command in HEADLESS_COMMANDS:
+        scripts[' '.join(command)] = block + (f"sys.argv = {command!r}\n"
+                                              f"runpy.run_path({command[0]!r}, run_name='__main__')\n")
+    failures = []
+    for name, script in scripts.items():
+        result = subprocess.run([sys.executable, '-c', script],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            lines = result.stderr.strip().splitlines()
+            failures.append(f'{name}: {lines[-1] if lines else "exit code " + str(result.returncode)}')
+    return failures
+
+
+def get_cases(number: int, num_walls: int) -> Dict[str, Callable[[], float]]:
+    """
+    All benchmark cases by name, parameters in brackets. Each returns seconds per operation.
+    """
+    cases: Dict[str, Callable[[], float]] = {'engine_import': bench_engine_import}
+    for length in SNAKE_LENGTHS:
+        cases[f'snake_move[len={length}]'] = lambda length=length: bench_snake_move(length, number)
+        cases[f'snake_cut[len={length}]'] = lambda length=length: bench_snake_cut(length, number // 10)
+        cases[f'snapshot_restore[len={length}]'] = \
+            lambda length=length: bench_snapshot_restore(length, number)
+        cases[f'snake_state_after_move[len={length}]'] = \
+            lambda length=length: bench_snake_state_after_move(length, number)
+    width, height = LARGE_BOARD
+    cases[f'snapshot_restore_free[{width}x{height},len=30]'] = \
+        lambda: bench_snapshot_restore(30, number, *LARGE_BOARD, SPAWN_FREE)
+    for width, height in BOARD_SIZES:
+        for apples, walls in OBJECT_COUNTS:
+            params = f'{width}x{height},apples={apples},walls={walls}'
+            config = (width, height, apples, walls)
+            cases[f'valid_loc[{params}]'] = lambda config=config: bench_valid_loc(*config, number)
+            cases[f'update_objects[{params}]'] = lambda config=config: bench_update_objects(*config, number)
+            cases[f'update_drawing[{params}]'] = lambda config=config: bench_update_drawing(*config, number)
+            cases[f'env_step[{params}]'] = lambda config=config: bench_env_step(*config, number)
+            cases[f'autopilot_rollout[{params}]'] = \
+                lambda config=config: bench_autopilot_rollout(*config, number)
+    for count in WALL_COUNTS:
+        cases[f'wall_body[walls={count}]'] = lambda count=count: bench_wall_body(count, number)
+        cases[f'wall_out[walls={count}]'] = lambda count=count: bench_wall_out(count, number)
+    cases[f'wall_round[walls={num_walls}]'] = lambda: bench_wall_round(Wall, num_walls, number * 10)
+    cases[f'wall_round_legacy[walls={num_walls}]'] = \
+        lambda: bench_wall_round(LegacyWall, num_walls, number * 10)
+    return cases
+
+
+def run_cases(cases: Dict[str, Callable[[], float]], pattern: Optional[str] = None) -> Dict[str, float]:
+    """
+    Runs the cases whose name contains pattern.
+
+    :return: Microseconds per operation by case name.
+    """
+    results = {}
+    for name, case in cases.items():
+        if pattern is None or pattern in name:
+            results[name] = case() * 1e6
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float],
+            threshold: float) -> List[str]:
+    """
+    Returns the names of the cases that got slower than baseline by more than threshold,
+    and of those over their fixed target.
+
+    :param threshold: Allowed slowdown as a fraction, 0.1 allows 10%.
+    """
+    targets = {'engine_import': IMPORT_TARGET}
+    return [name for name, value in results.items()
+            if (name in baseline and value > baseline[name] * (1 + threshold)) or
+            (name in targets and value > targets[name])]
+
+
+def parse_args(argv: List[str]) -> Namespace:
+    parser = argparse.ArgumentParser(
+        prog='benchmarks.py',
+        description='Benchmarks the snake game engine',
+    )
+    parser.add_argument('-w', '--walls', type=int, default=1000,
+                        help='Number of active walls of the wall_round cases')
+    parser.add_argument('-n', '--number', type=int, default=2000,
+                        help='Operations per measurement')
+    parser.add_argument('-k', '--filter', default=None,
+                        help='Only run the cases whose name contains this')
+    parser.add_argument('--json', default=None,
+                        help='Write the results to this file')
+    parser.add_argument('--baseline', default=None,
+                        help='Compare against results written earlier with --json')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='Slowdown against the baseline that counts as a regression, 0.1 is 10%%')
+    parser.add_argument('--check-headless', action='store_true',
+                        help='Only check that the engine modules and the headless entry points '
+                             'run without tkinter, exit with 1 if one does not')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if args.check_headless:
+        failures = check_no_tkinter()
+        for failure in failures:
+            print('FAIL ' + failure)
+        print(f'{len(failures)} of {len(HEADLESS_COMMANDS) + 1} headless checks failed')
+        sys.exit(1 if failures else 0)
+    results = run_cases(get_cases(args.number, args.walls), args.filter)
+    baseline = {}
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.threshold)
+    for name, value in results.items():
+        line = f'{name:<55}{value:>12.3f} us'
+        if name in baseline:
+            line += f'{(value / baseline[name] - 1) * 100:>+9.1f}%'
+        if name in regressions:
+            line += '  REGRESSION'
+        print(line)
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'number': args.number,
+                       'results': results}, f, indent=1, sort_keys=True)
+    if regressions:
+        print(f'{len(regressions)} case(s) slower than the baseline by more than '
+              f'{args.threshold * 100:.0f}% or over their target')
+        sys.exit(1)
@@ -0,0 +1,65 @@
+import threading
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+
+class Frame(NamedTuple):
+    """
+    Everything shown for one round: the cells to draw and the score.
+    cells is a read only view, a frame is never changed once published.
+    """
+    round_num: int
+    cells: Mapping[Tuple[int, int], str]
+    score: Any
+
+
+def make_frame(round_num: int, cells: Dict[Tuple[int, int], str], score: Any) -> Frame:
+    """
+    Wraps a finished round into a Frame. The caller hands cells over and
+    must not change the dict afterwards.
+    """
+    return Frame(round_num, MappingProxyType(cells), score)
+
+
+class FrameBuffer:
+    """
+    Hands frames from the game thread to the tkinter thread.
+    The game thread fills its own back buffer and publishes it as a whole
+    frame at the end of every round; the tkinter thread takes only the
+    latest published frame, frames it never got to are dropped.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._front: Optional[Frame] = None
+        self._published = 0
+        self._presented = 0
+        self._dropped = 0
+
+    def publish(self, frame: Frame) -> None:
+        """
+        Makes frame the latest one, replacing a frame that was not taken yet
+        """
+        with self._lock:
+            if self._front is not None:
+                self._dropped += 1
+            self._front = frame
+            self._published += 1
+
+    def take(self) -> Optional[Frame]:
+        """
+        Returns the latest frame, or None if nothing was published since the last take
+        """
+        with self._lock:
+            frame, self._front = self._front, None
+            if frame is not None:
+                self._presented += 1
+            return frame
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns how many frames were published, presented and dropped so far
+        """
+        with self._lock:
+            return {'published': self._published, 'presented': self._presented,
+                    'dropped': self._dropped}
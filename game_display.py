@@ -1,16 +1,33 @@
 import sys,getopt
 import threading
 import time
-import tkinter as tki
+import random
 from typing import Any, Optional, List, Tuple, Dict
 
 import argparse
 from argparse import Namespace
 
 import game_utils
+import snake_main
+from headless_display import HeadlessDisplay
+from renderers import CanvasRenderer, BitmapRenderer, Viewport, RENDER_CANVAS, RENDER_BITMAP, RENDER_MODES
+from tick_scheduler import TickScheduler, LATE_CATCH_UP, LATE_POLICIES
+from frame_buffer import Frame, FrameBuffer, make_frame
+from input_queue import KeyQueue, KEY_QUEUE_SIZE, CONSUME_ONE, CONSUME_POLICIES
+from profiler import Profiler
+from replay import ReplayWriter
+from trace_file import TraceWriter
 
 CELL_SIZE = 15
 ROUND_TIME = 100
+DISPLAY_FPS = 60
+VIEWPORT_MARGIN = 5
+
+SCHEDULER_THREAD = "thread"
+SCHEDULER_AFTER = "after"
+SCHEDULERS = [SCHEDULER_THREAD, SCHEDULER_AFTER]
+
+PHASE_UPDATE_DRAWING = "update_drawing"
 
 WIDTH = 40
 HEIGHT = 30
@@ -18,30 +35,80 @@ NUM_OF_APPLES = 3
 NUM_OF_WALLS = 2
 
 class GameDisplay:
-    def __init__(self, width:int, height:int, delay:int, verbose:int, args:Namespace) -> None:
-        """Creates a new game display object and initializes it"""
-        # placed this import in here to solve circular import issues.
+    def __init__(self, width:int, height:int, delay:int, verbose:int, args:Namespace,
+                 render:str=RENDER_CANVAS, cell_size:int=CELL_SIZE,
+                 viewport:Optional[Tuple[int, int]]=None, margin:int=VIEWPORT_MARGIN,
+                 scheduler:str=SCHEDULER_THREAD, late_policy:str=LATE_CATCH_UP,
+                 fps:int=DISPLAY_FPS, key_policy:str=CONSUME_ONE,
+                 key_queue_size:int=KEY_QUEUE_SIZE, profiler:Optional[Profiler]=None) -> None:
+        """
+        Creates a new game display object and initializes it
+        :param render: RENDER_CANVAS draws a canvas item per cell,
+        RENDER_BITMAP draws the board into a single image, which scales to large boards
+        :param cell_size: size of a board cell in pixels
+        :param viewport: optional (width, height) in cells of a window that follows
+        the snake's head, for boards larger than the screen
+        :param margin: how close the head may get to the window's edge before it scrolls
+        :param scheduler: SCHEDULER_THREAD runs the game on its own thread that sleeps
+        between rounds, SCHEDULER_AFTER runs every round from the tkinter event loop
+        :param late_policy: what SCHEDULER_AFTER does with rounds that are late,
+        one of tick_scheduler.LATE_POLICIES
+        :param fps: how often the window looks for a new frame with SCHEDULER_THREAD,
+        the game may run faster than this, frames the window misses are dropped
+        :param key_policy: how key presses are taken each round, one of
+        input_queue.CONSUME_POLICIES
+        :param key_queue_size: most key presses waiting to be applied
+        :param profiler: optional profiler the game and the drawing record their phases to
+        """
+        # imported here so that --headless runs on machines without Tk
+        import tkinter as tki
+        if scheduler not in SCHEDULERS:
+            raise ValueError("unknown scheduler: " + str(scheduler))
         self.width, self.height, self.delay, self.verbose = width, height, delay/1000, verbose>1
-        import snake_main
+        self.cell_size = cell_size
+        self._viewport: Optional[Viewport] = None
+        if viewport is not None:
+            self._viewport = Viewport(width, height, viewport[0], viewport[1], margin)
+        # size of the drawn area in cells
+        screen_width, screen_height = (self._viewport.width, self._viewport.height) \
+            if self._viewport is not None else (width, height)
         self._round_num = 0
         self._root = tki.Tk()
         self._root.title('Snake')
         self._root.bind('<KeyPress>', self._key_press)
 
         self._score_var = tki.StringVar()
+        self._score: Any = None
 
         self._init_score_frame()
         self._canvas = tki.Canvas(
-            self._root, bg="white", width = self.width * CELL_SIZE,
-            height = self.height * CELL_SIZE)
+            self._root, bg="white", width = screen_width * self.cell_size,
+            height = screen_height * self.cell_size)
         self._canvas.pack()
+        if render == RENDER_BITMAP:
+            self._image = tki.PhotoImage(width=screen_width * self.cell_size,
+                                         height=screen_height * self.cell_size)
+            self._canvas.create_image(0, 0, image=self._image, anchor=tki.NW)
+            self._renderer = BitmapRenderer(self._image, screen_width, screen_height, self.cell_size)
+        elif render == RENDER_CANVAS:
+            self._renderer = CanvasRenderer(self._canvas, screen_width, screen_height, self.cell_size)
+        else:
+            raise ValueError("unknown render mode: " + str(render))
+        # back buffer, only touched by the thread running the game
         self._to_draw: Dict[Tuple[int, int], str] = dict()
-        self._already_drawn: Dict[Tuple[int, int, str], int] = dict()
+        self._frames = FrameBuffer()
+        self._present_interval = max(1, 1000 // fps)
 
         self._root.resizable(False, False)
-        self.key_click: Optional[str] = None
-        self._key_click_round: int = 0
-
+        self._keys = KeyQueue(key_queue_size, key_policy)
+        self.profiler = profiler
+        # set by setup_game when the game is recorded
+        self.recorder: Optional[ReplayWriter] = None
+
+        self._args = args
+        self._scheduler_mode = scheduler
+        self._late_policy = late_policy
+        self._scheduler: Optional[TickScheduler] = None
         self._game_control_thread = threading.Thread(
             target=snake_main.main_loop, args=(self,args))
         self._game_control_thread.daemon = True
@@ -54,10 +121,12 @@ class GameDisplay:
         Internal: This method initializes the score frame
         :return: None
         """
+        import tkinter as tki
         self._score_frame = tki.Frame(self._root)
         self._score_frame.pack(side=tki.TOP)
 
         self.show_score("Not Set")
+        self._score_var.set("Score: " + str(self._score))
         self._score_label = tki.Label(self._score_frame,
                                       borderwidth=2,
                                       relief="ridge",
@@ -73,11 +142,52 @@ class GameDisplay:
         Internal: Starts the program: calls the main method and runs the GUI.
         :return: None
         """
-        self._root.after(500, self._game_control_thread.start)
-        self._root.after(1000, self._check_end)
+        if self._scheduler_mode == SCHEDULER_AFTER:
+            self._root.after(500, self._start_scheduler)
+        else:
+            self._root.after(500, self._game_control_thread.start)
+            self._root.after(1000, self._check_end)
+            self._root.after(500, self._present_loop)
 
         self._root.mainloop()
 
+    def _start_scheduler(self) -> None:
+        """
+        Internal: Starts the game as a session stepped by a TickScheduler
+        on the tkinter thread
+        :return: None
+        """
+        self._session = snake_main.GameSession(self, self._args)
+        self._scheduler = TickScheduler(self._root, self._tick, self.delay, self._late_policy)
+        self._scheduler.start()
+
+    def _tick(self) -> bool:
+        """
+        Internal: plays one round, closes the window once the game has finished
+        :return: False when there are no more rounds to play
+        """
+        if self._session.step():
+            return True
+        self._root.after(1000, self._root.destroy)
+        return False
+
+    def get_tick_stats(self) -> Optional[Dict[str, float]]:
+        """
+        This method returns the frame time statistics of the tick scheduler,
+        see TickScheduler.get_stats
+        :return: None when the game does not run from the event loop
+        """
+        if self._scheduler is None:
+            return None
+        return self._scheduler.get_stats()
+
+    def get_frame_stats(self) -> Dict[str, int]:
+        """
+        This method returns how many frames were published, presented and dropped
+        :return: see FrameBuffer.get_stats
+        """
+        return self._frames.get_stats()
+
     def _check_end(self) -> None:
         """
         Internal: This methods checks if the game has finished
@@ -95,18 +205,22 @@ class GameDisplay:
         :return:None
         """
         if e.keysym in ["Left", "Right", "Up", "Down"]:
-            self.key_click = e.keysym
-            self._key_click_round = self._round_num
+            self._keys.push(e.keysym, self._round_num)
 
     def get_key_clicked(self) -> Optional[str]:
         """
-        This method returns which key is clicked
-        and also turns off the key clicked FLAG
+        This method returns the key to apply this round
+        and removes it from the key queue
         :return: None, or one of 'Left', 'Right', 'Up', 'Down'
         """
-        result = self.key_click
-        self.key_click = None
-        return result
+        return self._keys.pop(self._round_num)
+
+    def get_input_stats(self) -> Dict[str, float]:
+        """
+        This method returns the key press counts and press to applied latency
+        :return: see KeyQueue.get_stats
+        """
+        return self._keys.get_stats()
 
     def draw_cell(self, x: int, y: int, color: str) -> None:
         """
@@ -116,58 +230,69 @@ class GameDisplay:
         :param color: the color we wish to draw
         :return: None
         """
+        if self._viewport is not None and not self._viewport.contains(x, y):
+            return
         self._to_draw[x, y] = color
 
-    def _buffer_draw_cell(self, x: int, y: int, color: str) -> int:
+    def set_focus(self, x: int, y: int) -> None:
         """
-        Internal: internal method to draw the x,y cell in color
+        Tells the display where the snake's head is, so the viewport can follow it
         :param x: coordinate at x
         :param y: coordinate at y
-        :param color: the color we wish to draw
         :return: None
         """
-        if x < 0 or x >= self.width or \
-                y < 0 or y >= self.height:
-            raise ValueError(
-                "cell index out of bounds of the board: " + str((x, y)))
+        if self._viewport is not None:
+            self._viewport.follow(x, y)
 
-        # setting the coordinates of the board correctly,
-        # the y axis needs to point up.
-        # the following line adjusts this.
-        y = self.height - y
-        return self._canvas.create_rectangle(
-            x * CELL_SIZE, (y - 1) * CELL_SIZE, (x + 1) * CELL_SIZE,
-            y * CELL_SIZE,
-            fill=color, outline=color)
-
-    def _update_drawing(self) -> None:
+    def _publish_frame(self) -> None:
         """
-        Internal: method to update drawing
+        Internal: publishes the back buffer as this round's frame
+        and starts a new back buffer
         :return: None
         """
         if self.verbose:
             print(self._to_draw)
-        to_draw = {(x,y,color) for (x,y),color in self._to_draw.items()}
-        for rect in self._already_drawn:
-            if rect not in to_draw:
-                self._canvas.delete(self._already_drawn[rect])
-
-        cur_drawn: Dict[Tuple[int, int, str], int] = dict()
-        for (x, y), color in self._to_draw.items():
-            ind = self._already_drawn.get((x, y, color), None)
-            if ind is None:
-                ind = self._buffer_draw_cell(x, y, color)
-            cur_drawn[(x, y, color)] = ind
-
-        self._already_drawn = cur_drawn
+        cells = self._to_draw
+        if self._viewport is not None:
+            cells = self._viewport.to_screen(cells)
+        self._frames.publish(make_frame(self._round_num, cells, self._score))
         self._to_draw = dict()
 
+    def _present_loop(self) -> None:
+        """
+        Internal: draws the latest frame every refresh on the tkinter thread
+        :return: None
+        """
+        self._update_drawing()
+        self._root.after(self._present_interval, self._present_loop)
+
+    def _update_drawing(self) -> None:
+        """
+        Internal: method to update drawing, must run on the tkinter thread
+        :return: None
+        """
+        frame: Optional[Frame] = self._frames.take()
+        if frame is None:
+            return
+        profiler = self.profiler
+        if profiler is not None:
+            start = profiler.clock()
+        self._renderer.render(frame.cells)
+        self._score_var.set("Score: " + str(frame.score))
+        if profiler is not None:
+            profiler.record(PHASE_UPDATE_DRAWING, profiler.clock() - start)
+
     def end_round(self) -> None:
         """
         This method ends the current round.
         :return:None
         """
-        self._update_drawing()
+        self._publish_frame()
+        if self._scheduler_mode == SCHEDULER_AFTER:
+            # already on the tkinter thread, and the tick scheduler takes care of the timing
+            self._update_drawing()
+            self._round_num += 1
+            return
 
         self._round_start_time += self.delay
         now = time.time()
@@ -184,9 +309,20 @@ class GameDisplay:
         """
         if self.verbose:
             print(f'Score:{val}')
-        self._score_var.set("Score: " + str(val))
+        # shown with the frame of this round
+        self._score = val
 
         
+def format_stats(stats:Dict[str, float])->str:
+    return ' '.join(f'{name}={value:.3f}' if isinstance(value, float) else f'{name}={value}'
+                    for name, value in stats.items())
+
+
+def parse_size(text:str)->Tuple[int, int]:
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
 def parse_args(argv:List[str])->Namespace:
     parser = argparse.ArgumentParser(
         prog = 'game_display.py',
@@ -207,26 +343,119 @@ def parse_args(argv:List[str])->Namespace:
                         help='args.walls: Number of walls')
     parser.add_argument('-r', '--rounds', type=int, default=-1,
                         help='args.rounds: Number of rounds')
+    parser.add_argument('--spawn', choices=['legacy', 'free'], default='legacy',
+                        help='args.spawn: legacy waits for the drawn location to be valid, '
+                             'free places new apples and walls on random empty cells')
     parser.add_argument('-t', '--delay', type=int, default=ROUND_TIME,
                         help='Delay between rounds in milliseconds (not passed to game loop)')
     parser.add_argument('-v', '--verbose',
                         action='count', default=0,
                         help='Print helpful debugging information (not passed to game loop, can be used multiple times)')
-    return parser.parse_args(argv)
+    parser.add_argument('--headless',
+                        action='store_true',
+                        help='Run without a window and without delay between rounds (not passed to game loop)')
+    parser.add_argument('--render', choices=RENDER_MODES, default=RENDER_CANVAS,
+                        help='canvas draws an item per cell, bitmap draws one image and suits large boards (not passed to game loop)')
+    parser.add_argument('--cell-size', type=int, default=CELL_SIZE,
+                        help='Size of a board cell in pixels (not passed to game loop)')
+    parser.add_argument('--scheduler', choices=SCHEDULERS, default=SCHEDULER_THREAD,
+                        help='thread runs the game on a sleeping thread, after runs each round '
+                             'from the tkinter event loop (not passed to game loop)')
+    parser.add_argument('--late', choices=LATE_POLICIES, default=LATE_CATCH_UP,
+                        help='With --scheduler after, catch up on late rounds or drop them (not passed to game loop)')
+    parser.add_argument('--fps', type=int, default=DISPLAY_FPS,
+                        help='How often the window is redrawn, the game may run faster with a smaller --delay (not passed to game loop)')
+    parser.add_argument('--keys', choices=CONSUME_POLICIES, default=CONSUME_ONE,
+                        help='one applies a single queued key press per round, '
+                             'latest applies the newest and discards the rest (not passed to game loop)')
+    parser.add_argument('--key-buffer', type=int, default=KEY_QUEUE_SIZE,
+                        help='Most key presses waiting to be applied (not passed to game loop)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Time every phase of a round and print p50/p95/p99 per phase at exit (not passed to game loop)')
+    parser.add_argument('--record', default=None, metavar='FILE',
+                        help='Record a replay of the game to FILE, play it with replay_player.py (not passed to game loop)')
+    parser.add_argument('--trace', default=None, metavar='FILE',
+                        help='With --headless, write every frame to the trace FILE, view it with tester_viewer.py (not passed to game loop)')
+    parser.add_argument('--viewport', type=parse_size, default=None,
+                        help='Only show a WIDTHxHEIGHT window of cells around the snake (not passed to game loop)')
+    parser.add_argument('--margin', type=int, default=VIEWPORT_MARGIN,
+                        help='Cells kept between the snake and the viewport edge (not passed to game loop)')
+    args = parser.parse_args(argv)
+    if args.trace is not None and not args.headless:
+        parser.error("--trace needs --headless")
+    return args
 
 
 def setup_game(args:Namespace)->GameDisplay:
-    game_utils.set_random_seed(args.__dict__.pop('seed'))
+    seed = args.__dict__.pop('seed')
+    record = args.__dict__.pop('record')
+    trace = args.__dict__.pop('trace')
+    headless = args.__dict__.pop('headless')
+    if trace is not None and not headless:
+        raise ValueError("--trace needs --headless")
+    if record is not None and seed is None:
+        # a replay can only be played back from a known seed
+        seed = str(random.SystemRandom().getrandbits(32))
+    game_utils.set_random_seed(seed)
     game_utils.set_verbose(args.verbose)
     game_utils.set_size(width=args.width,
                               height=args.height)
-    return GameDisplay(width=args.width,
-                       height=args.height,
-                       delay=args.__dict__.pop('delay'),
-                       verbose=args.__dict__.pop('verbose'),
-                       args=args)
+    render = args.__dict__.pop('render')
+    cell_size = args.__dict__.pop('cell_size')
+    viewport = args.__dict__.pop('viewport')
+    margin = args.__dict__.pop('margin')
+    scheduler = args.__dict__.pop('scheduler')
+    late_policy = args.__dict__.pop('late')
+    fps = args.__dict__.pop('fps')
+    key_policy = args.__dict__.pop('keys')
+    key_queue_size = args.__dict__.pop('key_buffer')
+    profiler = Profiler() if args.__dict__.pop('profile') else None
+    if headless:
+        gd = HeadlessDisplay(width=args.width,
+                             height=args.height,
+                             delay=args.__dict__.pop('delay'),
+                             verbose=args.__dict__.pop('verbose'),
+                             args=args,
+                             profiler=profiler,
+                             trace=TraceWriter(trace, args.width, args.height)
+                             if trace is not None else None)
+    else:
+        gd = GameDisplay(width=args.width,
+                         height=args.height,
+                         delay=args.__dict__.pop('delay'),
+                         verbose=args.__dict__.pop('verbose'),
+                         args=args,
+                         render=render,
+                         cell_size=cell_size,
+                         viewport=viewport,
+                         margin=margin,
+                         scheduler=scheduler,
+                         late_policy=late_policy,
+                         fps=fps,
+                         key_policy=key_policy,
+                         key_queue_size=key_queue_size,
+                         profiler=profiler)
+    if record is not None:
+        # what is left in args is exactly what the game loop gets
+        gd.recorder = ReplayWriter(record, seed, dict(vars(args)))
+    return gd
 
 if __name__ == "__main__":
     args = parse_args(sys.argv[1:])
     gd = setup_game(args)
-    gd.start()
+    try:
+        gd.start()
+    finally:
+        if gd.recorder is not None:
+            gd.recorder.close()
+        if getattr(gd, 'trace', None) is not None:
+            gd.trace.close()
+    if gd.profiler is not None:
+        print(gd.profiler.report())
+    if isinstance(gd, GameDisplay):
+        stats = gd.get_tick_stats()
+        if stats is not None:
+            print(format_stats(stats))
+        stats = gd.get_input_stats()
+        if stats['presses']:
+            print(format_stats(stats))
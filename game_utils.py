@@ -6,47 +6,121 @@ from collections import namedtuple
 WIDTH = 40
 HEIGHT = 30
 
-random_array = [random.Random(),random.Random()]
-
 Size=namedtuple('Size', ['width', 'height'])
-size=Size(WIDTH,HEIGHT)
+
+
+class GameRandom:
+    """
+    Random data for a single game. Every instance has its own generators,
+    so many games can draw apples and walls in one process without
+    disturbing each other. A given seed produces the same data as the
+    module-level functions below.
+    """
+
+    def __init__(self, seed: Any = None, width: int = WIDTH, height: int = HEIGHT,
+                 verbose: bool = False) -> None:
+        self.random_array = [random.Random(), random.Random()]
+        self.size = Size(width, height)
+        self.verbose = verbose
+        self.set_random_seed(seed)
+
+    def get_random_apple_data(self) -> Tuple[int, int]:
+        """
+        This method returns randomly drawn data for the apple
+        :return: (x,y) - Random location on the board
+        """
+        x = self.random_array[0].randint(0, self.size.width - 1)
+        y = self.random_array[0].randint(0, self.size.height - 1)
+
+        if self.verbose:
+            print(f'Apple(x={x},y={y})')
+
+        return x, y
+
+    def get_random_wall_data(self) -> Tuple[int, int, str]:
+        """
+        This method returns randomly drawn data for the wall
+        :return: (x,y,direction) Random location, and direction
+        """
+        x = self.random_array[1].randint(0, self.size.width - 1)
+        y = self.random_array[1].randint(0, self.size.height - 1)
+        direction = self.random_array[1].choice(["Up","Down","Left","Right"])
+
+        if self.verbose:
+            print(f'Wall(x={x},y={y},direction={direction})')
+
+        return x, y, direction
+
+    def get_state(self) -> Tuple[Any, Any]:
+        """
+        The state of the apple and wall generators, for set_state
+        """
+        return self.random_array[0].getstate(), self.random_array[1].getstate()
+
+    def set_state(self, state: Tuple[Any, Any]) -> None:
+        """
+        Puts the generators back in a state returned by get_state
+        """
+        self.random_array[0].setstate(state[0])
+        self.random_array[1].setstate(state[1])
+
+    def set_size(self, width:int, height:int) -> None:
+        self.size = Size(width, height)
+
+    def set_verbose(self, flag:bool) -> None:
+        self.verbose = flag
+
+    def set_random_seed(self, val: Any) -> None:
+        """
+        Seeds the apple and wall generators, or reseeds them from the system if val is None
+        :param val:
+        :return:
+        """
+        if val is None:
+            self.random_array[0].seed()
+            self.random_array[1].seed()
+        else:
+            self.random_array[0].seed(f'apple{val}')
+            self.random_array[1].seed(f'wall{val}')
+
+
+_default_random = GameRandom()
+
+random_array = _default_random.random_array
+
+size=_default_random.size
 
 verbose=False
 
+def get_default_random() -> GameRandom:
+    """
+    Returns the GameRandom used by the module-level functions
+    """
+    return _default_random
+
 def get_random_apple_data() -> Tuple[int, int]:
     """
     This method returns randomly drawn data for the apple
     :return: (x,y) - Random location on the board
     """
-    x = random_array[0].randint(0, size.width - 1)
-    y = random_array[0].randint(0, size.height - 1)
-
-    if verbose:
-        print(f'Apple(x={x},y={y})')
-    
-    return x, y
+    return _default_random.get_random_apple_data()
 
 def get_random_wall_data() -> Tuple[int, int, str]:
     """
     This method returns randomly drawn data for the wall
     :return: (x,y,direction) Random location, and direction
     """
-    x = random_array[1].randint(0, size.width - 1)
-    y = random_array[1].randint(0, size.height - 1)
-    direction = random_array[1].choice(["Up","Down","Left","Right"])
-
-    if verbose:
-        print(f'Wall(x={x},y={y},direction={direction})')
-    
-    return x, y, direction
+    return _default_random.get_random_wall_data()
 
 def set_size(width:int, height:int) -> None:
     global size
     size=Size(width, height)
+    _default_random.size = size
 
 def set_verbose(flag:bool) -> None:
     global verbose
     verbose=flag
+    _default_random.verbose = flag
 
     
 def set_random_seed(val: Any) -> None:
@@ -55,9 +129,4 @@ def set_random_seed(val: Any) -> None:
     :param val:
     :return:
     """
-    if val is None:
-        random_array[0].seed()
-        random_array[1].seed()
-    else:
-        random_array[0].seed(f'apple{val}')
-        random_array[1].seed(f'wall{val}')
+    _default_random.set_random_seed(val)
@@ -0,0 +1,121 @@
+from typing import Any, Optional, Iterable, Iterator, Tuple, Dict
+
+from argparse import Namespace
+
+import snake_main
+from profiler import Profiler
+from replay import ReplayWriter
+from trace_file import TraceWriter
+
+
+class HeadlessDisplay:
+    """
+    A display with the same surface as game_display.GameDisplay that never
+    touches tkinter and never sleeps, so the game runs at full CPU speed.
+    """
+
+    def __init__(self, width: int, height: int, delay: int, verbose: int, args: Namespace,
+                 inputs: Optional[Iterable[Optional[str]]] = None,
+                 profiler: Optional[Profiler] = None,
+                 trace: Optional[TraceWriter] = None) -> None:
+        """
+        Creates a new headless display object and initializes it
+        :param width: board width
+        :param height: board height
+        :param delay: ignored, kept for GameDisplay compatibility
+        :param verbose: verbosity level, as in GameDisplay
+        :param args: the arguments passed on to snake_main.main_loop
+        :param inputs: optional keys returned by get_key_clicked, one per round
+        :param profiler: optional profiler the game records its phases to
+        :param trace: optional trace file that gets a frame every time the score is shown
+        """
+        self.width, self.height, self.verbose = width, height, verbose > 1
+        self._args = args
+        self._inputs: Optional[Iterator[Optional[str]]] = \
+            iter(inputs) if inputs is not None else None
+        self.profiler = profiler
+        # set by game_display.setup_game when the game is recorded
+        self.recorder: Optional[ReplayWriter] = None
+        self._round_num = 0
+        self._score: Any = None
+        self._to_draw: Dict[Tuple[int, int], str] = dict()
+        self._last_drawn: Dict[Tuple[int, int], str] = dict()
+        self.trace = trace
+        # cells drawn and key taken since the last frame written to the trace
+        self._trace_cells: Dict[Tuple[int, int], str] = dict()
+        self._trace_key: Optional[str] = None
+
+    def start(self) -> None:
+        """
+        Runs the game loop in the calling thread until it finishes.
+        :return: None
+        """
+        snake_main.main_loop(self, self._args)
+
+    def get_key_clicked(self) -> Optional[str]:
+        """
+        This method returns the next key from the inputs, if any were given
+        :return: None, or one of 'Left', 'Right', 'Up', 'Down'
+        """
+        if self._inputs is None:
+            return None
+        key = next(self._inputs, None)
+        if self.trace is not None:
+            self._trace_key = key
+        return key
+
+    def draw_cell(self, x: int, y: int, color: str) -> None:
+        """
+        Sets the cell at the given coordinates to draw in given color
+        :param x: coordinate at x
+        :param y: coordinate at y
+        :param color: the color we wish to draw
+        :return: None
+        """
+        self._to_draw[x, y] = color
+        if self.trace is not None:
+            self._trace_cells[x, y] = color
+
+    def set_focus(self, x: int, y: int) -> None:
+        """
+        Tells the display where the snake's head is, nothing to follow here
+        :return: None
+        """
+
+    def end_round(self) -> None:
+        """
+        This method ends the current round without waiting.
+        :return: None
+        """
+        if self.verbose:
+            print(self._to_draw)
+        self._last_drawn = self._to_draw
+        self._to_draw = dict()
+        self._round_num += 1
+
+    def show_score(self, val: Any) -> None:
+        """
+        This method stores the currently shown score.
+        :param val: the score we wish to display
+        :return: None
+        """
+        if self.verbose:
+            print(f'Score:{val}')
+        self._score = val
+        # the score shown before a game starts comes with nothing drawn, no frame for it
+        if self.trace is not None and self._trace_cells:
+            self.trace.write(val, self._trace_key, self._trace_cells)
+            self._trace_cells = dict()
+            self._trace_key = None
+
+    def get_score(self) -> Any:
+        """Returns the last score shown."""
+        return self._score
+
+    def get_round_num(self) -> int:
+        """Returns the number of rounds ended so far."""
+        return self._round_num
+
+    def get_last_drawn(self) -> Dict[Tuple[int, int], str]:
+        """Returns the cells drawn in the last ended round."""
+        return self._last_drawn
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+# one key per round, the rest wait for the following rounds
+CONSUME_ONE = "one"
+# the newest key wins and the older ones are discarded, as before the queue existed
+CONSUME_LATEST = "latest"
+CONSUME_POLICIES = [CONSUME_ONE, CONSUME_LATEST]
+
+KEY_QUEUE_SIZE = 8
+STATS_WINDOW = 1000
+
+
+class KeyQueue:
+    """
+    Bounded queue of key presses between the tkinter thread, that pushes
+    them as they happen, and the game thread, that pops the key of every
+    round. Presses keep their order across rounds; with CONSUME_ONE none is
+    lost unless more than maxsize are waiting, then new presses are refused.
+    For every applied key it records how many rounds and milliseconds passed
+    between the press and the round that used it.
+    """
+
+    def __init__(self, maxsize: int = KEY_QUEUE_SIZE, policy: str = CONSUME_ONE,
+                 clock: Callable[[], float] = time.perf_counter) -> None:
+        """
+        :param maxsize: most presses waiting at once
+        :param policy: one of CONSUME_POLICIES
+        :param clock: the clock used for the latencies
+        """
+        if policy not in CONSUME_POLICIES:
+            raise ValueError("unknown key policy: " + str(policy))
+        if maxsize < 1:
+            raise ValueError("key queue size must be positive: " + str(maxsize))
+        self._maxsize = maxsize
+        self._policy = policy
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (key, round pressed in, press time)
+        self._keys: Deque[Tuple[str, int, float]] = deque()
+        self._presses = 0
+        self._applied = 0
+        self._discarded = 0
+        self._overflow = 0
+        self._latency_rounds: Deque[int] = deque(maxlen=STATS_WINDOW)
+        self._latency_time: Deque[float] = deque(maxlen=STATS_WINDOW)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def push(self, key: str, round_num: int) -> bool:
+        """
+        Adds a key press
+        :param key: the key pressed
+        :param round_num: the round being played when it was pressed
+        :return: False if the queue was full and the press was refused
+        """
+        with self._lock:
+            self._presses += 1
+            if len(self._keys) >= self._maxsize:
+                self._overflow += 1
+                return False
+            self._keys.append((key, round_num, self._clock()))
+            return True
+
+    def pop(self, round_num: int) -> Optional[str]:
+        """
+        Takes the key for a round according to the policy
+        :param round_num: the round the key is applied in
+        :return: None if no key is waiting
+        """
+        with self._lock:
+            if not self._keys:
+                return None
+            if self._policy == CONSUME_LATEST:
+                self._discarded += len(self._keys) - 1
+                key, pressed_round, pressed_at = self._keys.pop()
+                self._keys.clear()
+            else:
+                key, pressed_round, pressed_at = self._keys.popleft()
+            self._applied += 1
+            self._latency_rounds.append(round_num - pressed_round)
+            self._latency_time.append(self._clock() - pressed_at)
+            return key
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Returns input statistics: presses, applied, discarded (by CONSUME_LATEST),
+        overflow (refused while full), waiting, and over the last STATS_WINDOW
+        applied keys latency_rounds_mean/latency_rounds_max and
+        latency_ms_mean/latency_ms_p99/latency_ms_max
+        """
+        with self._lock:
+            stats: Dict[str, float] = {'presses': self._presses, 'applied': self._applied,
+                                       'discarded': self._discarded, 'overflow': self._overflow,
+                                       'waiting': len(self._keys)}
+            rounds = list(self._latency_rounds) or [0]
+            times = sorted(self._latency_time) or [0.0]
+        stats['latency_rounds_mean'] = sum(rounds) / len(rounds)
+        stats['latency_rounds_max'] = max(rounds)
+        stats['latency_ms_mean'] = sum(times) / len(times) * 1000
+        stats['latency_ms_p99'] = times[min(len(times) - 1, int(len(times) * 0.99))] * 1000
+        stats['latency_ms_max'] = times[-1] * 1000
+        return stats
@@ -0,0 +1,249 @@
+import random
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+KIND_SNAKE = "snake"
+KIND_WALL = "wall"
+KIND_APPLE = "apple"
+
+# changes to a FreeCells, as (operation, key, value) entries
+_SET_INDEX = 0  # _index[key] = value
+_SET_COUNT = 1  # _counts[key] = value
+_SET_CELL = 2   # _cells[key] = value
+_APPEND = 3     # _cells.append(value)
+_POP = 4        # _cells.pop()
+# value of _SET_INDEX and _SET_COUNT that deletes the key
+_MISSING = object()
+# changes logged since the last state was taken before the log is folded into a new state
+LOG_LIMIT = 4096
+
+
+def _apply(cells: list, index: dict, counts: dict, entry: tuple) -> tuple:
+    """
+    Makes one change to the lists of a free cell index
+    :return: the entry that undoes it
+    """
+    operation, key, value = entry
+    if operation == _SET_CELL:
+        old = cells[key]
+        cells[key] = value
+        return _SET_CELL, key, old
+    if operation == _APPEND:
+        cells.append(value)
+        return _POP, None, None
+    if operation == _POP:
+        return _APPEND, None, cells.pop()
+    table = index if operation == _SET_INDEX else counts
+    old = table.get(key, _MISSING)
+    if value is _MISSING:
+        del table[key]
+    else:
+        table[key] = value
+    return operation, key, old
+
+
+class FreeCellsState:
+    """
+    A state of a FreeCells, as returned by get_state. The states of one index
+    form a tree rooted at its current state, every other state keeps the
+    changes that turn the state of its parent into its own (Baker's trick).
+    Restoring a state makes the changes on the path to it and turns the path
+    around, so it costs time linear in the cells that changed in between,
+    not in the size of the board. Pickling or copying a state copies the
+    whole index, as the plain tuple set_state also accepts.
+    """
+    __slots__ = ('owner', 'parent', 'changes', 'base')
+
+    def __init__(self, owner: 'FreeCells') -> None:
+        self.owner = owner
+        self.parent: Optional[FreeCellsState] = None
+        self.changes: Optional[List[tuple]] = None
+        # a full copy of the state, kept by the root of a tree its index left
+        self.base: Optional[Tuple[tuple, tuple]] = None
+
+    def __reduce__(self) -> Tuple[Any, tuple]:
+        return tuple, (self.owner._copy_state(self),)
+
+
+class FreeCells:
+    """
+    Index of the empty cells of a board, kept up to date by SnakeGame through
+    occupy and release, that picks a uniformly random empty cell in constant time.
+    A cell is empty while no snake part, wall or apple covers it.
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        self._width = width
+        self._height = height
+        self._cells: List[Tuple[int, int]] = [(x, y) for x in range(width) for y in range(height)]
+        self._index: Dict[Tuple[int, int], int] = {cell: i for i, cell in enumerate(self._cells)}
+        self._counts: Dict[Tuple[int, int], int] = {}
+        # root of the tree of states taken, and the undo entries of the changes
+        # made since; no changes are logged before the first state is taken
+        self._state: Optional[FreeCellsState] = None
+        self._log: List[tuple] = []
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # a copy starts without the states taken from this index
+        state = self.__dict__.copy()
+        state['_state'] = None
+        state['_log'] = []
+        return state
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    def __contains__(self, cell) -> bool:
+        return cell in self._index
+
+    def occupy(self, cell: Tuple[int, int], kind: str) -> None:
+        """
+        Called when an object of the given kind starts covering the cell.
+        """
+        if len(self._log) > LOG_LIMIT:
+            self.get_state()
+        count = self._counts.get(cell, 0)
+        self._counts[cell] = count + 1
+        if self._state is not None:
+            self._log.append((_SET_COUNT, cell, count or _MISSING))
+        if count == 0:
+            self._remove(cell)
+
+    def release(self, cell: Tuple[int, int], kind: str) -> None:
+        """
+        Called when an object of the given kind stops covering the cell.
+        """
+        if len(self._log) > LOG_LIMIT:
+            self.get_state()
+        count = self._counts[cell] - 1
+        if self._state is not None:
+            self._log.append((_SET_COUNT, cell, count + 1))
+        if count:
+            self._counts[cell] = count
+        else:
+            del self._counts[cell]
+            self._add(cell)
+
+    def get_state(self) -> FreeCellsState:
+        """
+        The current state of the index, for set_state, in constant time.
+        It shares the index's lists instead of copying them (see FreeCellsState),
+        and keeps the order of the cells, which decides which cell sample draws.
+        """
+        if self._state is None or self._log:
+            state = FreeCellsState(self)
+            if self._state is not None:
+                self._log.reverse()
+                self._state.changes = self._log
+                self._state.parent = state
+                self._log = []
+            self._state = state
+        return self._state
+
+    def set_state(self, state: Union[FreeCellsState, Tuple[tuple, tuple]]) -> None:
+        """
+        Puts the index back in a state returned by get_state, or in a copy of
+        one, a (cells, counts pairs) tuple. Copies and states of other indexes
+        are restored in time linear in the size of the board.
+        """
+        if isinstance(state, FreeCellsState):
+            root = state
+            while root.parent is not None:
+                root = root.parent
+            if root is self._state:
+                self._undo_log()
+                self._reroot(state)
+                return
+            state = state.owner._copy_state(state)
+        if self._state is not None:
+            # the states taken so far keep a copy to start from
+            self.get_state().base = tuple(self._cells), tuple(self._counts.items())
+            self._state = None
+        cells, counts = state
+        self._cells = list(cells)
+        self._index = {cell: i for i, cell in enumerate(self._cells)}
+        self._counts = dict(counts)
+
+    def sample(self, rnd: random.Random) -> Optional[Tuple[int, int]]:
+        """
+        Returns a uniformly random empty cell, or None if the board is full.
+        :param rnd: the generator to draw from
+        """
+        if not self._cells:
+            return None
+        return self._cells[rnd.randrange(len(self._cells))]
+
+    def _undo_log(self) -> None:
+        """
+        Internal: undoes the logged changes, back to the root state
+        """
+        for entry in reversed(self._log):
+            _apply(self._cells, self._index, self._counts, entry)
+        self._log = []
+
+    def _reroot(self, state: FreeCellsState) -> None:
+        """
+        Internal: moves the index from the root state to a state of its tree,
+        which becomes the root
+        """
+        path = []
+        while state.parent is not None:
+            path.append(state)
+            state = state.parent
+        for state in reversed(path):
+            undo = [_apply(self._cells, self._index, self._counts, entry)
+                    for entry in state.changes]
+            undo.reverse()
+            parent = state.parent
+            parent.changes = undo
+            parent.parent = state
+            state.changes = None
+            state.parent = None
+        self._state = state
+
+    def _copy_state(self, state: FreeCellsState) -> Tuple[tuple, tuple]:
+        """
+        Internal: copies a state of this index without touching the index
+        """
+        path = []
+        while state.parent is not None:
+            path.append(state)
+            state = state.parent
+        if state.base is not None:
+            cells, counts = list(state.base[0]), dict(state.base[1])
+            index = {cell: i for i, cell in enumerate(cells)}
+        else:
+            cells, index, counts = list(self._cells), self._index.copy(), self._counts.copy()
+            for entry in reversed(self._log):
+                _apply(cells, index, counts, entry)
+        for state in reversed(path):
+            for entry in state.changes:
+                _apply(cells, index, counts, entry)
+        return tuple(cells), tuple(counts.items())
+
+    def _add(self, cell: Tuple[int, int]) -> None:
+        """
+        Internal: puts an on-board cell back in the index
+        """
+        x, y = cell
+        if 0 <= x < self._width and 0 <= y < self._height:
+            if self._state is not None:
+                self._log += (_SET_INDEX, cell, _MISSING), (_POP, None, None)
+            self._index[cell] = len(self._cells)
+            self._cells.append(cell)
+
+    def _remove(self, cell: Tuple[int, int]) -> None:
+        """
+        Internal: removes a cell from the index by swapping in the last cell
+        """
+        index = self._index.pop(cell, None)
+        if index is None:
+            return
+        last = self._cells.pop()
+        logging = self._state is not None
+        if logging:
+            self._log += (_SET_INDEX, cell, index), (_APPEND, None, last)
+        if index < len(self._cells):
+            if logging:
+                self._log += (_SET_CELL, index, cell), (_SET_INDEX, last, len(self._cells))
+            self._cells[index] = last
+            self._index[last] = index
@@ -0,0 +1,115 @@
+import time
+from typing import Callable, Dict, List, Tuple
+
+# every power of two is split into this many buckets, about 6% resolution
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """
+    Log-linear histogram of non negative integers (nanoseconds here).
+    Recording is a couple of integer operations and a dict update, the
+    memory used only grows with the number of distinct magnitudes.
+    """
+
+    def __init__(self) -> None:
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        """
+        Adds a value to the histogram
+        """
+        if value < SUB_BUCKETS:
+            bucket = max(0, value)
+        else:
+            shift = value.bit_length() - SUB_BUCKET_BITS - 1
+            bucket = (shift << SUB_BUCKET_BITS) + (value >> shift)
+        self._counts[bucket] = self._counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @staticmethod
+    def _bucket_value(bucket: int) -> float:
+        """
+        Internal: the middle of the range of values that fall in bucket
+        """
+        if bucket < SUB_BUCKETS:
+            return bucket
+        shift = (bucket >> SUB_BUCKET_BITS) - 1
+        low = (bucket - (shift << SUB_BUCKET_BITS)) << shift
+        return low + ((1 << shift) - 1) / 2
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns the value below which percent of the recorded values are
+        :param percent: between 0 and 100
+        """
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for bucket in sorted(self._counts):
+            seen += self._counts[bucket]
+            if seen >= rank:
+                return min(self._bucket_value(bucket), self.max)
+        return self.max
+
+
+class Profiler:
+    """
+    Collects the time spent in named phases of a round into histograms.
+    Code that supports profiling keeps an optional profiler, checks it for
+    None and only then reads the clock, so without a profiler it costs a
+    single comparison per round.
+    """
+
+    def __init__(self, clock: Callable[[], int] = time.perf_counter_ns) -> None:
+        """
+        :param clock: integer nanosecond clock
+        """
+        self.clock = clock
+        self._phases: Dict[str, Histogram] = {}
+
+    def record(self, phase: str, duration: int) -> None:
+        """
+        Adds the duration of one run of phase
+        :param phase: name of the phase
+        :param duration: nanoseconds, as a difference of two clock() calls
+        """
+        histogram = self._phases.get(phase)
+        if histogram is None:
+            histogram = self._phases.setdefault(phase, Histogram())
+        histogram.record(duration)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns count, mean, max and the PERCENTILES of every phase, times in microseconds
+        """
+        result: Dict[str, Dict[str, float]] = {}
+        for phase, histogram in list(self._phases.items()):
+            stats: Dict[str, float] = {'count': histogram.count,
+                                       'mean': histogram.total / max(1, histogram.count) / 1000}
+            for percent in PERCENTILES:
+                stats[f'p{percent}'] = histogram.percentile(percent) / 1000
+            stats['max'] = histogram.max / 1000
+            result[phase] = stats
+        return result
+
+    def report(self) -> str:
+        """
+        Returns the summary as a table, one phase per line
+        """
+        columns = ['count', 'mean'] + [f'p{percent}' for percent in PERCENTILES] + ['max']
+        lines: List[str] = [f"{'phase (us)':<16}" + ''.join(f'{name:>10}' for name in columns)]
+        rows: List[Tuple[str, Dict[str, float]]] = sorted(self.summary().items())
+        for phase, stats in rows:
+            lines.append(f'{phase:<16}' + f"{stats['count']:>10}" +
+                         ''.join(f'{stats[name]:>10.1f}' for name in columns[1:]))
+        return '\n'.join(lines)
@@ -0,0 +1,246 @@
+import sys
+import os
+import time
+import argparse
+from argparse import Namespace
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import game_utils
+import snake_main
+from batch_runner import POLICIES, MAX_ROUNDS
+from headless_display import HeadlessDisplay
+from replay import Replay, ReplayWriter, read_replay, replay_keys, replay_rounds
+from snake_game import SPAWN_LEGACY, SPAWN_MODES
+from trace_diff import find_divergence
+from trace_file import TraceReader, encode_frame, encode_header, write_index
+
+# A case is a replay NAME.rpl (seed, board arguments and the key of every
+# round) next to the trace NAME.trace the game is expected to produce.
+CASE_SUFFIX = ".rpl"
+TRACE_SUFFIX = ".trace"
+CHUNK_SIZE = 16
+
+# diff_round is the first differing round, None when the case passed or could not run
+CaseResult = namedtuple('CaseResult', ['name', 'passed', 'diff_round', 'message'])
+
+
+class TraceBuffer:
+    """
+    Collects the trace of a game in memory, readable like a TraceReader.
+    """
+
+    def __init__(self, width: Optional[int] = None, height: Optional[int] = None) -> None:
+        """
+        :param width: board width saved in the trace header, no header if width or height is None
+        :param height: board height saved in the trace header
+        """
+        self.width = width
+        self.height = height
+        self._lines: List[bytes] = []
+
+    def write(self, score: Any, key: Optional[str], cells: Dict[Tuple[int, int], str]) -> None:
+        self._lines.append(encode_frame(score, key, cells))
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def raw(self, num: int) -> bytes:
+        return self._lines[num]
+
+    def save(self, path: str) -> None:
+        """
+        Writes the trace and its index to path
+        """
+        offsets = []
+        size = 0
+        with open(path, 'wb') as f:
+            if self.width is not None and self.height is not None:
+                header = encode_header(self.width, self.height)
+                f.write(header)
+                size = len(header)
+            for line in self._lines:
+                offsets.append(size)
+                f.write(line)
+                size += len(line)
+        write_index(path, offsets, size)
+
+
+def play_case(replay: Replay, trace: Any, recorder: Optional[ReplayWriter] = None) -> None:
+    """
+    Plays the games of a case headlessly with snake_main.GameSession, as
+    replay_player does: a replay recorded with game_display.py --record -r N
+    holds every game of the session, not only the first.
+
+    :param replay: The case's seed, main_loop arguments and keys.
+    :param trace: Gets a frame every time the score is shown.
+    :param recorder: Optional replay.ReplayWriter the keys are recorded to.
+    """
+    args = Namespace(**replay.args)
+    # cases without a number of rounds were made by make_case and hold a single game
+    if not hasattr(args, 'rounds'):
+        args.rounds = 0
+    rng = game_utils.GameRandom(replay.seed, args.width, args.height)
+    gd = HeadlessDisplay(args.width, args.height, 0, 0, args,
+                         inputs=replay_keys(replay), trace=trace)
+    gd.recorder = recorder
+    session = snake_main.GameSession(gd, args, rng)
+    for _ in range(replay_rounds(replay)):
+        if not session.step():
+            break
+
+
+def check_case(case_dir: str, name: str, actual_dir: Optional[str] = None) -> CaseResult:
+    """
+    Plays a case and compares its trace with the expected one.
+
+    :param actual_dir: Where to write the trace of a failing case, to open it in tester_viewer.
+    :return: The CaseResult of the case.
+    """
+    base = os.path.join(case_dir, name)
+    try:
+        replay = read_replay(base + CASE_SUFFIX)
+        actual = TraceBuffer(replay.args['width'], replay.args['height'])
+        play_case(replay, actual)
+        diff = find_divergence(actual, TraceReader(base + TRACE_SUFFIX))
+    except Exception as e:
+        return CaseResult(name, False, None, f'{type(e).__name__}: {e}')
+    if diff is None:
+        return CaseResult(name, True, None, '')
+    if actual_dir is not None:
+        actual.save(os.path.join(actual_dir, name + TRACE_SUFFIX))
+    return CaseResult(name, False, diff.round_num,
+                      f'score actual {diff.actual_score}, expected {diff.expected_score}, '
+                      f'{len(diff.cells)} cells differ')
+
+
+def update_case(case_dir: str, name: str) -> None:
+    """
+    Replaces the expected trace of a case by what the game produces now.
+    """
+    base = os.path.join(case_dir, name)
+    replay = read_replay(base + CASE_SUFFIX)
+    trace = TraceBuffer(replay.args['width'], replay.args['height'])
+    play_case(replay, trace)
+    trace.save(base + TRACE_SUFFIX)
+
+
+def make_case(case_dir: str, name: str, seed: Any, args: Dict[str, Any],
+              policy: str = 'random', max_rounds: int = MAX_ROUNDS) -> None:
+    """
+    Plays a new game with keys from a batch_runner policy and stores it as a case.
+
+    :param args: width, height, apples, walls, debug, spawn and rounds of the game,
+        rounds as in game_display.py, 0 for a single game.
+    """
+    base = os.path.join(case_dir, name)
+    keys = POLICIES[policy](seed)
+    # a replay with max_rounds keys; the recorder keeps those the game used
+    replay = Replay(str(seed), args, [(next(keys), 1) for _ in range(max_rounds)])
+    trace = TraceBuffer(args['width'], args['height'])
+    with ReplayWriter(base + CASE_SUFFIX, seed, args) as recorder:
+        play_case(replay, trace, recorder)
+    trace.save(base + TRACE_SUFFIX)
+
+
+def find_cases(case_dir: str) -> List[str]:
+    """
+    Returns the names of the cases in case_dir
+    """
+    return sorted(entry[:-len(CASE_SUFFIX)] for entry in os.listdir(case_dir)
+                  if entry.endswith(CASE_SUFFIX))
+
+
+def run_chunk(case_dir: str, names: List[str], actual_dir: Optional[str],
+              update: bool) -> List[CaseResult]:
+    """
+    Internal: checks (or updates) a chunk of cases in a worker process.
+    """
+    if update:
+        for name in names:
+            update_case(case_dir, name)
+        return [CaseResult(name, True, None, 'updated') for name in names]
+    return [check_case(case_dir, name, actual_dir) for name in names]
+
+
+def run_cases(case_dir: str, names: List[str], workers: Optional[int] = None,
+              chunk_size: int = CHUNK_SIZE, actual_dir: Optional[str] = None,
+              update: bool = False) -> Iterator[CaseResult]:
+    """
+    Checks the cases over a pool of processes.
+    Results are yielded as soon as their chunk completes, not in name order.
+
+    :param workers: Number of worker processes, defaults to the number of cores.
+    :param update: Rewrite the expected traces instead of checking them.
+    :return: Iterator of CaseResult.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_chunk, case_dir, names[i:i + chunk_size],
+                                   actual_dir, update)
+                   for i in range(0, len(names), chunk_size)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def parse_args(argv: List[str]) -> Namespace:
+    parser = argparse.ArgumentParser(
+        prog='regression_runner.py',
+        description='Checks snake games against recorded golden traces',
+    )
+    parser.add_argument('cases',
+                        help='Directory of NAME.rpl / NAME.trace cases')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='Number of worker processes')
+    parser.add_argument('--actual-dir', default=None,
+                        help='Write the traces of failing cases here, to compare in tester_viewer.py')
+    parser.add_argument('--update', action='store_true',
+                        help='Rewrite the expected traces from the current game instead of checking')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='Only print failures and the summary')
+    parser.add_argument('--make', type=int, default=None, metavar='COUNT',
+                        help='Create COUNT new cases, seeded from --seed on, instead of checking')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='First seed of the cases made with --make')
+    parser.add_argument('-x', '--width', type=int, default=game_utils.WIDTH,
+                        help='Board width of the cases made with --make')
+    parser.add_argument('-y', '--height', type=int, default=game_utils.HEIGHT,
+                        help='Board height of the cases made with --make')
+    parser.add_argument('-a', '--apples', type=int, default=3,
+                        help='Number of apples of the cases made with --make')
+    parser.add_argument('-w', '--walls', type=int, default=2,
+                        help='Number of walls of the cases made with --make')
+    parser.add_argument('-m', '--max-rounds', type=int, default=1000,
+                        help='Most rounds of the cases made with --make')
+    parser.add_argument('--spawn', choices=SPAWN_MODES, default=SPAWN_LEGACY,
+                        help='How new apples and walls are placed in the cases made with --make')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    start = time.perf_counter()
+    if args.make is not None:
+        os.makedirs(args.cases, exist_ok=True)
+        game_args = {'width': args.width, 'height': args.height, 'apples': args.apples,
+                     'walls': args.walls, 'debug': False, 'spawn': args.spawn, 'rounds': 0}
+        for seed in range(args.seed, args.seed + args.make):
+            make_case(args.cases, f'case{seed}', seed, game_args, max_rounds=args.max_rounds)
+        print(f'made {args.make} cases in {time.perf_counter() - start:.2f}s')
+        sys.exit(0)
+    if args.actual_dir is not None:
+        os.makedirs(args.actual_dir, exist_ok=True)
+    passed = failed = 0
+    for result in run_cases(args.cases, find_cases(args.cases), args.workers,
+                            actual_dir=args.actual_dir, update=args.update):
+        if result.passed:
+            passed += 1
+            if not args.quiet:
+                print(f'ok   {result.name} {result.message}')
+        else:
+            failed += 1
+            where = f'round {result.diff_round}: ' if result.diff_round is not None else ''
+            print(f'FAIL {result.name} {where}{result.message}')
+    print(f'{passed} passed, {failed} failed in {time.perf_counter() - start:.2f}s '
+          f'({args.workers} workers)')
+    sys.exit(1 if failed else 0)
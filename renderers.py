@@ -0,0 +1,187 @@
+import abc
+from typing import Any, Dict, List, Optional, Tuple
+
+HIDDEN = "hidden"
+NORMAL = "normal"
+BACKGROUND = "white"
+
+RENDER_CANVAS = "canvas"
+RENDER_BITMAP = "bitmap"
+RENDER_MODES = [RENDER_CANVAS, RENDER_BITMAP]
+
+
+class Renderer(abc.ABC):
+    """
+    Base class of the board renderers. It remembers what is on screen and
+    passes only the cells whose color changed on to _apply.
+    """
+
+    def __init__(self, width: int, height: int, cell_size: int) -> None:
+        self.width, self.height, self.cell_size = width, height, cell_size
+        self._shown: Dict[Tuple[int, int], str] = dict()
+
+    def render(self, to_draw: Dict[Tuple[int, int], str]) -> int:
+        """
+        Makes the screen show exactly the given cells.
+        The renderer keeps to_draw, so the caller must not change it afterwards.
+        :param to_draw: the color of every cell to show, other cells are cleared
+        :return: the number of cells whose color changed
+        """
+        changes: List[Tuple[Tuple[int, int], Optional[str]]] = []
+        for cell in self._shown:
+            if cell not in to_draw:
+                changes.append((cell, None))
+        for cell, color in to_draw.items():
+            if self._shown.get(cell) != color:
+                self._check_bounds(cell)
+                changes.append((cell, color))
+        self._apply(changes)
+        self._shown = to_draw
+        return len(changes)
+
+    @abc.abstractmethod
+    def _apply(self, changes: List[Tuple[Tuple[int, int], Optional[str]]]) -> None:
+        """
+        Internal: updates the screen
+        :param changes: (cell, color) pairs, color is None for cells to clear
+        :return: None
+        """
+
+    def _check_bounds(self, cell: Tuple[int, int]) -> None:
+        """
+        Internal: raises ValueError if the cell is not on the board
+        """
+        x, y = cell
+        if x < 0 or x >= self.width or \
+                y < 0 or y >= self.height:
+            raise ValueError(
+                "cell index out of bounds of the board: " + str((x, y)))
+
+
+class CanvasRenderer(Renderer):
+    """
+    Draws the board on a tkinter canvas keeping a single rectangle item per
+    cell. An item is created the first time its cell is drawn, and from then
+    on it is only recoloured or hidden, so the number of canvas calls per
+    frame follows the number of cells that changed colour.
+    """
+
+    def __init__(self, canvas: Any, width: int, height: int, cell_size: int) -> None:
+        super().__init__(width, height, cell_size)
+        self._canvas = canvas
+        self._items: Dict[Tuple[int, int], int] = dict()
+
+    def _apply(self, changes: List[Tuple[Tuple[int, int], Optional[str]]]) -> None:
+        for cell, color in changes:
+            item = self._items.get(cell)
+            if color is None:
+                self._canvas.itemconfig(item, state=HIDDEN)
+            elif item is None:
+                self._items[cell] = self._create_cell(cell, color)
+            else:
+                self._canvas.itemconfig(item, fill=color, outline=color, state=NORMAL)
+
+    def _create_cell(self, cell: Tuple[int, int], color: str) -> int:
+        """
+        Internal: creates the rectangle item of the x,y cell in color
+        :param cell: (x, y) board coordinates
+        :param color: the color we wish to draw
+        :return: the canvas item id
+        """
+        x, y = cell
+        # setting the coordinates of the board correctly,
+        # the y axis needs to point up.
+        # the following line adjusts this.
+        y = self.height - y
+        return self._canvas.create_rectangle(
+            x * self.cell_size, (y - 1) * self.cell_size, (x + 1) * self.cell_size,
+            y * self.cell_size,
+            fill=color, outline=color)
+
+
+class BitmapRenderer(Renderer):
+    """
+    Draws the board into a single tkinter PhotoImage, cell_size pixels per
+    cell. Changed cells are grouped by row and every run of neighbouring
+    cells with the same new color is written with one put call.
+    """
+
+    def __init__(self, image: Any, width: int, height: int, cell_size: int,
+                 background: str = BACKGROUND) -> None:
+        super().__init__(width, height, cell_size)
+        self._image = image
+        self._background = background
+        image.put(background, to=(0, 0, width * cell_size, height * cell_size))
+
+    def _apply(self, changes: List[Tuple[Tuple[int, int], Optional[str]]]) -> None:
+        rows: Dict[int, Dict[int, str]] = dict()
+        for (x, y), color in changes:
+            rows.setdefault(y, dict())[x] = self._background if color is None else color
+        for y, row in rows.items():
+            xs = sorted(row)
+            start = end = xs[0]
+            for x in xs[1:]:
+                if x == end + 1 and row[x] == row[start]:
+                    end = x
+                else:
+                    self._fill_run(start, end, y, row[start])
+                    start = end = x
+            self._fill_run(start, end, y, row[start])
+
+    def _fill_run(self, start: int, end: int, y: int, color: str) -> None:
+        """
+        Internal: fills the cells start..end (inclusive) of row y with color
+        """
+        # the y axis needs to point up.
+        top = (self.height - 1 - y) * self.cell_size
+        self._image.put(color, to=(start * self.cell_size, top,
+                                   (end + 1) * self.cell_size, top + self.cell_size))
+
+
+class Viewport:
+    """
+    A window of view_width x view_height cells of a larger board. It follows
+    a focus cell (the snake's head), scrolling only when the focus comes
+    closer than margin cells to the window's edge.
+    """
+
+    def __init__(self, board_width: int, board_height: int,
+                 view_width: int, view_height: int, margin: int) -> None:
+        self.board_width, self.board_height = board_width, board_height
+        self.width = min(view_width, board_width)
+        self.height = min(view_height, board_height)
+        self.margin_x = max(0, min(margin, (self.width - 1) // 2))
+        self.margin_y = max(0, min(margin, (self.height - 1) // 2))
+        # board coordinates of the bottom left cell of the window
+        self.x, self.y = 0, 0
+
+    def follow(self, x: int, y: int) -> None:
+        """
+        Scrolls the window so the given cell is at least margin cells inside it
+        """
+        self.x = self._scroll(self.x, x, self.width, self.margin_x, self.board_width)
+        self.y = self._scroll(self.y, y, self.height, self.margin_y, self.board_height)
+
+    @staticmethod
+    def _scroll(start: int, focus: int, size: int, margin: int, board_size: int) -> int:
+        """
+        Internal: new start of the window along one axis
+        """
+        if focus < start + margin:
+            start = focus - margin
+        elif focus >= start + size - margin:
+            start = focus - size + margin + 1
+        return max(0, min(start, board_size - size))
+
+    def contains(self, x: int, y: int) -> bool:
+        """
+        Checks if the board cell is inside the window
+        """
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+    def to_screen(self, cells: Dict[Tuple[int, int], str]) -> Dict[Tuple[int, int], str]:
+        """
+        Maps board cells inside the window to window coordinates, dropping the rest
+        """
+        return {(x - self.x, y - self.y): color
+                for (x, y), color in cells.items() if self.contains(x, y)}
@@ -0,0 +1,166 @@
+import json
+import threading
+from collections import namedtuple
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+# File layout: MAGIC, VERSION, varint header length, JSON header
+# ({"seed": ..., "args": {...}}), then one varint per run of rounds that
+# got the same key: run length << KEY_BITS | index of the key in KEYS.
+MAGIC = b"SNKR"
+VERSION = 1
+KEYS = [None, "Up", "Down", "Left", "Right"]
+KEY_BITS = 3
+FLUSH_SIZE = 1 << 16
+
+_KEY_CODES = {key: code for code, key in enumerate(KEYS)}
+
+Replay = namedtuple('Replay', ['seed', 'args', 'runs'])
+
+
+def write_varint(buffer: bytearray, value: int) -> None:
+    """
+    Appends a non negative integer, 7 bits per byte, low bits first
+    """
+    while value > 0x7f:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """
+    Reads the integer written by write_varint at pos
+    :return: the value and the position after it
+    """
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class ReplayWriter:
+    """
+    Records the key of every round of a seeded game. Rounds are run length
+    encoded in memory and written to the file in blocks of FLUSH_SIZE bytes,
+    so recording a round is a comparison and, once per run, a few bytes.
+    record and close may be called from different threads: the GUI closes
+    the writer while the game thread may still be recording, and rounds
+    recorded after close are dropped.
+    """
+
+    def __init__(self, path: str, seed: Any, args: Dict[str, Any],
+                 flush_size: int = FLUSH_SIZE) -> None:
+        """
+        :param path: file to write the replay to
+        :param seed: the seed given to game_utils.set_random_seed, must not be None
+        :param args: the arguments passed to snake_main.main_loop
+        :param flush_size: bytes kept in memory before writing them out
+        """
+        if seed is None:
+            raise ValueError("a replay needs a fixed seed")
+        self._file: Optional[BinaryIO] = open(path, 'wb')
+        self._flush_size = flush_size
+        self._buffer = bytearray(MAGIC)
+        self._buffer.append(VERSION)
+        header = json.dumps({'seed': str(seed), 'args': args},
+                            separators=(',', ':'), sort_keys=True).encode()
+        write_varint(self._buffer, len(header))
+        self._buffer += header
+        self._key: Optional[str] = None
+        self._run = 0
+        self._rounds = 0
+        self._lock = threading.Lock()
+
+    def record(self, key: Optional[str]) -> None:
+        """
+        Adds the key applied in the next round
+        :param key: None, or one of 'Left', 'Right', 'Up', 'Down'
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            self._rounds += 1
+            if key == self._key:
+                self._run += 1
+                return
+            self._end_run()
+            self._key = key
+            self._run = 1
+
+    def get_rounds(self) -> int:
+        """Returns the number of rounds recorded so far."""
+        return self._rounds
+
+    def _end_run(self) -> None:
+        """
+        Internal: encodes the current run and writes the buffer out when it is full
+        """
+        if self._run:
+            write_varint(self._buffer, self._run << KEY_BITS | _KEY_CODES[self._key])
+            self._run = 0
+            if len(self._buffer) >= self._flush_size:
+                self._flush()
+
+    def _flush(self) -> None:
+        self._file.write(self._buffer)
+        self._buffer = bytearray()
+
+    def close(self) -> None:
+        """
+        Writes out everything recorded and closes the file
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            self._end_run()
+            self._flush()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'ReplayWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_replay(path: str) -> Replay:
+    """
+    Reads a replay written by ReplayWriter
+    :return: Replay of the seed, the main_loop arguments and the (key, rounds) runs
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a replay file: " + path)
+    if data[len(MAGIC)] != VERSION:
+        raise ValueError("unsupported replay version: " + str(data[len(MAGIC)]))
+    length, pos = read_varint(data, len(MAGIC) + 1)
+    header = json.loads(data[pos:pos + length].decode())
+    pos += length
+    runs: List[Tuple[Optional[str], int]] = []
+    mask = (1 << KEY_BITS) - 1
+    while pos < len(data):
+        value, pos = read_varint(data, pos)
+        runs.append((KEYS[value & mask], value >> KEY_BITS))
+    return Replay(header['seed'], header['args'], runs)
+
+
+def replay_keys(replay: Replay) -> Iterator[Optional[str]]:
+    """
+    Yields the key of every recorded round
+    """
+    for key, rounds in replay.runs:
+        for _ in range(rounds):
+            yield key
+
+
+def replay_rounds(replay: Replay) -> int:
+    """
+    Returns the number of recorded rounds
+    """
+    return sum(rounds for _, rounds in replay.runs)
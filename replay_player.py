@@ -0,0 +1,156 @@
+import sys
+import copy
+import time
+import argparse
+from argparse import Namespace
+from typing import List, Optional, Tuple
+
+import game_utils
+import snake_main
+from headless_display import HeadlessDisplay
+from replay import Replay, read_replay, replay_keys, replay_rounds
+
+KEYFRAME_INTERVAL = 1000
+
+
+def play_replay(replay: Replay, verbose: int = 0) -> HeadlessDisplay:
+    """
+    Plays a recorded game again headlessly, feeding it the recorded keys.
+    The game is seeded as it was when recorded, so it plays out the same.
+
+    :param replay: The replay read by replay.read_replay.
+    :param verbose: Verbosity level, as in HeadlessDisplay.
+    :return: The display, holding the score and the last round drawn.
+    """
+    args = Namespace(**replay.args)
+    rng = game_utils.GameRandom(replay.seed, args.width, args.height)
+    gd = HeadlessDisplay(args.width, args.height, 0, verbose, args,
+                         inputs=replay_keys(replay))
+    session = snake_main.GameSession(gd, args, rng)
+    # play exactly the recorded turns, the recording may have been stopped early
+    for _ in range(replay_rounds(replay)):
+        if not session.step():
+            break
+    return gd
+
+
+class KeyCursor:
+    """
+    Iterator over the recorded keys that is cheap to copy: a keyframe
+    copies the position only, the list is shared (see ReplaySeeker._copy).
+    """
+
+    def __init__(self, keys: List[Optional[str]]) -> None:
+        self._keys = keys
+        self._pos = 0
+
+    def __iter__(self) -> 'KeyCursor':
+        return self
+
+    def __next__(self) -> Optional[str]:
+        if self._pos >= len(self._keys):
+            raise StopIteration
+        key = self._keys[self._pos]
+        self._pos += 1
+        return key
+
+
+class ReplaySeeker:
+    """
+    Plays a replay headlessly and jumps to any round of it. While playing
+    forward it keeps a copy of the whole game (board, pending walls and
+    apples, generator state and score) every interval rounds, so seeking to
+    a round replays at most interval rounds from the keyframe before it.
+    """
+
+    def __init__(self, replay: Replay, interval: int = KEYFRAME_INTERVAL) -> None:
+        """
+        :param replay: The replay read by replay.read_replay.
+        :param interval: Rounds between keyframes.
+        """
+        if interval < 1:
+            raise ValueError("keyframe interval must be positive: " + str(interval))
+        self._keys: List[Optional[str]] = list(replay_keys(replay))
+        self._interval = interval
+        args = Namespace(**replay.args)
+        rng = game_utils.GameRandom(replay.seed, args.width, args.height)
+        gd = HeadlessDisplay(args.width, args.height, 0, 0, args,
+                             inputs=KeyCursor(self._keys))
+        self._session = snake_main.GameSession(gd, args, rng)
+        self._round = 0
+        self._keyframes: List[Tuple[int, snake_main.GameSession]] = [(0, self._copy(self._session))]
+
+    def get_rounds(self) -> int:
+        """Returns the number of recorded rounds."""
+        return len(self._keys)
+
+    def get_keyframe_count(self) -> int:
+        """Returns the number of keyframes kept so far."""
+        return len(self._keyframes)
+
+    def _copy(self, session: snake_main.GameSession) -> snake_main.GameSession:
+        """
+        Internal: copies a session, sharing the recorded keys instead of copying them
+        """
+        return copy.deepcopy(session, {id(self._keys): self._keys})
+
+    def _step(self) -> bool:
+        """
+        Internal: plays the next recorded round, keeping a keyframe when one is due
+        :return: False if the game is over
+        """
+        if self._round >= len(self._keys) or not self._session.step():
+            return False
+        self._round += 1
+        if self._round == len(self._keyframes) * self._interval:
+            self._keyframes.append((self._round, self._copy(self._session)))
+        return True
+
+    def seek(self, round_num: int) -> HeadlessDisplay:
+        """
+        Brings the game to the state after round_num recorded rounds.
+
+        :param round_num: Clamped to the recorded rounds.
+        :return: The display, holding the score and the cells drawn in that round.
+        The seeker keeps using it, read it before seeking again.
+        """
+        round_num = max(0, min(round_num, len(self._keys)))
+        start, keyframe = self._keyframes[min(round_num // self._interval, len(self._keyframes) - 1)]
+        # carry on from where we are when that is closer than the keyframe
+        if not start <= self._round <= round_num:
+            self._round, self._session = start, self._copy(keyframe)
+        while self._round < round_num and self._step():
+            pass
+        return self._session.gd
+
+
+def parse_args(argv: List[str]) -> Namespace:
+    parser = argparse.ArgumentParser(
+        prog='replay_player.py',
+        description='Plays a snake game recorded with game_display.py --record',
+    )
+    parser.add_argument('replay',
+                        help='The replay file')
+    parser.add_argument('-v', '--verbose',
+                        action='count', default=0,
+                        help='Print every round (can be used multiple times)')
+    parser.add_argument('--seek', type=int, default=None, metavar='ROUND',
+                        help='Fast forward to ROUND and print the board there')
+    parser.add_argument('--interval', type=int, default=KEYFRAME_INTERVAL,
+                        help='Rounds between keyframes when seeking')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    replay = read_replay(args.replay)
+    if args.seek is None:
+        gd = play_replay(replay, args.verbose)
+        print(f'seed {replay.seed}: {gd.get_round_num()} rounds, score {gd.get_score()}')
+    else:
+        seeker = ReplaySeeker(replay, args.interval)
+        start = time.perf_counter()
+        gd = seeker.seek(args.seek)
+        print(f'round {gd.get_round_num()} of {seeker.get_rounds()}, score {gd.get_score()} '
+              f'({time.perf_counter() - start:.3f}s)')
+        print(gd.get_last_drawn())
@@ -5,7 +5,13 @@ DOWN = "Down"
 LEFT = "Left"
 RIGHT = "Right"
 
-from game_display import GameDisplay
+from collections import deque
+from typing import TYPE_CHECKING
+
+# only for type hints, importing game_display loads tkinter
+if TYPE_CHECKING:
+    from game_display import GameDisplay
+from occupancy import KIND_SNAKE
 
 class Snake:
     """
@@ -31,7 +37,12 @@ class Snake:
                 return SNAKE_START_LENGTH
         self._length = debug(x)
         self._color = COLOR_BLACK
-        self._snake_body = [(x, y - i) for i in range(self._length)]
+        # head first; the set indexes the same cells for constant time lookups
+        self._snake_body = deque((x, y - i) for i in range(self._length))
+        self._body_cells = set(self._snake_body)
+        # immutable copy of the body and its cells for get_state, None once the body changed
+        self._frozen_body = None
+        self._cell_listeners = ()
         self._direction = UP
         self._alive = False if x < 0 else True
         self._food = 0
@@ -57,9 +68,41 @@ class Snake:
         self._food += 3
 
     def get_snake_body(self):
-        """Returns a list of tuples representing the coordinates of the snake's body."""
+        """Returns a deque of tuples representing the coordinates of the snake's body, head first."""
         return self._snake_body
 
+    def is_on_body(self, loc):
+        """
+        Checks in constant time whether the given location is part of the snake's body.
+
+        Args:
+            loc (tuple): The location to check (x, y).
+        """
+        return loc in self._body_cells
+
+    def set_cell_listeners(self, listeners):
+        """
+        Sets the objects told about every cell the snake starts or stops covering.
+
+        Args:
+            listeners (list): Objects with occupy(cell, kind) and release(cell, kind) methods.
+        """
+        self._cell_listeners = listeners
+
+    def _occupy(self, cell):
+        """Adds a cell to the body index and tells the cell listeners."""
+        self._body_cells.add(cell)
+        self._frozen_body = None
+        for listener in self._cell_listeners:
+            listener.occupy(cell, KIND_SNAKE)
+
+    def _vacate(self, cell):
+        """Removes a cell from the body index and tells the cell listeners."""
+        self._body_cells.discard(cell)
+        self._frozen_body = None
+        for listener in self._cell_listeners:
+            listener.release(cell, KIND_SNAKE)
+
     def opist_diretion(self):
         """Returns the opposite direction of the snake's current direction."""
         if self._direction == UP:
@@ -90,14 +133,16 @@ class Snake:
             if (self._x, self._y) != self._snake_body[-1]:
                 self._food -= 1
                 self._length += 1
-                self._snake_body.insert(0, (self._x, self._y))
+                self._snake_body.appendleft((self._x, self._y))
+                self._occupy((self._x, self._y))
                 return True
             else:
                 self.kill()
                 return False
         else:
-            self._snake_body.pop()
-            self._snake_body.insert(0, (self._x, self._y))
+            self._vacate(self._snake_body.pop())
+            self._snake_body.appendleft((self._x, self._y))
+            self._occupy((self._x, self._y))
             return True
 
     def move(self) -> bool:
@@ -116,7 +161,9 @@ class Snake:
         elif self._direction == LEFT:
             self._x -= 1
 
-        if not (self._x, self._y) in self._snake_body[:-1]:
+        # moving into the current tail is allowed, it moves away in the same step
+        head = (self._x, self._y)
+        if not (head in self._body_cells and head != self._snake_body[-1]):
             return self._move_eat()
         else:
             self.kill()
@@ -129,14 +176,23 @@ class Snake:
         Args:
             loc (tuple): The location where the snake's body should be cut.
         """
-        for index, snake_loc in enumerate(self._snake_body):
-            if loc == snake_loc:
-                if index == 1:
-                    self.kill()
-                self._length = index
-                self._snake_body = self._snake_body[:index]
+        if loc not in self._body_cells:
+            return
+        # drop the tail up to and including the cut location
+        while True:
+            cell = self._snake_body.pop()
+            self._vacate(cell)
+            if cell == loc:
+                break
+        index = len(self._snake_body)
+        if index == 1:
+            self.kill()
+            # cutting right behind the head kills the snake and leaves it on the cut cell
+            self._snake_body.append(loc)
+            self._occupy(loc)
+        self._length = index
 
-    def draw(self, gd: GameDisplay):
+    def draw(self, gd: "GameDisplay"):
         """
         Draws the snake on the game board.
 
@@ -146,11 +202,39 @@ class Snake:
         for x, y in self._snake_body:
             gd.draw_cell(x, y, self._color)
 
+    def get_state(self):
+        """
+        Returns everything that decides how the snake moves on, as a tuple
+        for set_state. The body is copied, in time linear in its length, only
+        when it changed since the last get_state or set_state; until then every
+        state shares the same immutable copy.
+        """
+        if self._frozen_body is None:
+            self._frozen_body = (tuple(self._snake_body), frozenset(self._body_cells))
+        body, cells = self._frozen_body
+        return (self._x, self._y, self._length, body, cells,
+                self._direction, self._alive, self._food)
+
+    def set_state(self, state):
+        """
+        Puts the snake back in a state returned by get_state, without telling the cell listeners.
+        Rebuilding the body takes time linear in its length; the state's immutable
+        copy is kept for the next get_state.
+
+        Args:
+            state (tuple): The state to restore.
+        """
+        (self._x, self._y, self._length, body, cells,
+         self._direction, self._alive, self._food) = state
+        self._snake_body = deque(body)
+        self._body_cells = set(cells)
+        self._frozen_body = (body, cells)
+
     def kill(self):
         """Kills the snake, making it unable to move or grow."""
         if self._length:
             self._alive = False
-            self._snake_body.pop(0)
+            self._vacate(self._snake_body.popleft())
 
     def save(self, x, y):
         """
@@ -164,7 +248,11 @@ class Snake:
             self._x = x
             self._y = y
             self._length = SNAKE_START_LENGTH
-            self._snake_body = [(x, y - i) for i in range(self._length)]
+            for cell in self._snake_body:
+                self._vacate(cell)
+            self._snake_body = deque((x, y - i) for i in range(self._length))
+            for cell in self._snake_body:
+                self._occupy(cell)
             self._direction = UP
             self._alive = True
             self._food = 0
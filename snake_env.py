@@ -0,0 +1,233 @@
+import sys
+import time
+import random
+import argparse
+from argparse import Namespace
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+import game_utils
+import snake_main
+from occupancy import KIND_SNAKE, KIND_WALL, KIND_APPLE
+from replay import KEYS
+from snake_game import SnakeGame, SPAWN_LEGACY, SPAWN_MODES
+
+# cell codes of the observation grid
+EMPTY = 0
+SNAKE = 1
+HEAD = 2
+WALL = 3
+APPLE = 4
+
+# action i presses KEYS[i], action 0 presses nothing
+NUM_ACTIONS = len(KEYS)
+
+
+class BoardGrid:
+    """
+    The board as one integer code per cell, row after row (cell (x, y) at
+    y * width + x), kept up to date by SnakeGame through occupy and release
+    instead of being redrawn every round. A cell shows what draw_board would
+    draw on top: a wall over the snake over an apple. Cells off the board
+    are not kept.
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        size = width * height
+        # the same array is updated in place for the whole life of the grid
+        self.cells = array('b', bytes(size))
+        # number of objects of each kind covering each cell
+        self._counts: Dict[str, array] = {kind: array('i', bytes(4 * size))
+                                          for kind in (KIND_SNAKE, KIND_WALL, KIND_APPLE)}
+        self._head = -1
+
+    def clear(self) -> None:
+        """
+        Empties every cell, for a new game.
+        """
+        size = self.width * self.height
+        self.cells[:] = array('b', bytes(size))
+        for kind in self._counts:
+            self._counts[kind] = array('i', bytes(4 * size))
+        self._head = -1
+
+    def _index(self, cell: Tuple[int, int]) -> int:
+        x, y = cell
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return y * self.width + x
+        return -1
+
+    def _update(self, index: int) -> None:
+        counts = self._counts
+        if counts[KIND_WALL][index]:
+            code = WALL
+        elif counts[KIND_SNAKE][index]:
+            code = HEAD if index == self._head else SNAKE
+        elif counts[KIND_APPLE][index]:
+            code = APPLE
+        else:
+            code = EMPTY
+        self.cells[index] = code
+
+    def occupy(self, cell: Tuple[int, int], kind: str) -> None:
+        """
+        Called when an object of the given kind starts covering the cell.
+        """
+        index = self._index(cell)
+        if index >= 0:
+            self._counts[kind][index] += 1
+            self._update(index)
+
+    def release(self, cell: Tuple[int, int], kind: str) -> None:
+        """
+        Called when an object of the given kind stops covering the cell.
+        """
+        index = self._index(cell)
+        if index >= 0:
+            self._counts[kind][index] -= 1
+            self._update(index)
+
+    def set_head(self, cell: Tuple[int, int]) -> None:
+        """
+        Moves the HEAD mark to the cell, it shows while the snake covers it.
+        """
+        old = self._head
+        self._head = self._index(cell)
+        if old != self._head:
+            if old >= 0:
+                self._update(old)
+            if self._head >= 0:
+                self._update(self._head)
+
+
+class SnakeEnv:
+    """
+    A SnakeGame played one round per step, for training control policies.
+    The observation is a BoardGrid's cells: the same array every step,
+    updated in place, copy it to keep it (numpy.frombuffer views it without a copy).
+    """
+
+    def __init__(self, width: int = game_utils.WIDTH, height: int = game_utils.HEIGHT,
+                 apples: int = 3, walls: int = 2, spawn_mode: str = SPAWN_LEGACY,
+                 max_rounds: Optional[int] = None) -> None:
+        """
+        :param max_rounds: Optional number of rounds after which a game is cut short.
+        """
+        self.width = width
+        self.height = height
+        self.apples = apples
+        self.walls = walls
+        self.spawn_mode = spawn_mode
+        self.max_rounds = max_rounds
+        self.grid = BoardGrid(width, height)
+        self.game: Optional[SnakeGame] = None
+        self.rng: Optional[game_utils.GameRandom] = None
+        self.rounds = 0
+        self._wall_list: list = []
+        self._apple_list: list = []
+        self._score = 0
+        self._done = True
+
+    def reset(self, seed: Any = None) -> array:
+        """
+        Starts a new game, built from seed as batch_runner builds its games.
+
+        :param seed: Seed of the game's generator, None for a random one.
+        :return: The observation.
+        """
+        self.rng = game_utils.GameRandom(seed, self.width, self.height)
+        self._wall_list = snake_main.make_wall_list(self.walls, self.rng)
+        self._apple_list = snake_main.make_apple_list(self.apples, self.rng)
+        self.game = SnakeGame(self.width, self.height, self._wall_list, self._apple_list,
+                              False, self.spawn_mode, self.rng)
+        self.grid.clear()
+        self.game.add_cell_listener(self.grid)
+        self.game.add_objects()
+        self.grid.set_head(self.game.get_head())
+        self.rounds = 0
+        self._score = 0
+        self._done = False
+        return self.grid.cells
+
+    def step(self, action: int) -> Tuple[array, int, bool, Dict[str, Any]]:
+        """
+        Plays one round as snake_main.play_round does, without drawing.
+
+        :param action: Index of the key in replay.KEYS, 0 for no key.
+        :return: The observation, the score gained this round, whether the game
+            is over, and a dict with the score, round, death_cause and whether
+            the game was truncated by max_rounds.
+        """
+        if self._done:
+            raise RuntimeError("step() on a finished game, call reset() first")
+        game = self.game
+        game.read_key(KEYS[action])
+        game.update_objects()
+        snake_main.change_apple_list(self._apple_list, self.rng)
+        snake_main.change_wall_list(self._wall_list, self.rng)
+        self.rounds += 1
+        self.grid.set_head(game.get_head())
+        score = game.get_score()
+        reward = score - self._score
+        self._score = score
+        over = game.is_over()
+        truncated = not over and self.max_rounds is not None and self.rounds >= self.max_rounds
+        self._done = over or truncated
+        info = {'score': score, 'round': self.rounds,
+                'death_cause': game.get_death_cause(), 'truncated': truncated}
+        return self.grid.cells, reward, self._done, info
+
+
+def bench_steps(env: SnakeEnv, steps: int, seed: int = 0) -> Tuple[float, int]:
+    """
+    Steps env with random actions, resetting it with the next seed whenever a game ends.
+
+    :return: Seconds the steps took, and the number of games started.
+    """
+    rnd = random.Random(seed)
+    actions = [rnd.randrange(NUM_ACTIONS) for _ in range(steps)]
+    env.reset(seed)
+    games = 1
+    start = time.perf_counter()
+    for action in actions:
+        done = env.step(action)[2]
+        if done:
+            seed += 1
+            games += 1
+            env.reset(seed)
+    return time.perf_counter() - start, games
+
+
+def parse_args(argv: List[str]) -> Namespace:
+    parser = argparse.ArgumentParser(
+        prog='snake_env.py',
+        description='Measures the step throughput of the snake environment',
+    )
+    parser.add_argument('-n', '--steps', type=int, default=100000,
+                        help='Number of steps to play')
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='Seed of the first game')
+    parser.add_argument('-x', '--width', type=int, default=game_utils.WIDTH,
+                        help='Board width')
+    parser.add_argument('-y', '--height', type=int, default=game_utils.HEIGHT,
+                        help='Board height')
+    parser.add_argument('-a', '--apples', type=int, default=3,
+                        help='Number of apples')
+    parser.add_argument('-w', '--walls', type=int, default=2,
+                        help='Number of walls')
+    parser.add_argument('-m', '--max-rounds', type=int, default=None,
+                        help='Most rounds of a game')
+    parser.add_argument('--spawn', choices=SPAWN_MODES, default=SPAWN_LEGACY,
+                        help='How new apples and walls are placed')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    env = SnakeEnv(args.width, args.height, args.apples, args.walls, args.spawn,
+                   args.max_rounds)
+    seconds, games = bench_steps(env, args.steps, args.seed)
+    print(f'{args.steps} steps over {games} games in {seconds:.2f}s: '
+          f'{args.steps / seconds:.0f} steps/s')
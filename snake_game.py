@@ -1,13 +1,44 @@
-from typing import Optional
-from game_display import GameDisplay
+from collections import namedtuple
+from typing import Optional, Dict, Tuple, TYPE_CHECKING
 from snake import *
+from wall import Wall
+from apple import Apple
+from occupancy import FreeCells, KIND_WALL, KIND_APPLE, KIND_SNAKE
+import game_utils
 import math
 
+# only for type hints, importing game_display loads tkinter
+if TYPE_CHECKING:
+    from game_display import GameDisplay
+
 UP = "Up"
 DOWN = "Down"
 LEFT = "Left"
 RIGHT = "Right"
 
+DEATH_BORDER = "border"
+DEATH_SELF = "self"
+DEATH_WALL = "wall"
+
+SPAWN_LEGACY = "legacy"
+SPAWN_FREE = "free"
+SPAWN_MODES = [SPAWN_LEGACY, SPAWN_FREE]
+FREE_WALL_TRIES = 4
+
+# phases of update_objects in the order they run, as recorded by a profiler
+UPDATE_PHASES = ("move_snake", "move_wall", "snake_eat", "wall_eat_snake",
+                 "wall_eat_apple", "add_wall", "wall_out", "add_apple")
+PHASE_DRAW_BOARD = "draw_board"
+
+# Everything that decides the rounds to come, as taken by SnakeGame.snapshot.
+# Walls are (x, y, direction) and apples (x, y); the pending lists keep their
+# order, wall_cells and apple_cells are ((x, y), count) pairs. rng and free_cells
+# are the states of the game's generator and free cell index (free_cells is
+# a FreeCellsState, None outside SPAWN_FREE).
+GameSnapshot = namedtuple('GameSnapshot', [
+    'snake', 'walls', 'apples', 'active_walls', 'active_apples', 'wall_cells',
+    'apple_cells', 'key_clicked', 'move_wall', 'score', 'death_cause', 'rng', 'free_cells'])
+
 
 class SnakeGame:
     """
@@ -15,7 +46,8 @@ class SnakeGame:
     interactions with walls and apples, and rendering the board.
     """
 
-    def __init__(self, length, hight, wall_list: list, apple_list: list, is_debug) -> None:
+    def __init__(self, length, hight, wall_list: list, apple_list: list, is_debug,
+                 spawn_mode: str = SPAWN_LEGACY, rng=None) -> None:
         """
         Initializes the Snake game.
 
@@ -25,7 +57,12 @@ class SnakeGame:
             wall_list (list): List of walls to be placed on the board.
             apple_list (list): List of apples to be placed on the board.
             is_debug (bool): Flag indicating whether to start the game in debug mode.
+            spawn_mode (str): SPAWN_LEGACY places the next wall/apple where it was drawn,
+                or waits for a valid location; SPAWN_FREE draws it directly from the empty cells.
+            rng (game_utils.GameRandom): Generator used by SPAWN_FREE, defaults to the module-wide one.
         """
+        if spawn_mode not in SPAWN_MODES:
+            raise ValueError("unknown spawn mode: " + str(spawn_mode))
         if is_debug:
             self.__snake = Snake(-1, -1)
         else:
@@ -36,9 +73,144 @@ class SnakeGame:
         self.__apple_list = apple_list
         self.__active_wall_list = []
         self.__active_apple_list = []
+        # occupancy grid of the active objects: cell -> number of walls/apples on it
+        self.__wall_cells: Dict[Tuple[int, int], int] = {}
+        self.__apple_cells: Dict[Tuple[int, int], int] = {}
         self.__key_clicked = None
         self.__move_wall = False
         self.__score = 0
+        self.__death_cause: Optional[str] = None
+        self.__spawn_mode = spawn_mode
+        self.__rng = rng if rng is not None else game_utils.get_default_random()
+        # objects told about every cell an object starts or stops covering
+        self.__cell_listeners = []
+        self.__snake.set_cell_listeners(self.__cell_listeners)
+        self.__free_cells: Optional[FreeCells] = None
+        self.__profiler = None
+        if spawn_mode == SPAWN_FREE:
+            self.__free_cells = FreeCells(length, hight)
+            self.add_cell_listener(self.__free_cells)
+
+    def add_cell_listener(self, listener) -> None:
+        """
+        Registers an object to be told about every cell a snake part, wall or
+        apple starts or stops covering. It is told about the current board first.
+
+        Args:
+            listener: Object with occupy(cell, kind) and release(cell, kind) methods.
+        """
+        self.__cell_listeners.append(listener)
+        for cell, kind in self.__board_cells():
+            listener.occupy(cell, kind)
+
+    def __board_cells(self):
+        """
+        Yields (cell, kind) for every cell covered by the snake, an active wall or an active apple.
+        """
+        for cell in self.__snake.get_snake_body():
+            yield cell, KIND_SNAKE
+        for wall in self.__active_wall_list:
+            for cell in wall.get_wall_body():
+                yield cell, KIND_WALL
+        for apple in self.__active_apple_list:
+            yield apple.get_location(), KIND_APPLE
+
+    def snapshot(self) -> GameSnapshot:
+        """
+        Captures everything that decides the rounds to come: the snake, the active
+        and pending walls and apples, the score, the pending key, the wall move
+        parity and the state of the game's generator. The snapshot is immutable,
+        so it can be restored any number of times. The snake's body is copied,
+        in time linear in its length, unless it has not moved since the last
+        snapshot or restore (see Snake.get_state); restoring always rebuilds it.
+        Under SPAWN_FREE the free cell index is shared with the game rather than
+        copied (see FreeCells.get_state), so restoring a snapshot of this game
+        costs time linear in the cells that changed since, while a snapshot of
+        another game, or a pickled one, costs a copy of the whole index.
+
+        Returns:
+            GameSnapshot: The state, for restore.
+        """
+        # the middle cell of a wall is its (x, y)
+        return GameSnapshot(
+            self.__snake.get_state(),
+            tuple((*wall.get_wall_body()[1], wall.get_direction()) for wall in self.__wall_list),
+            tuple(apple.get_location() for apple in self.__apple_list),
+            tuple((*wall.get_wall_body()[1], wall.get_direction())
+                  for wall in self.__active_wall_list),
+            tuple(apple.get_location() for apple in self.__active_apple_list),
+            tuple(self.__wall_cells.items()),
+            tuple(self.__apple_cells.items()),
+            self.__key_clicked,
+            self.__move_wall,
+            self.__score,
+            self.__death_cause,
+            self.__rng.get_state(),
+            self.__free_cells.get_state() if self.__free_cells is not None else None)
+
+    def restore(self, snapshot: GameSnapshot) -> None:
+        """
+        Puts the game back in the state of a snapshot taken from it, generator included.
+        The wall and apple lists returned by get_wall_list and get_apple_list are
+        refilled in place with new objects. Cell listeners are told about the cells
+        that stop and start being covered, one call per cell.
+
+        Args:
+            snapshot (GameSnapshot): A snapshot taken by snapshot().
+        """
+        listeners = [listener for listener in self.__cell_listeners
+                     if listener is not self.__free_cells]
+        for cell, kind in self.__board_cells() if listeners else ():
+            for listener in listeners:
+                listener.release(cell, kind)
+        self.__snake.set_state(snapshot.snake)
+        self.__wall_list[:] = [Wall(*wall) for wall in snapshot.walls]
+        self.__apple_list[:] = [Apple(*apple) for apple in snapshot.apples]
+        self.__active_wall_list = [Wall(*wall) for wall in snapshot.active_walls]
+        self.__active_apple_list = [Apple(*apple) for apple in snapshot.active_apples]
+        self.__wall_cells = dict(snapshot.wall_cells)
+        self.__apple_cells = dict(snapshot.apple_cells)
+        self.__key_clicked = snapshot.key_clicked
+        self.__move_wall = snapshot.move_wall
+        self.__score = snapshot.score
+        self.__death_cause = snapshot.death_cause
+        self.__rng.set_state(snapshot.rng)
+        if self.__free_cells is not None:
+            self.__free_cells.set_state(snapshot.free_cells)
+        for cell, kind in self.__board_cells() if listeners else ():
+            for listener in listeners:
+                listener.occupy(cell, kind)
+
+    def set_profiler(self, profiler) -> None:
+        """
+        Records the time of every update_objects phase and of draw_board.
+
+        Args:
+            profiler (profiler.Profiler): Where to record, None turns profiling off.
+        """
+        self.__profiler = profiler
+
+    def __occupy(self, grid, cells, kind):
+        """
+        Marks the given cells as covered by one more object in the given grid.
+        """
+        for cell in cells:
+            grid[cell] = grid.get(cell, 0) + 1
+            for listener in self.__cell_listeners:
+                listener.occupy(cell, kind)
+
+    def __vacate(self, grid, cells, kind):
+        """
+        Marks the given cells as covered by one less object in the given grid.
+        """
+        for cell in cells:
+            count = grid[cell] - 1
+            if count:
+                grid[cell] = count
+            else:
+                del grid[cell]
+            for listener in self.__cell_listeners:
+                listener.release(cell, kind)
 
     def add_objects(self):
         """
@@ -65,6 +237,49 @@ class SnakeGame:
         """
         return self.__apple_list
 
+    def get_active_apple_list(self):
+        """
+        Returns the list of apples on the board.
+
+        Returns:
+            list: The active apple list.
+        """
+        return self.__active_apple_list
+
+    def get_score(self) -> int:
+        """
+        Returns the current score of the game.
+
+        Returns:
+            int: The score.
+        """
+        return self.__score
+
+    def get_head(self) -> Tuple[int, int]:
+        """
+        Returns the coordinates of the snake's head.
+
+        Returns:
+            tuple: The (x, y) of the head, it stays where the snake died.
+        """
+        return self.__snake.get_x_y()
+
+    def get_death_cause(self) -> Optional[str]:
+        """
+        Returns what killed the snake in the current game.
+
+        Returns:
+            str: One of DEATH_BORDER, DEATH_SELF, DEATH_WALL, or None while the snake is alive.
+        """
+        return self.__death_cause
+
+    def __set_death_cause(self, cause: str) -> None:
+        """
+        Records the cause of death if the snake has just died.
+        """
+        if self.__death_cause is None and not self.__snake.get_alive():
+            self.__death_cause = cause
+
     def read_key(self, key_clicked: Optional[str]) -> None:
         """
         Reads the key input for snake movement.
@@ -80,6 +295,9 @@ class SnakeGame:
         This includes moving the snake, moving walls, checking interactions,
         and adding new walls and apples.
         """
+        if self.__profiler is not None:
+            self.__update_objects_profiled()
+            return
         # Move the objects
         self.move_snake()
         self.move_wall()
@@ -92,25 +310,42 @@ class SnakeGame:
         self.wall_out()
         self.add_apple()
 
+    def __update_objects_profiled(self) -> None:
+        """
+        update_objects, timing every phase.
+        """
+        profiler = self.__profiler
+        clock = profiler.clock
+        for phase in UPDATE_PHASES:
+            start = clock()
+            getattr(self, phase)()
+            profiler.record(phase, clock() - start)
+
     def wall_eat_snake(self):
         """
         Checks if any wall intersects with the snake, causing the snake to die
         or be cut if it touches a wall's edge.
         """
+        head = self.__snake.get_x_y()
         for wall in self.__active_wall_list:
-            if self.__snake.get_x_y() in wall.get_wall_body():
+            if head in wall.get_wall_body():
                 self.__snake.kill()
-            elif wall.get_wall_edge() in self.__snake.get_snake_body():
+            elif self.__snake.is_on_body(wall.get_wall_edge()):
                 self.__snake.cut(wall.get_wall_edge())
+        self.__set_death_cause(DEATH_WALL)
 
     def snake_eat(self):
         """
         Checks if the snake eats an apple and increases the score.
         """
+        head = self.__snake.get_x_y()
+        if head not in self.__apple_cells:
+            return
         for index, apple in enumerate(self.__active_apple_list):
-            if self.__snake.get_x_y() == apple.get_location():
+            if head == apple.get_location():
                 self.__score += int(math.sqrt(self.__snake.get_length()))
                 self.__snake.eat()
+                self.__vacate(self.__apple_cells, (head,), KIND_APPLE)
                 self.__apple_list.append(self.__active_apple_list.pop(index))
 
     def wall_eat_apple(self):
@@ -119,8 +354,11 @@ class SnakeGame:
         """
         for wall in self.__active_wall_list:
             loc = wall.get_wall_edge()
+            if loc not in self.__apple_cells:
+                continue
             for index, apple in enumerate(self.__active_apple_list):
                 if loc == apple.get_location():
+                    self.__vacate(self.__apple_cells, (loc,), KIND_APPLE)
                     self.__apple_list.append(self.__active_apple_list.pop(index))
 
     def move_wall(self):
@@ -129,7 +367,9 @@ class SnakeGame:
         """
         if self.__move_wall:
             for index, wall in enumerate(self.__active_wall_list):
+                self.__vacate(self.__wall_cells, wall.get_wall_body(), KIND_WALL)
                 wall.move_wall()
+                self.__occupy(self.__wall_cells, wall.get_wall_body(), KIND_WALL)
             self.__move_wall = False
         else:
             self.__move_wall = True
@@ -140,6 +380,7 @@ class SnakeGame:
         """
         for index, wall in enumerate(self.__active_wall_list):
             if wall.is_wall_out(self.__length, self.__hight):
+                self.__vacate(self.__wall_cells, wall.get_wall_body(), KIND_WALL)
                 self.__wall_list.append(self.__active_wall_list.pop(index))
 
     def move_snake(self):
@@ -168,6 +409,7 @@ class SnakeGame:
                 self.__snake.kill()
         elif snake_x == 0 or snake_y == 0 or snake_x == self.__length - 1 or snake_y == self.__hight - 1:
             self.move_snake_edge(snake_x, snake_y)
+        self.__set_death_cause(DEATH_SELF)
 
     def move_snake_edge(self, snake_x, snake_y):
         """
@@ -177,12 +419,16 @@ class SnakeGame:
             self.__snake.set_direction(self.__key_clicked)
         if snake_x == 0 and self.__snake.get_direction() == LEFT:
             self.__snake.kill()
+            self.__set_death_cause(DEATH_BORDER)
         elif snake_x == self.__length - 1 and self.__snake.get_direction() == RIGHT:
             self.__snake.kill()
+            self.__set_death_cause(DEATH_BORDER)
         elif snake_y == 0 and self.__snake.get_direction() == DOWN:
             self.__snake.kill()
+            self.__set_death_cause(DEATH_BORDER)
         elif snake_y == self.__hight - 1 and self.__snake.get_direction() == UP:
             self.__snake.kill()
+            self.__set_death_cause(DEATH_BORDER)
         else:
             self.__snake.move()
 
@@ -192,23 +438,55 @@ class SnakeGame:
         """
         add = True
         if self.__wall_list:
-            for loc in self.__wall_list[0].get_wall_body():
-                if not self.valid_loc(loc):
-                    add = False
+            if self.__spawn_mode == SPAWN_FREE:
+                add = self.__place_free_wall(self.__wall_list[0])
+            else:
+                for loc in self.__wall_list[0].get_wall_body():
+                    if not self.valid_loc(loc):
+                        add = False
             if add:
-                self.__active_wall_list.append(self.__wall_list.pop(0))
+                wall = self.__wall_list.pop(0)
+                self.__occupy(self.__wall_cells, wall.get_wall_body(), KIND_WALL)
+                self.__active_wall_list.append(wall)
 
     def add_apple(self):
         """
         Adds an apple to the active apple list if an apple is available and the location is valid.
         """
         if self.__apple_list:
+            if self.__spawn_mode == SPAWN_FREE:
+                loc = self.__free_cells.sample(self.__rng.random_array[0])
+                if loc is None:
+                    return
+                self.__apple_list[0].change_cord(*loc)
             if self.valid_loc(self.__apple_list[0].get_location()):
-                self.__active_apple_list.append(self.__apple_list.pop(0))
+                apple = self.__apple_list.pop(0)
+                self.__occupy(self.__apple_cells, (apple.get_location(),), KIND_APPLE)
+                self.__active_apple_list.append(apple)
+
+    def __place_free_wall(self, wall) -> bool:
+        """
+        Moves the given wall onto empty cells drawn from the free cell index,
+        keeping its direction. Gives up after a few draws on a crowded board.
+
+        Returns:
+            bool: True if the wall now covers only empty cells.
+        """
+        rnd = self.__rng.random_array[1]
+        for _ in range(FREE_WALL_TRIES):
+            loc = self.__free_cells.sample(rnd)
+            if loc is None:
+                return False
+            x, y = loc
+            wall.change_wall(x, y, wall.get_direction())
+            if all(cell in self.__free_cells for cell in wall.get_wall_body()):
+                return True
+        return False
 
     def valid_loc(self, loc):
         """
         Checks if a given location is valid for placing an object (wall or apple).
+        Runs in constant time using the snake's body index and the wall grid.
 
         Args:
             loc (tuple): The location to check (x, y).
@@ -221,26 +499,31 @@ class SnakeGame:
         if 0 > x or x >= self.__length or y < 0 or y >= self.__hight:
             return False
         # Check if the location is on the snake body
-        if loc not in self.__snake.get_snake_body():
-            for wall in self.__active_wall_list:
-                # Check if the location is on a wall
-                if loc in wall.get_wall_body():
-                    return False
-            for apple in self.__active_apple_list:
-                # Check if the location is on an apple
-                if loc in apple.get_location():
-                    return False
-            return True
-        else:
+        if self.__snake.is_on_body(loc):
+            return False
+        # Check if the location is on a wall
+        if loc in self.__wall_cells:
             return False
+        # Apples never blocked a location: the old per-apple check compared the
+        # location against the apple's coordinates and could not match. Keep it
+        # that way so seeded games play out exactly as before.
+        return True
 
-    def draw_board(self, gd: GameDisplay) -> None:
+    def draw_board(self, gd: "GameDisplay") -> None:
         """
         Draws all the objects (snake, walls, apples) on the board using the GameDisplay object.
 
         Args:
             gd (GameDisplay): The game display object to render the board.
         """
+        profiler = self.__profiler
+        if profiler is not None:
+            start = profiler.clock()
+        # Let a scrolling display follow the head before anything is drawn,
+        # displays without a viewport need not implement set_focus
+        set_focus = getattr(gd, "set_focus", None)
+        if set_focus is not None:
+            set_focus(*self.__snake.get_x_y())
         # Draw all apples
         for apple in self.__active_apple_list:
             apple.draw_apple(gd)
@@ -253,21 +536,26 @@ class SnakeGame:
                 if 0 <= x < self.__length and 0 <= y < self.__hight:
                     wall.draw_cell(cell, gd)
         gd.show_score(self.__score)
+        if profiler is not None:
+            profiler.record(PHASE_DRAW_BOARD, profiler.clock() - start)
 
     def rest_game(self) -> None:
         """
         Resets the game, including the snake's position, the walls, apples, and score.
         """
         for i in range(len(self.__active_apple_list)):
+            self.__vacate(self.__apple_cells, (self.__active_apple_list[i].get_location(),), KIND_APPLE)
             self.__apple_list.append(self.__active_apple_list[i])
         self.__active_apple_list = []
         for i in range(len(self.__active_wall_list)):
+            self.__vacate(self.__wall_cells, self.__active_wall_list[i].get_wall_body(), KIND_WALL)
             self.__wall_list.append(self.__active_wall_list[i])
         self.__active_wall_list = []
         self.__snake.save(self.__length // 2, self.__hight // 2)
         self.__key_clicked = None
         self.__move_wall = False
         self.__score = 0
+        self.__death_cause = None
 
     def is_over(self) -> bool:
         """
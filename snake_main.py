@@ -1,85 +1,136 @@
 import argparse
+from typing import TYPE_CHECKING
 import game_utils
-from snake_game import SnakeGame
-from game_display import GameDisplay
+from snake_game import SnakeGame, SPAWN_LEGACY
 from wall import Wall
 from apple import Apple
 
-def make_apple():
+# only for type hints, importing game_display loads tkinter
+if TYPE_CHECKING:
+    from game_display import GameDisplay
+
+def random_source(rng=None):
+    """
+    Return the given GameRandom, or the module-wide one of game_utils.
+
+    :param rng: Optional game_utils.GameRandom of the current game.
+    """
+    return game_utils.get_default_random() if rng is None else rng
+
+def make_apple(rng=None):
     """
     Create and return a random apple using game utilities.
+
+    :param rng: Optional game_utils.GameRandom to draw from.
     """
-    x, y = game_utils.get_random_apple_data()
+    x, y = random_source(rng).get_random_apple_data()
     return Apple(x, y)
 
-def make_apple_list(num):
+def make_apple_list(num, rng=None):
     """
     Generate a list of apples of the given size.
 
     :param num: Number of apples to create.
+    :param rng: Optional game_utils.GameRandom to draw from.
     :return: List of Apple objects.
     """
-    return [make_apple() for _ in range(num)]
+    return [make_apple(rng) for _ in range(num)]
 
 
-def change_apple_list(apple_list):
+def change_apple_list(apple_list, rng=None):
     """
     Change the position of the first apple in the given list.
     :param apple_list: List of Apple objects.
+    :param rng: Optional game_utils.GameRandom to draw from.
     """
     if apple_list:
         apple = apple_list[0]
-        x, y = game_utils.get_random_apple_data()
+        x, y = random_source(rng).get_random_apple_data()
         apple.change_cord(x, y)
 
-def change_apple_list_all(apple_list):
+def change_apple_list_all(apple_list, rng=None):
     """
     Change the position of all apples in the given list.
 
     :param apple_list: List of Apple objects.
+    :param rng: Optional game_utils.GameRandom to draw from.
     """
     for apple in apple_list:
-        x, y = game_utils.get_random_apple_data()
+        x, y = random_source(rng).get_random_apple_data()
         apple.change_cord(x, y)
 
-def make_wall():
+def make_wall(rng=None):
     """
     Create and return a random wall using game utilities.
+
+    :param rng: Optional game_utils.GameRandom to draw from.
     """
-    x, y, direction = game_utils.get_random_wall_data()
+    x, y, direction = random_source(rng).get_random_wall_data()
     return Wall(x, y, direction)
 
-def make_wall_list(num):
+def make_wall_list(num, rng=None):
     """
     Generate a list of walls of the given size.
 
     :param num: Number of walls to create.
+    :param rng: Optional game_utils.GameRandom to draw from.
     :return: List of Wall objects.
     """
-    return [make_wall() for _ in range(num)]
+    return [make_wall(rng) for _ in range(num)]
 
-def change_wall_list(wall_list):
+def change_wall_list(wall_list, rng=None):
     """
     Change the position of the first wall in the given list.
 
     :param wall_list: List of Wall objects.
+    :param rng: Optional game_utils.GameRandom to draw from.
     """
     if wall_list:
         wall = wall_list[0]
-        x, y, direction = game_utils.get_random_wall_data()
+        x, y, direction = random_source(rng).get_random_wall_data()
         wall.change_wall(x, y, direction)
 
-def change_wall_list_all(wall_list):
+def change_wall_list_all(wall_list, rng=None):
     """
     Change the position of all walls in the given list.
 
     :param wall_list: List of Wall objects.
+    :param rng: Optional game_utils.GameRandom to draw from.
     """
     for wall in wall_list:
-        x, y, direction = game_utils.get_random_wall_data()
+        x, y, direction = random_source(rng).get_random_wall_data()
         wall.change_wall(x, y, direction)
 
-def run_game(game, gd: GameDisplay, wall_list, apple_list):
+def play_round(game, gd: "GameDisplay", wall_list, apple_list, rng=None, recorder=None,
+               key_source=None):
+    """
+    Play a single turn of a running game and end the display's round.
+
+    :param game: The SnakeGame instance.
+    :param gd: The GameDisplay instance.
+    :param wall_list: List of Wall objects.
+    :param apple_list: List of Apple objects.
+    :param rng: Optional game_utils.GameRandom of this game, defaults to the module-wide one.
+    :param recorder: Optional replay.ReplayWriter told the key of the turn.
+    :param key_source: Optional callable given the game that returns the key of the turn,
+        used instead of gd.get_key_clicked (e.g. an autopilot.Autopilot).
+    """
+    # CHECK KEY CLICKS
+    key_clicked = gd.get_key_clicked() if key_source is None else key_source(game)
+    if recorder is not None:
+        recorder.record(key_clicked)
+    game.read_key(key_clicked)
+    # UPDATE OBJECTS
+    game.update_objects()
+    # DRAW BOARD
+    game.draw_board(gd)
+    # get anew apple and wall to put on the bord if we have any
+    change_apple_list(apple_list, rng)
+    change_wall_list(wall_list, rng)
+    gd.end_round()
+
+def run_game(game, gd: "GameDisplay", wall_list, apple_list, max_rounds=None, rng=None,
+             recorder=None, key_source=None):
     """
     The main game loop for a single round.
 
@@ -87,58 +138,89 @@ def run_game(game, gd: GameDisplay, wall_list, apple_list):
     :param gd: The GameDisplay instance.
     :param wall_list: List of Wall objects.
     :param apple_list: List of Apple objects.
+    :param max_rounds: Optional limit on the number of turns to play.
+    :param rng: Optional game_utils.GameRandom of this game, defaults to the module-wide one.
+    :param recorder: Optional replay.ReplayWriter told the key of every turn.
+    :param key_source: Optional callable given the game that returns the key of every turn,
+        used instead of gd.get_key_clicked (e.g. an autopilot.Autopilot).
     """
     # DRAW BOARD
     game.add_objects()
     game.draw_board(gd)
+    rounds = 0
     #the main loop of one turn in the game
-    while not game.is_over():
-        # CHECK KEY CLICKS
-        key_clicked = gd.get_key_clicked()
-        game.read_key(key_clicked)
-        # UPDATE OBJECTS
-        game.update_objects()
-        # DRAW BOARD
-        game.draw_board(gd)
-        # get anew apple and wall to put on the bord if we have any
-        change_apple_list(apple_list)
-        change_wall_list(wall_list)
-        gd.end_round()
-
-def main_loop(gd: GameDisplay, args: argparse.Namespace) -> None:
+    while not game.is_over() and (max_rounds is None or rounds < max_rounds):
+        play_round(game, gd, wall_list, apple_list, rng, recorder, key_source)
+        rounds += 1
+
+class GameSession:
+    """
+    The state of main_loop, played one turn per call to step() so that
+    a scheduler (e.g. a tkinter event loop) can drive it.
+    """
+
+    def __init__(self, gd: "GameDisplay", args: argparse.Namespace, rng=None) -> None:
+        """
+        Build the walls, apples and game, as main_loop does.
+
+        :param gd: The GameDisplay instance.
+        :param args: Command-line arguments containing game settings.
+        :param rng: Optional game_utils.GameRandom of this game, defaults to the module-wide one.
+        """
+        self.gd = gd
+        self.rng = rng
+        #bilding a random list of apple and wall for the game
+        self.wall_list = make_wall_list(args.walls, rng)
+        self.apple_list = make_apple_list(args.apples, rng)
+        # INIT OBJECTS
+        self.game = SnakeGame(args.width, args.height, self.wall_list, self.apple_list,
+                              args.debug, getattr(args, 'spawn', SPAWN_LEGACY), rng)
+        # displays started with profiling carry a profiler.Profiler
+        self.game.set_profiler(getattr(gd, 'profiler', None))
+        # and displays started with recording a replay.ReplayWriter
+        self.recorder = getattr(gd, 'recorder', None)
+        #ckeck if the user wants to play forever :)
+        self.forever = args.rounds < 0
+        self.rounds_left = args.rounds
+        self.in_game = False
+        gd.show_score(0)
+
+    def step(self) -> bool:
+        """
+        Play the next turn, starting the next game first if the current one is over.
+
+        :return: False once all the games were played, True otherwise.
+        """
+        while True:
+            if not self.in_game:
+                if not self.forever and self.rounds_left < 0:
+                    return False
+                # DRAW BOARD
+                self.game.add_objects()
+                self.game.draw_board(self.gd)
+                self.in_game = True
+            if not self.game.is_over():
+                play_round(self.game, self.gd, self.wall_list, self.apple_list, self.rng,
+                           self.recorder)
+                return True
+            self.in_game = False
+            if not self.forever:
+                self.rounds_left -= 1
+            self.game.rest_game()
+            change_wall_list(self.wall_list, self.rng)
+            change_apple_list(self.apple_list, self.rng)
+
+def main_loop(gd: "GameDisplay", args: argparse.Namespace, rng=None) -> None:
     """
        The main loop for the game.
 
        :param gd: The GameDisplay instance.
        :param args: Command-line arguments containing game settings.
+       :param rng: Optional game_utils.GameRandom of this game, defaults to the module-wide one.
        """
-    #geting the input from the user
-    bord_width = args.width
-    bord_height = args.height
-    num_of_apples = args.apples
-    is_debug = args.debug
-    num_of_walls = args.walls
-    num_of_rounds = args.rounds
-    #bilding a random list of apple and wall for the game
-    wall_list = make_wall_list(num_of_walls)
-    apple_list = make_apple_list(num_of_apples)
-    # INIT OBJECTS
-    game = SnakeGame(bord_width, bord_height, wall_list, apple_list, is_debug)
-    gd.show_score(0)
-    #ckeck if the user wants to play forever :)
-    if num_of_rounds < 0:
-        while True:
-            run_game(game, gd, wall_list, apple_list)
-            game.rest_game()
-            change_wall_list(wall_list)
-            change_apple_list(apple_list)
-    else:
-        while num_of_rounds >= 0:
-            run_game(game, gd, wall_list, apple_list)
-            num_of_rounds -= 1
-            game.rest_game()
-            change_wall_list(wall_list)
-            change_apple_list(apple_list)
+    session = GameSession(gd, args, rng)
+    while session.step():
+        pass
 
 
 
@@ -1,20 +1,33 @@
+import os
+import sys
+import argparse
+from argparse import Namespace
 import tkinter as tki
 from typing import Any, Optional, List, Tuple, Dict
 
+from trace_file import TraceReader
+from trace_diff import find_divergence
 
-INPUT = [None, 'Right', None, None, None, None, 'Down', 'Left', None, 'Up', None, None, None, None, 'Right', 'Down', None, 'Left', 'Up', None, None, None, None, 'Right']
-EXPECTED = [(0, {(20, 15): 'black', (20, 14): 'black', (20, 13): 'black', (29, 19): 'red', (8, 5): 'green', (21, 16): 'green', (38, 2): 'green'}), (0, {(8, 5): 'green', (21, 16): 'green', (38, 2): 'green', (20, 16): 'black', (20, 15): 'black', (20, 14): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (21, 16): 'black', (20, 16): 'black', (20, 15): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (22, 16): 'black', (21, 16): 'black', (20, 16): 'black', (20, 15): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (23, 16): 'black', (22, 16): 'black', (21, 16): 'black', (20, 16): 'black', (20, 15): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (24, 16): 'black', (23, 16): 'black', (22, 16): 'black', (21, 16): 'black', (20, 16): 'black', (20, 15): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (25, 16): 'black', (24, 16): 'black', (23, 16): 'black', (22, 16): 'black', (21, 16): 'black', (20, 16): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (25, 15): 'black', (25, 16): 'black', (24, 16): 'black', (23, 16): 'black', (22, 16): 'black', (21, 16): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (24, 15): 'black', (25, 15): 'black', (25, 16): 'black', (24, 16): 'black', (23, 16): 'black', (22, 16): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (23, 15): 'black', (24, 15): 'black', (25, 15): 'black', (25, 16): 'black', (24, 16): 'black', (23, 16): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (23, 16): 'black', (23, 15): 'black', (24, 15): 'black', (25, 15): 'black', (25, 16): 'black', (24, 16): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (23, 17): 'black', (23, 16): 'black', (23, 15): 'black', (24, 15): 'black', (25, 15): 'black', (25, 16): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (23, 18): 'black', (23, 17): 'black', (23, 16): 'black', (23, 15): 'black', (24, 15): 'black', (25, 15): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (23, 19): 'black', (23, 18): 'black', (23, 17): 'black', (23, 16): 'black', (23, 15): 'black', (24, 15): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (23, 20): 'black', (23, 19): 'black', (23, 18): 'black', (23, 17): 'black', (23, 16): 'black', (23, 15): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (24, 20): 'black', (23, 20): 'black', (23, 19): 'black', (23, 18): 'black', (23, 17): 'black', (23, 16): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (24, 19): 'black', (24, 20): 'black', (23, 20): 'black', (23, 19): 'black', (23, 18): 'black', (23, 17): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (24, 18): 'black', (24, 19): 'black', (24, 20): 'black', (23, 20): 'black', (23, 19): 'black', (23, 18): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (23, 18): 'black', (24, 18): 'black', (24, 19): 'black', (24, 20): 'black', (23, 20): 'black', (23, 19): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (23, 19): 'black', (23, 18): 'black', (24, 18): 'black', (24, 19): 'black', (24, 20): 'black', (23, 20): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (23, 20): 'black', (23, 19): 'black', (23, 18): 'black', (24, 18): 'black', (24, 19): 'black', (24, 20): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (23, 21): 'black', (23, 20): 'black', (23, 19): 'black', (23, 18): 'black', (24, 18): 'black', (24, 19): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (23, 22): 'black', (23, 21): 'black', (23, 20): 'black', (23, 19): 'black', (23, 18): 'black', (24, 18): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (23, 23): 'black', (23, 22): 'black', (23, 21): 'black', (23, 20): 'black', (23, 19): 'black', (23, 18): 'black', (29, 19): 'red'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (24, 23): 'black', (23, 23): 'black', (23, 22): 'black', (23, 21): 'black', (23, 20): 'black', (23, 19): 'black', (29, 19): 'orange'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (25, 23): 'black', (24, 23): 'black', (23, 23): 'black', (23, 22): 'black', (23, 21): 'black', (23, 20): 'black', (29, 20): 'orange', (28, 19): 'orange', (29, 18): 'orange', (30, 19): 'orange'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (26, 23): 'black', (25, 23): 'black', (24, 23): 'black', (23, 23): 'black', (23, 22): 'black', (23, 21): 'black', (29, 21): 'orange', (30, 20): 'orange', (27, 19): 'orange', (28, 20): 'orange', (29, 17): 'orange', (28, 18): 'orange', (31, 19): 'orange', (30, 18): 'orange'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (27, 23): 'black', (26, 23): 'black', (25, 23): 'black', (24, 23): 'black', (23, 23): 'black', (23, 22): 'black', (29, 22): 'orange', (30, 21): 'orange', (31, 20): 'orange', (26, 19): 'orange', (27, 20): 'orange', (28, 21): 'orange', (29, 16): 'orange', (28, 17): 'orange', (27, 18): 'orange', (32, 19): 'orange', (31, 18): 'orange', (30, 17): 'orange'}), (4, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (28, 23): 'black', (27, 23): 'black', (26, 23): 'black', (25, 23): 'black', (24, 23): 'black', (23, 23): 'black', (29, 23): 'orange', (30, 22): 'orange', (31, 21): 'orange', (32, 20): 'orange', (25, 19): 'orange', (26, 20): 'orange', (27, 21): 'orange', (28, 22): 'orange', (29, 15): 'orange', (28, 16): 'orange', (27, 17): 'orange', (26, 18): 'orange', (33, 19): 'orange', (32, 18): 'orange', (31, 17): 'orange', (30, 16): 'orange'}), (5, {(8, 5): 'green', (38, 2): 'green', (35, 29): 'green', (29, 23): 'orange', (28, 23): 'black', (27, 23): 'black', (26, 23): 'black', (25, 23): 'black', (24, 23): 'black', (30, 22): 'orange', (31, 21): 'orange', (32, 20): 'orange', (25, 19): 'orange', (26, 20): 'orange', (27, 21): 'orange', (28, 22): 'orange', (29, 15): 'orange', (28, 16): 'orange', (27, 17): 'orange', (26, 18): 'orange', (33, 19): 'orange', (32, 18): 'orange', (31, 17): 'orange', (30, 16): 'orange'})]
-ACTUAL = [(0, {(8, 5): 'green', (20, 13): 'black', (20, 14): 'black', (20, 15): 'black', (21, 16): 'green', (29, 19): 'red', (38, 2): 'green'}), (0, {(8, 5): 'green', (20, 14): 'black', (20, 15): 'black', (20, 16): 'black', (21, 16): 'green', (29, 19): 'red', (38, 2): 'green'}), (4, {(8, 5): 'green', (20, 15): 'black', (20, 16): 'black', (21, 16): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (20, 15): 'black', (20, 16): 'black', (21, 16): 'black', (22, 16): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (20, 15): 'black', (20, 16): 'black', (21, 16): 'black', (22, 16): 'black', (23, 16): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (20, 15): 'black', (20, 16): 'black', (21, 16): 'black', (22, 16): 'black', (23, 16): 'black', (24, 16): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (20, 16): 'black', (21, 16): 'black', (22, 16): 'black', (23, 16): 'black', (24, 16): 'black', (25, 16): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (21, 16): 'black', (22, 16): 'black', (23, 16): 'black', (24, 16): 'black', (25, 15): 'black', (25, 16): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (22, 16): 'black', (23, 16): 'black', (24, 15): 'black', (24, 16): 'black', (25, 15): 'black', (25, 16): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 15): 'black', (23, 16): 'black', (24, 15): 'black', (24, 16): 'black', (25, 15): 'black', (25, 16): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 15): 'black', (23, 16): 'black', (24, 15): 'black', (24, 16): 'black', (25, 15): 'black', (25, 16): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 15): 'black', (23, 16): 'black', (23, 17): 'black', (24, 15): 'black', (25, 15): 'black', (25, 16): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 15): 'black', (23, 16): 'black', (23, 17): 'black', (23, 18): 'black', (24, 15): 'black', (25, 15): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 15): 'black', (23, 16): 'black', (23, 17): 'black', (23, 18): 'black', (23, 19): 'black', (24, 15): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 15): 'black', (23, 16): 'black', (23, 17): 'black', (23, 18): 'black', (23, 19): 'black', (23, 20): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 16): 'black', (23, 17): 'black', (23, 18): 'black', (23, 19): 'black', (23, 20): 'black', (24, 20): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 17): 'black', (23, 18): 'black', (23, 19): 'black', (23, 20): 'black', (24, 19): 'black', (24, 20): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 18): 'black', (23, 19): 'black', (23, 20): 'black', (24, 18): 'black', (24, 19): 'black', (24, 20): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 18): 'black', (23, 19): 'black', (23, 20): 'black', (24, 18): 'black', (24, 19): 'black', (24, 20): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 18): 'black', (23, 19): 'black', (23, 20): 'black', (24, 18): 'black', (24, 19): 'black', (24, 20): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 18): 'black', (23, 19): 'black', (23, 20): 'black', (24, 18): 'black', (24, 19): 'black', (24, 20): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 18): 'black', (23, 19): 'black', (23, 20): 'black', (23, 21): 'black', (24, 18): 'black', (24, 19): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 18): 'black', (23, 19): 'black', (23, 20): 'black', (23, 21): 'black', (23, 22): 'black', (24, 18): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 18): 'black', (23, 19): 'black', (23, 20): 'black', (23, 21): 'black', (23, 22): 'black', (23, 23): 'black', (29, 19): 'red', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 19): 'black', (23, 20): 'black', (23, 21): 'black', (23, 22): 'black', (23, 23): 'black', (24, 23): 'black', (29, 19): 'orange', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 20): 'black', (23, 21): 'black', (23, 22): 'black', (23, 23): 'black', (24, 23): 'black', (25, 23): 'black', (28, 19): 'orange', (29, 18): 'orange', (29, 20): 'orange', (30, 19): 'orange', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 21): 'black', (23, 22): 'black', (23, 23): 'black', (24, 23): 'black', (25, 23): 'black', (26, 23): 'black', (27, 19): 'orange', (28, 18): 'orange', (28, 20): 'orange', (29, 17): 'orange', (29, 21): 'orange', (30, 18): 'orange', (30, 20): 'orange', (31, 19): 'orange', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 22): 'black', (23, 23): 'black', (24, 23): 'black', (25, 23): 'black', (26, 19): 'orange', (26, 23): 'black', (27, 18): 'orange', (27, 20): 'orange', (27, 23): 'black', (28, 17): 'orange', (28, 21): 'orange', (29, 16): 'orange', (29, 22): 'orange', (30, 17): 'orange', (30, 21): 'orange', (31, 18): 'orange', (31, 20): 'orange', (32, 19): 'orange', (35, 29): 'green', (38, 2): 'green'}), (4, {(8, 5): 'green', (23, 23): 'black', (24, 23): 'black', (25, 19): 'orange', (25, 23): 'black', (26, 18): 'orange', (26, 20): 'orange', (26, 23): 'black', (27, 17): 'orange', (27, 21): 'orange', (27, 23): 'black', (28, 16): 'orange', (28, 22): 'orange', (28, 23): 'black', (29, 15): 'orange', (29, 23): 'orange', (30, 16): 'orange', (30, 22): 'orange', (31, 17): 'orange', (31, 21): 'orange', (32, 18): 'orange', (32, 20): 'orange', (33, 19): 'orange', (35, 29): 'green', (38, 2): 'green'}), (4, {(2, 23): 'red', (8, 5): 'green', (24, 23): 'black', (25, 23): 'black', (26, 23): 'black', (27, 23): 'black', (28, 23): 'black', (29, 23): 'black', (35, 29): 'green', (38, 2): 'green'})]
 
 
+
+# board size of traces without a header
 WIDTH = 40
 HEIGHT = 30
 CELL_SIZE = 15
 
+TRACE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces")
+ACTUAL_TRACE = os.path.join(TRACE_DIR, "actual.trace")
+EXPECTED_TRACE = os.path.join(TRACE_DIR, "expected.trace")
+
 
 class GameDisplay:
-    def __init__(self) -> None:
-        """Creates a new game display object and initializes it"""
+    def __init__(self, actual_path: str = ACTUAL_TRACE, expected_path: str = EXPECTED_TRACE) -> None:
+        """
+        Creates a new game display object and initializes it
+        :param actual_path: trace file of the actual game, see trace_file
+        :param expected_path: trace file of the expected game
+        """
         # placed this import in here to solve circular import issues.
         self._round_num = 0
         self._root = tki.Tk()
@@ -25,26 +38,24 @@ class GameDisplay:
         
         self._score_var = tki.StringVar()
         self._level_var = tki.StringVar()
-        self._input = [''] + INPUT
-        self._expected = EXPECTED
-        self._actual = ACTUAL
-        if len(self._actual) != len(self._expected):
-            raise ValueError("Actual and expected are not the same length")
+        self._expected = TraceReader(expected_path)
+        self._actual = TraceReader(actual_path)
+        self._width, self._height = self._board_size()
 
         self._init_level_frame()
         self._init_score_frame()
         # self._init_input_frame()
 
         self._expected_canvas = tki.Canvas(self._root, bg="white",
-                                           width=WIDTH * CELL_SIZE,
-                                           height=HEIGHT * CELL_SIZE)
+                                           width=self._width * CELL_SIZE,
+                                           height=self._height * CELL_SIZE)
         self._expected_canvas.pack(side=tki.RIGHT)
         self._expected_to_draw: List[Tuple[int, int, str]] = list()
         self._expected_already_drawn: Dict[Tuple[int, int, str], int] = dict()
 
         self._actual_canvas = tki.Canvas(self._root, bg="white",
-                                         width=WIDTH * CELL_SIZE,
-                                         height=HEIGHT * CELL_SIZE)
+                                         width=self._width * CELL_SIZE,
+                                         height=self._height * CELL_SIZE)
         self._actual_canvas.pack(side=tki.LEFT)
         self._actual_to_draw: List[Tuple[int, int, str]] = list()
         self._actual_already_drawn: Dict[Tuple[int, int, str], int] = dict()
@@ -62,8 +73,12 @@ class GameDisplay:
         """
         if e.keysym in ["Left", "Down"] and self._round_num > 0:
             self._level_down()
-        elif e.keysym in ["Right", "Up"] and self._round_num < len(self._actual) - 1:
+        elif e.keysym in ["Right", "Up"] and self._round_num < self._num_rounds() - 1:
             self._level_up()
+        elif e.keysym == "f":
+            self._first_diff()
+        elif e.keysym == "n":
+            self._next_diff()
         
     def _init_score_frame(self) -> None:
         """
@@ -112,8 +127,38 @@ class GameDisplay:
                                         font=("Courier", 22))
         self._right_button.grid(row=0, column=2, sticky="w", padx=10, pady=10)
 
+        self._first_diff_button = tki.Button(self._level_frame,
+                                             text="first diff",
+                                             command=self._first_diff,
+                                             font=("Courier", 22))
+        self._first_diff_button.grid(row=0, column=3, sticky="w", padx=10, pady=10)
+
+        self._next_diff_button = tki.Button(self._level_frame,
+                                            text="next diff",
+                                            command=self._next_diff,
+                                            font=("Courier", 22))
+        self._next_diff_button.grid(row=0, column=4, sticky="w", padx=10, pady=10)
+
         self._level_frame.grid_rowconfigure(0, weight=1)
 
+    def _num_rounds(self) -> int:
+        """
+        Internal: the number of rounds of the longer trace
+        :return: the number of rounds
+        """
+        return max(len(self._actual), len(self._expected))
+
+    @staticmethod
+    def _frame(trace: Any, num: int) -> Tuple[Any, Optional[str], Dict[Tuple[int, int], str]]:
+        """
+        Internal: frame num of trace, with no score and no cells once the trace has ended
+        :return: (score, key, {(x, y): color})
+        """
+        try:
+            return trace[num]
+        except IndexError:
+            return None, None, {}
+
     def _level_up(self) -> None:
         """
         Internal: This method increases the level of the game
@@ -130,6 +175,34 @@ class GameDisplay:
         self._round_num -= 1
         self._update_drawing()
 
+    def _first_diff(self) -> None:
+        """
+        Internal: This method jumps to the first round where the traces differ
+        :return: None
+        """
+        self._jump_to_diff(0)
+
+    def _next_diff(self) -> None:
+        """
+        Internal: This method jumps to the next round after this one where the traces differ
+        :return: None
+        """
+        self._jump_to_diff(self._round_num + 1)
+
+    def _jump_to_diff(self, start: int) -> None:
+        """
+        Internal: This method shows the first differing round from start on,
+        or rings the bell if there is none
+        :param start: the first round to compare
+        :return: None
+        """
+        diff = find_divergence(self._actual, self._expected, start)
+        if diff is None:
+            self._root.bell()
+            return
+        self._round_num = diff.round_num
+        self._update_drawing()
+
     def _init_input_frame(self) -> None:
         """
         Internal: This method initializes the score frame
@@ -181,26 +254,54 @@ class GameDisplay:
         self._input_frame.grid_columnconfigure(0, weight=1)
         self._input_frame.grid_columnconfigure(1, weight=1)
 
+    @staticmethod
+    def _load_trace(path: str) -> Any:
+        """
+        Internal: opens the trace file at path
+        :return: the trace, or an empty list if it cannot be read
+        """
+        try:
+            return TraceReader(path)
+        except (OSError, ValueError):
+            return []
+
+    def _board_size(self) -> Tuple[int, int]:
+        """
+        Internal: the board size from the trace headers, the larger of the two
+        if they differ, WIDTH x HEIGHT for traces without a header
+        :return: (width, height)
+        """
+        sizes = [(trace.width, trace.height) for trace in (self._actual, self._expected)
+                 if getattr(trace, 'width', None) is not None]
+        if not sizes:
+            return WIDTH, HEIGHT
+        return max(width for width, _ in sizes), max(height for _, height in sizes)
+
+    def _resize(self) -> None:
+        """
+        Internal: sizes the canvases for the board of the loaded traces
+        :return: None
+        """
+        self._width, self._height = self._board_size()
+        for canvas in (self._actual_canvas, self._expected_canvas):
+            canvas.config(width=self._width * CELL_SIZE, height=self._height * CELL_SIZE)
+
     def _actual_input_changed(self) -> None:
         """
-        Internal: This method updates the actual input
+        Internal: This method loads the actual trace from the path entered
         :return: None
         """
-        try:
-            self._actual = eval(self._actual_input.get())
-        except:
-            self._actual = []
+        self._actual = self._load_trace(self._actual_input.get())
+        self._resize()
         self._update_drawing()
 
     def _expected_input_changed(self) -> None:
         """
-        Internal: This method updates the expected input
+        Internal: This method loads the expected trace from the path entered
         :return: None
         """
-        try:
-            self._expected = eval(self._expected_input.get())
-        except:
-            self._expected = []
+        self._expected = self._load_trace(self._expected_input.get())
+        self._resize()
         self._update_drawing()
 
     def start(self) -> None:
@@ -221,15 +322,15 @@ class GameDisplay:
         :param color: the color we wish to draw
         :return: None
         """
-        if x < 0 or x >= WIDTH or \
-                y < 0 or y >= HEIGHT:
+        if x < 0 or x >= self._width or \
+                y < 0 or y >= self._height:
             raise ValueError(
                 "cell index out of bounds of the board: " + str((x, y)))
 
         # setting the coordinates of the board correctly,
         # the y axis needs to point up.
         # the following line adjusts this.
-        y = HEIGHT - y
+        y = self._height - y
         return canvas.create_rectangle(
             x * CELL_SIZE, (y - 1) * CELL_SIZE,
             (x + 1) * CELL_SIZE, y * CELL_SIZE,
@@ -241,15 +342,17 @@ class GameDisplay:
         Internal: method to update drawing
         :return: None
         """
-        try:
-            ac_points, ac_dict = self._actual[self._round_num]
-            ex_points, ex_dict = self._expected[self._round_num]
-        except IndexError:
+        if not 0 <= self._round_num < self._num_rounds():
             return
-        try:
-            key = self._input[self._round_num]
-        except:
-            key = None
+        # a trace that ended earlier, e.g. a game that died sooner, shows an empty board
+        ac_points, key, ac_dict = self._frame(self._actual, self._round_num)
+        ex_points, ex_key, ex_dict = self._frame(self._expected, self._round_num)
+        ended = ""
+        if self._round_num >= len(self._actual):
+            key = ex_key
+            ended = " (actual ended)"
+        elif self._round_num >= len(self._expected):
+            ended = " (expected ended)"
 
         self._actual_canvas.delete("all")
         self._expected_canvas.delete("all")
@@ -275,10 +378,10 @@ class GameDisplay:
 
         self.show_score(f"Actual: {ac_points}, Expected: {ex_points}")
         self._level_var.set(
-            f"Level: {self._round_num} of {len(self._actual)}\nKey: {key}")
+            f"Level: {self._round_num} of {self._num_rounds()}{ended}\nKey: {key}")
 
-        self._right_button.config(state="normal" if self._round_num < len(
-            self._actual) - 1 else "disabled")
+        self._right_button.config(state="normal" if self._round_num <
+                                  self._num_rounds() - 1 else "disabled")
         self._left_button.config(
             state="normal" if self._round_num > 0 else "disabled")
 
@@ -297,6 +400,19 @@ class GameDisplay:
         self._score_var.set("Score: " + str(val))
 
 
+def parse_args(argv: List[str]) -> Namespace:
+    parser = argparse.ArgumentParser(
+        prog='tester_viewer.py',
+        description='Compares two snake game traces frame by frame',
+    )
+    parser.add_argument('actual', nargs='?', default=ACTUAL_TRACE,
+                        help='Trace of the actual game (game_display.py --headless --trace FILE)')
+    parser.add_argument('expected', nargs='?', default=EXPECTED_TRACE,
+                        help='Trace of the expected game')
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    gd = GameDisplay()
+    args = parse_args(sys.argv[1:])
+    gd = GameDisplay(args.actual, args.expected)
     gd.start()
@@ -0,0 +1,132 @@
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+LATE_CATCH_UP = "catch_up"
+LATE_DROP = "drop"
+LATE_POLICIES = [LATE_CATCH_UP, LATE_DROP]
+
+# after() only has millisecond resolution, the last part of every wait is spun
+SPIN_TIME = 0.002
+MAX_CATCH_UP = 5
+STATS_WINDOW = 1000
+
+
+class TickScheduler:
+    """
+    Calls tick() once every interval seconds from a tkinter event loop using
+    root.after, so the game runs on the same thread as the drawing.
+    Deadlines are kept on an absolute timeline (each one is the previous one
+    plus interval), so timer inaccuracy does not add up over the rounds.
+    When a tick starts more than a whole interval late, the late policy
+    decides what happens to the deadlines that were missed:
+    LATE_CATCH_UP runs up to max_catch_up extra ticks at once,
+    LATE_DROP skips them and counts them as dropped.
+    """
+
+    def __init__(self, root: Any, tick: Callable[[], bool], interval: float,
+                 late_policy: str = LATE_CATCH_UP, max_catch_up: int = MAX_CATCH_UP,
+                 clock: Callable[[], float] = time.perf_counter) -> None:
+        """
+        :param root: the tkinter root (anything with after and after_cancel)
+        :param tick: called every interval, returns False to stop the scheduler
+        :param interval: seconds between ticks
+        :param late_policy: one of LATE_POLICIES
+        :param max_catch_up: most extra ticks run at once with LATE_CATCH_UP
+        :param clock: the clock used for the deadlines
+        """
+        if late_policy not in LATE_POLICIES:
+            raise ValueError("unknown late policy: " + str(late_policy))
+        self._root = root
+        self._tick = tick
+        self._interval = interval
+        self._late_policy = late_policy
+        self._max_catch_up = max_catch_up
+        self._clock = clock
+        self._next = 0.0
+        self._after_id: Optional[str] = None
+        self._running = False
+        self._ticks = 0
+        self._late = 0
+        self._dropped = 0
+        self._jitter: Deque[float] = deque(maxlen=STATS_WINDOW)
+        self._frame_time: Deque[float] = deque(maxlen=STATS_WINDOW)
+
+    def start(self) -> None:
+        """
+        Schedules the first tick one interval from now
+        :return: None
+        """
+        self._running = True
+        self._next = self._clock() + self._interval
+        self._schedule()
+
+    def stop(self) -> None:
+        """
+        Cancels the next tick
+        :return: None
+        """
+        self._running = False
+        if self._after_id is not None:
+            self._root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def is_running(self) -> bool:
+        return self._running
+
+    def _schedule(self) -> None:
+        """
+        Internal: asks the event loop to wake up just before the next deadline
+        :return: None
+        """
+        wait = self._next - self._clock() - SPIN_TIME
+        self._after_id = self._root.after(max(0, int(wait * 1000)), self._run)
+
+    def _run(self) -> None:
+        """
+        Internal: waits for the deadline, runs the due ticks and schedules the next one
+        :return: None
+        """
+        self._after_id = None
+        now = self._clock()
+        while now < self._next:
+            now = self._clock()
+        jitter = now - self._next
+        self._jitter.append(jitter)
+
+        extra = 0
+        missed = int(jitter // self._interval) if self._interval > 0 else 0
+        if missed:
+            self._late += 1
+            if self._late_policy == LATE_CATCH_UP:
+                extra = min(missed, self._max_catch_up)
+            self._dropped += missed - extra
+            self._next += missed * self._interval
+
+        for _ in range(1 + extra):
+            start = self._clock()
+            running = self._tick()
+            self._frame_time.append(self._clock() - start)
+            self._ticks += 1
+            if not running:
+                self._running = False
+                return
+        self._next += self._interval
+        if self._running:
+            self._schedule()
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Returns tick statistics, times are in milliseconds over the last STATS_WINDOW ticks:
+        ticks, late (ticks that started a whole interval late), dropped (skipped deadlines),
+        jitter_mean/jitter_p99/jitter_max (start time after the deadline) and
+        frame_mean/frame_p99/frame_max (time spent in tick)
+        """
+        stats: Dict[str, float] = {'ticks': self._ticks, 'late': self._late,
+                                   'dropped': self._dropped}
+        for name, values in (('jitter', self._jitter), ('frame', self._frame_time)):
+            ordered = sorted(values) or [0.0]
+            stats[name + '_mean'] = sum(ordered) / len(ordered) * 1000
+            stats[name + '_p99'] = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
+            stats[name + '_max'] = ordered[-1] * 1000
+        return stats
@@ -0,0 +1,96 @@
+import sys
+import argparse
+from argparse import Namespace
+from collections import namedtuple
+from typing import Iterator, List, Optional, Tuple
+
+from trace_file import TraceReader, decode_frame
+
+# cells: (cell, actual color, expected color) of every cell that differs,
+# a color is None where that trace has nothing drawn. A frame missing from
+# one of the traces is reported with None for its score.
+FrameDiff = namedtuple('FrameDiff', ['round_num', 'actual_score', 'expected_score', 'cells'])
+
+
+def diff_frames(round_num: int, actual_line: Optional[bytes],
+                expected_line: Optional[bytes]) -> Optional[FrameDiff]:
+    """
+    Compares the score and cells of two trace lines, ignoring the keys
+    :return: None if they show the same
+    """
+    actual_score, _, actual_cells = decode_frame(actual_line) if actual_line else (None, None, {})
+    expected_score, _, expected_cells = decode_frame(expected_line) if expected_line else (None, None, {})
+    cells: List[Tuple[Tuple[int, int], Optional[str], Optional[str]]] = [
+        (cell, actual_cells.get(cell), expected_cells.get(cell))
+        for cell in sorted(actual_cells.keys() | expected_cells.keys())
+        if actual_cells.get(cell) != expected_cells.get(cell)]
+    if actual_line is not None and expected_line is not None and \
+            actual_score == expected_score and not cells:
+        return None
+    return FrameDiff(round_num, actual_score, expected_score, cells)
+
+
+def iter_divergences(actual: TraceReader, expected: TraceReader,
+                     start: int = 0) -> Iterator[FrameDiff]:
+    """
+    Yields the frames that differ, from round start on. Frames are compared
+    as raw bytes first and only decoded when the bytes differ, one frame at
+    a time, so neither trace is loaded as a whole.
+    """
+    for num in range(max(0, start), max(len(actual), len(expected))):
+        actual_line = actual.raw(num) if num < len(actual) else None
+        expected_line = expected.raw(num) if num < len(expected) else None
+        if actual_line == expected_line:
+            continue
+        diff = diff_frames(num, actual_line, expected_line)
+        if diff is not None:
+            yield diff
+
+
+def find_divergence(actual: TraceReader, expected: TraceReader,
+                    start: int = 0) -> Optional[FrameDiff]:
+    """
+    Returns the first frame from round start on that differs, or None
+    """
+    return next(iter_divergences(actual, expected, start), None)
+
+
+def format_diff(diff: FrameDiff) -> str:
+    """
+    Describes a differing frame, one differing cell per line
+    """
+    lines = [f'round {diff.round_num}: score actual {diff.actual_score}, '
+             f'expected {diff.expected_score}']
+    for (x, y), actual_color, expected_color in diff.cells:
+        lines.append(f'  ({x}, {y}): actual {actual_color}, expected {expected_color}')
+    return '\n'.join(lines)
+
+
+def parse_args(argv: List[str]) -> Namespace:
+    parser = argparse.ArgumentParser(
+        prog='trace_diff.py',
+        description='Finds where two snake game traces start to differ',
+    )
+    parser.add_argument('actual',
+                        help='Trace of the actual game')
+    parser.add_argument('expected',
+                        help='Trace of the expected game')
+    parser.add_argument('-s', '--start', type=int, default=0,
+                        help='First round to compare')
+    parser.add_argument('-a', '--all', action='store_true',
+                        help='Report every differing round, not only the first')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    actual, expected = TraceReader(args.actual), TraceReader(args.expected)
+    found = False
+    for diff in iter_divergences(actual, expected, args.start):
+        found = True
+        print(format_diff(diff))
+        if not args.all:
+            break
+    if not found:
+        print(f'no differences in {max(len(actual), len(expected))} rounds')
+    sys.exit(1 if found else 0)
@@ -0,0 +1,174 @@
+import os
+import json
+import mmap
+from array import array
+from typing import Any, Dict, Optional, Tuple
+
+# A trace is one JSON line per frame: [score, key, [[x, y, color], ...]] with
+# the cells sorted, so equal frames are equal bytes. It may start with a
+# header line {"width": W, "height": H} giving the board size; traces written
+# before the header existed have none. The sidecar file INDEX_SUFFIX holds the
+# byte offset of every frame line and, last, the file size, as unsigned 64 bit
+# integers.
+INDEX_SUFFIX = ".idx"
+
+TraceFrame = Tuple[Any, Optional[str], Dict[Tuple[int, int], str]]
+
+
+def encode_frame(score: Any, key: Optional[str], cells: Dict[Tuple[int, int], str]) -> bytes:
+    """
+    Returns the trace line of a frame, newline included
+    """
+    return json.dumps([score, key, [[x, y, color] for (x, y), color in sorted(cells.items())]],
+                      separators=(',', ':')).encode() + b'\n'
+
+
+def encode_header(width: int, height: int) -> bytes:
+    """
+    Returns the header line of a trace of a width x height board, newline included
+    """
+    return json.dumps({'width': width, 'height': height}, separators=(',', ':')).encode() + b'\n'
+
+
+def decode_frame(line: bytes) -> TraceFrame:
+    """
+    Returns (score, key, {(x, y): color}) of a trace line
+    """
+    score, key, cells = json.loads(line)
+    return score, key, {(x, y): color for x, y, color in cells}
+
+
+class TraceWriter:
+    """
+    Writes a trace file frame by frame and its index when closed.
+    """
+
+    def __init__(self, path: str, width: Optional[int] = None,
+                 height: Optional[int] = None) -> None:
+        """
+        :param width: board width written to the header, no header if width or height is None
+        :param height: board height written to the header
+        """
+        self._path = path
+        self._file = open(path, 'wb')
+        self._offsets = array('Q')
+        self._size = 0
+        if width is not None and height is not None:
+            header = encode_header(width, height)
+            self._file.write(header)
+            self._size = len(header)
+
+    def write(self, score: Any, key: Optional[str], cells: Dict[Tuple[int, int], str]) -> None:
+        """
+        Appends a frame
+        :param score: the score shown
+        :param key: the key applied in the round of the frame, None if there was none
+        :param cells: the color of every cell drawn
+        """
+        line = encode_frame(score, key, cells)
+        self._offsets.append(self._size)
+        self._file.write(line)
+        self._size += len(line)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def close(self) -> None:
+        """
+        Closes the trace and writes its index
+        """
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        write_index(self._path, self._offsets, self._size)
+
+    def __enter__(self) -> 'TraceWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_index(path: str, offsets: array, size: int) -> None:
+    """
+    Writes the index sidecar of the trace at path
+    """
+    index = array('Q', offsets)
+    index.append(size)
+    with open(path + INDEX_SUFFIX, 'wb') as f:
+        index.tofile(f)
+
+
+class TraceReader:
+    """
+    Reads frames of a trace file on demand. The file is memory mapped and
+    only the requested frame is decoded, so opening a trace costs reading
+    its index whatever its size. A missing or outdated index is rebuilt.
+    width and height are the board size from the header, None without one.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            # an empty file cannot be mapped
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.width: Optional[int] = None
+        self.height: Optional[int] = None
+        start = 0
+        if self._data[:1] == b'{':
+            end = self._data.find(b'\n')
+            start = size if end < 0 else end + 1
+            header = json.loads(self._data[:start])
+            self.width, self.height = header['width'], header['height']
+        self._index = self._read_index(start, size)
+
+    def _read_index(self, start: int, size: int) -> array:
+        """
+        Internal: loads the index, or rebuilds it by scanning for line ends
+        """
+        index = array('Q')
+        try:
+            with open(self.path + INDEX_SUFFIX, 'rb') as f:
+                index.frombytes(f.read())
+        except (OSError, ValueError):
+            pass
+        if index and index[-1] == size:
+            return index
+        index = array('Q')
+        pos = start
+        while pos < size:
+            index.append(pos)
+            end = self._data.find(b'\n', pos)
+            pos = size if end < 0 else end + 1
+        try:
+            write_index(self.path, index, size)
+        except OSError:
+            pass
+        index.append(size)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._index) - 1
+
+    def raw(self, num: int) -> bytes:
+        """
+        Returns the undecoded line of frame num, newline included
+        """
+        if num < 0:
+            num += len(self)
+        if not 0 <= num < len(self):
+            raise IndexError("trace frame out of range: " + str(num))
+        return self._data[self._index[num]:self._index[num + 1]]
+
+    def __getitem__(self, num: int) -> TraceFrame:
+        """
+        Returns (score, key, {(x, y): color}) of frame num
+        """
+        return decode_frame(self.raw(num))
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
@@ -0,0 +1,790 @@
+import sys
+import time
+import argparse
+from argparse import Namespace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# numpy is only needed by this module, the game itself runs without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import game_utils
+from batch_runner import parse_seeds, policy_random
+from regression_runner import TraceBuffer, play_case
+from replay import KEYS, Replay
+from snake_game import DEATH_BORDER, DEATH_SELF, DEATH_WALL
+from trace_diff import find_divergence
+
+# Directions and keys are coded by their index in replay.KEYS, 0 is no key
+UP, DOWN, LEFT, RIGHT = 1, 2, 3, 4
+DIRECTION_CODES = {key: code for code, key in enumerate(KEYS)}
+DEATH_CAUSES = [None, DEATH_BORDER, DEATH_SELF, DEATH_WALL]
+_BORDER, _SELF, _WALL = 1, 2, 3
+# step of every direction code, and the direction it cannot turn to
+_DX = [0, 0, 0, -1, 1]
+_DY = [0, 1, -1, 0, 0]
+_OPPOSITE = [0, DOWN, UP, RIGHT, LEFT]
+
+# a cell is stored as one integer, offset so cells off the board stay positive
+_INT = 'int32'
+_OFFSET = 1 << 14
+_STRIDE = 1 << 15
+_EMPTY = -1
+_START_CAPACITY = 16
+# fields of a wall: its center, and the step it moves by which also gives its axis
+_WX, _WY, _WDX, _WDY = range(4)
+
+RNG_COMPAT = "compat"
+RNG_FAST = "fast"
+RNG_MODES = [RNG_COMPAT, RNG_FAST]
+
+COLOR_APPLE = "green"
+COLOR_SNAKE = "black"
+COLOR_WALL = "blue"
+
+
+def require_numpy() -> None:
+    """
+    Raises ImportError when numpy, needed by the vector engine, is missing
+    """
+    if np is None:
+        raise ImportError("the vector engine needs numpy (pip install numpy)")
+
+
+class CompatDraws:
+    """
+    Draws every game's apples and walls from its own game_utils.GameRandom,
+    so a game plays out exactly as SnakeGame plays the same seed.
+    Drawing loops over the games in Python.
+    """
+
+    def __init__(self, seeds: Sequence[Any], width: int, height: int) -> None:
+        self._rngs = [game_utils.GameRandom(seed, width, height) for seed in seeds]
+
+    def apples(self, games: "np.ndarray") -> "np.ndarray":
+        """
+        :return: (x, y) of the next apple of every game given
+        """
+        return np.array([self._rngs[game].get_random_apple_data() for game in games],
+                        dtype=_INT).reshape(-1, 2)
+
+    def walls(self, games: "np.ndarray") -> "np.ndarray":
+        """
+        :return: (x, y, direction code) of the next wall of every game given
+        """
+        data = []
+        for game in games:
+            x, y, direction = self._rngs[game].get_random_wall_data()
+            data.append((x, y, DIRECTION_CODES[direction]))
+        return np.array(data, dtype=_INT).reshape(-1, 3)
+
+
+class FastDraws:
+    """
+    Draws all the games' apples and walls at once from one numpy generator.
+    The games follow the same rules but not the same random data as SnakeGame.
+    """
+
+    def __init__(self, seed: Any, width: int, height: int) -> None:
+        self._gen = np.random.default_rng(seed)
+        self._width, self._height = width, height
+
+    def apples(self, games: "np.ndarray") -> "np.ndarray":
+        count = len(games)
+        return np.stack([self._gen.integers(0, self._width, count, dtype=_INT),
+                         self._gen.integers(0, self._height, count, dtype=_INT)], axis=1)
+
+    def walls(self, games: "np.ndarray") -> "np.ndarray":
+        count = len(games)
+        return np.stack([self._gen.integers(0, self._width, count, dtype=_INT),
+                         self._gen.integers(0, self._height, count, dtype=_INT),
+                         self._gen.integers(UP, RIGHT + 1, count, dtype=_INT)], axis=1)
+
+
+def _cell_code(x: "np.ndarray", y: "np.ndarray") -> "np.ndarray":
+    """Internal: the integer stored for cell (x, y)"""
+    return (x + _OFFSET) * _STRIDE + (y + _OFFSET)
+
+
+def _wall_fields(data: "np.ndarray") -> "np.ndarray":
+    """Internal: the wall fields of drawn (x, y, direction code) rows"""
+    direction = data[:, 2]
+    return np.stack([data[:, 0], data[:, 1], np.array(_DX, dtype=_INT)[direction],
+                     np.array(_DY, dtype=_INT)[direction]], axis=1)
+
+
+def _entries(count: "np.ndarray", size: int) -> "np.ndarray":
+    """Internal: [games, size] mask of the entries of lists holding count entries"""
+    return np.arange(size)[None, :] < count[:, None]
+
+
+def _pop_skip(match: "np.ndarray") -> "np.ndarray":
+    """
+    Internal: which list entries SnakeGame removes when it pops every match
+    while enumerating the list. The entry after a removed one moves into its
+    place and is skipped, so of consecutive matches every other one goes.
+
+    :param match: [games, entries] matches in list order.
+    """
+    removed = np.zeros_like(match)
+    previous = np.zeros(match.shape[0], dtype=bool)
+    for index in range(match.shape[1]):
+        previous = match[:, index] & ~previous
+        removed[:, index] = previous
+    return removed
+
+
+def _pop_front(src: "np.ndarray", src_count: "np.ndarray", dst: "np.ndarray",
+               dst_count: "np.ndarray", rows: "np.ndarray") -> None:
+    """
+    Internal: list.pop(0) of src appended to dst, for every game in rows
+    """
+    dst[rows, dst_count[rows]] = src[rows, 0]
+    src[rows, :-1] = src[rows, 1:]
+    src_count[rows] -= 1
+    dst_count[rows] += 1
+
+
+def _move_removed(src: "np.ndarray", src_count: "np.ndarray", dst: "np.ndarray",
+                  dst_count: "np.ndarray", removed: "np.ndarray") -> None:
+    """
+    Internal: moves the removed entries of src to the end of dst, keeping
+    the order of both lists
+    """
+    games = np.nonzero(removed.any(axis=1))[0]
+    if not games.size:
+        return
+    removed = removed[games]
+    rows, cols = np.nonzero(removed)
+    rank = np.cumsum(removed, axis=1)[rows, cols] - 1
+    dst[games[rows], dst_count[games[rows]] + rank] = src[games[rows], cols]
+    removed_count = removed.sum(axis=1)
+    dst_count[games] += removed_count
+    src_count[games] -= removed_count
+    # a stable sort puts the kept entries first, in order
+    order = np.argsort(removed, axis=1, kind='stable')
+    src[games] = np.take_along_axis(src[games], order[:, :, None], axis=1)
+
+
+class VectorGames:
+    """
+    Many independent games held as arrays and advanced one round per call
+    to step(), following the rules of SnakeGame.update_objects and
+    snake_main.play_round, quirks included.
+
+    Games are started as batch_runner.run_one starts them, with legacy
+    spawning. Every game still running has a slot in the internal arrays;
+    games that are over are dropped from them now and then, their results
+    stay in score, rounds, death, alive and length. The snake body of a slot
+    is a ring buffer of cell codes, head at self._head, indexed by a bit
+    board of the board cells it covers. Walls and apples are kept as lists
+    in the order SnakeGame keeps them, since that order decides which are
+    eaten, cut or taken out first.
+    """
+
+    # every per slot array, compacted together
+    _SLOT_FIELDS = ('_ids', '_x', '_y', '_direction', '_length', '_food', '_alive', '_score',
+                    '_death', '_rounds', '_move_wall', '_body', '_body_len', '_head',
+                    '_bits', '_outside', '_walls', '_wall_count',
+                    '_active_walls', '_active_wall_count', '_apples', '_apple_count',
+                    '_active_apples', '_active_apple_count')
+
+    def __init__(self, seeds: Sequence[Any], width: int, height: int, apples: int,
+                 walls: int, rng_mode: str = RNG_COMPAT, fast_seed: Any = None) -> None:
+        """
+        :param seeds: One seed per game, as given to game_utils.GameRandom.
+        :param width: Game board width.
+        :param height: Game board height.
+        :param apples: Number of apples of every game.
+        :param walls: Number of walls of every game.
+        :param rng_mode: RNG_COMPAT draws every game's data as SnakeGame does,
+            RNG_FAST draws all of it from one numpy generator seeded with fast_seed.
+        """
+        require_numpy()
+        if rng_mode not in RNG_MODES:
+            raise ValueError("unknown rng mode: " + str(rng_mode))
+        count = len(seeds)
+        self.width, self.height = width, height
+        self.seeds = list(seeds)
+        self._draws = CompatDraws(seeds, width, height) if rng_mode == RNG_COMPAT \
+            else FastDraws(fast_seed, width, height)
+
+        # results of every game, kept up to date for the games still held
+        self.score = np.zeros(count, dtype=np.int64)
+        self.rounds = np.zeros(count, dtype=np.int64)
+        self.death = np.zeros(count, dtype=np.int64)
+        self.alive = np.ones(count, dtype=bool)
+        self.length = np.full(count, 3, dtype=np.int64)
+        self._slot_of = np.arange(count)
+
+        # the snake, as Snake(width // 2, height // 2)
+        self._ids = np.arange(count)
+        self._x = np.full(count, width // 2, dtype=_INT)
+        self._y = np.full(count, height // 2, dtype=_INT)
+        self._direction = np.full(count, UP, dtype=_INT)
+        self._length = np.full(count, 3, dtype=_INT)
+        self._food = np.zeros(count, dtype=_INT)
+        self._alive = np.ones(count, dtype=bool)
+        self._score = np.zeros(count, dtype=np.int64)
+        self._death = np.zeros(count, dtype=_INT)
+        self._rounds = np.zeros(count, dtype=_INT)
+        self._move_wall = np.zeros(count, dtype=bool)
+        # the body deque may hold fewer cells than length once the snake was killed
+        self._capacity = _START_CAPACITY
+        self._body = np.full((count, self._capacity), _EMPTY, dtype=_INT)
+        self._body_len = np.zeros(count, dtype=_INT)
+        self._head = np.full(count, -1, dtype=_INT)
+        # one bit per board cell on the body, and the number of body cells off the board
+        self._words = (width * height + 63) // 64
+        self._bits = np.zeros((count, self._words), dtype=np.uint64)
+        self._outside = np.zeros(count, dtype=_INT)
+        self._index_slots()
+        for i in range(3):
+            self._append_tail(self._slots, _cell_code(self._x, self._y - i))
+
+        # walls and apples (x, y): waiting lists and active lists
+        self._walls = np.zeros((count, max(walls, 1), 4), dtype=_INT)
+        self._wall_count = np.full(count, walls, dtype=_INT)
+        self._active_walls = np.zeros_like(self._walls)
+        self._active_wall_count = np.zeros(count, dtype=_INT)
+        for i in range(walls):
+            self._walls[:, i] = _wall_fields(self._draws.walls(self._ids))
+        self._apples = np.zeros((count, max(apples, 1), 2), dtype=_INT)
+        self._apple_count = np.full(count, apples, dtype=_INT)
+        self._active_apples = np.zeros_like(self._apples)
+        self._active_apple_count = np.zeros(count, dtype=_INT)
+        for i in range(apples):
+            self._apples[:, i] = self._draws.apples(self._ids)
+
+        everyone = np.ones(count, dtype=bool)
+        self._add_wall(everyone)
+        self._add_apple(everyone)
+
+    def __len__(self) -> int:
+        return len(self.seeds)
+
+    def get_death_cause(self, game: int) -> Optional[str]:
+        """
+        Returns what killed the snake of a game, as SnakeGame.get_death_cause
+        """
+        return DEATH_CAUSES[self.death[game]]
+
+    def step(self, keys: Optional["np.ndarray"] = None,
+             playing: Optional["np.ndarray"] = None) -> "np.ndarray":
+        """
+        Plays one round of every game that is not over.
+
+        :param keys: [games] key code (index in replay.KEYS) of every game, no key if None.
+        :param playing: [games] optional mask of the games to play, the others wait.
+        :return: [games] mask of the games that played the round.
+        """
+        if 4 * np.count_nonzero(self._alive) <= 3 * len(self._ids):
+            self._compact()
+        ids = self._ids
+        act = self._alive.copy() if playing is None else self._alive & playing[ids]
+        played = np.zeros(len(self), dtype=bool)
+        if not act.any():
+            return played
+        keys = np.zeros(len(ids), dtype=_INT) if keys is None \
+            else np.where(act, np.asarray(keys)[ids], 0).astype(_INT)
+        if self._body_len.max() + 2 > self._capacity:
+            self._grow()
+        self._move_snake(act, keys)
+        self._move_walls(act)
+        self._snake_eat(act)
+        self._wall_eat_snake(act)
+        self._wall_eat_apple(act)
+        self._add_wall(act)
+        self._wall_out(act)
+        self._add_apple(act)
+        # snake_main.change_apple_list / change_wall_list
+        rows = np.nonzero(act & (self._apple_count > 0))[0]
+        if rows.size:
+            self._apples[rows, 0] = self._draws.apples(ids[rows])
+        rows = np.nonzero(act & (self._wall_count > 0))[0]
+        if rows.size:
+            self._walls[rows, 0] = _wall_fields(self._draws.walls(ids[rows]))
+        self._rounds += act
+        self.score[ids] = self._score
+        self.rounds[ids] = self._rounds
+        self.death[ids] = self._death
+        self.alive[ids] = self._alive
+        self.length[ids] = self._length
+        played[ids[act]] = True
+        return played
+
+    def run(self, keys: Optional[Any] = None, max_rounds: Optional[int] = None) -> int:
+        """
+        Plays all the games until they are over, as snake_main.run_game.
+
+        :param keys: Optional callable taking the round number and the mask
+            of running games, returning the key codes of the round.
+        :param max_rounds: Optional limit on the number of rounds of every game.
+        :return: The number of board steps played.
+        """
+        steps = 0
+        round_num = 0
+        while max_rounds is None or round_num < max_rounds:
+            playing = self.alive.copy()
+            if not playing.any():
+                break
+            self.step(keys(round_num, playing) if keys is not None else None, playing)
+            steps += int(np.count_nonzero(playing))
+            round_num += 1
+        return steps
+
+    def _index_slots(self) -> None:
+        """
+        Internal: numbers the slots and finds their bit boards in the flat one
+        """
+        self._slots = np.arange(len(self._ids))
+        self._board_base = self._slots * self._words
+        self._flat_bits = self._bits.reshape(-1)
+
+    def _compact(self) -> None:
+        """
+        Internal: drops the games that are over from the slots
+        """
+        keep = self._alive
+        for name in self._SLOT_FIELDS:
+            setattr(self, name, getattr(self, name)[keep])
+        self._index_slots()
+        self._slot_of[:] = -1
+        self._slot_of[self._ids] = self._slots
+
+    def _board_bits(self, rows: "np.ndarray", x: "np.ndarray",
+                    y: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """
+        Internal: which cells are on the board, their word in the flat bit
+        board and their bit in that word
+        """
+        inside = (0 <= x) & (x < self.width) & (0 <= y) & (y < self.height)
+        cell = np.where(inside, x * self.height + y, 0)
+        return (inside, self._board_base[rows] + (cell >> 6),
+                np.left_shift(np.uint64(1), (cell & 63).astype(np.uint64)))
+
+    # snake
+
+    def _grow(self) -> None:
+        """
+        Internal: doubles the ring buffers, moving every body to the front
+        """
+        capacity = self._capacity * 2
+        positions = np.arange(self._capacity)[None, :]
+        old_slots = (self._head[:, None] - positions) % self._capacity
+        cells = np.take_along_axis(self._body, old_slots, axis=1)
+        body = np.full((len(self._ids), capacity), _EMPTY, dtype=_INT)
+        rows, cols = np.nonzero(positions < self._body_len[:, None])
+        body[rows, self._body_len[rows] - 1 - cols] = cells[rows, cols]
+        self._body, self._capacity = body, capacity
+        self._head = self._body_len - 1
+
+    def _mark(self, rows: "np.ndarray", cells: "np.ndarray", delta: int,
+              unique: bool = True) -> None:
+        """
+        Internal: adds (1) or removes (-1) body cells to the bit board of their slots
+        :param unique: False when rows repeat, their cells may then share words
+        """
+        inside, words, bits = self._board_bits(rows, cells // _STRIDE - _OFFSET,
+                                               cells % _STRIDE - _OFFSET)
+        words, bits = words[inside], bits[inside]
+        if unique:
+            if delta > 0:
+                self._flat_bits[words] |= bits
+            else:
+                self._flat_bits[words] &= ~bits
+        elif delta > 0:
+            np.bitwise_or.at(self._flat_bits, words, bits)
+        else:
+            np.bitwise_and.at(self._flat_bits, words, ~bits)
+        if not inside.all():
+            np.add.at(self._outside, rows[~inside], delta)
+
+    def _on_body(self, rows: "np.ndarray", x: "np.ndarray", y: "np.ndarray") -> "np.ndarray":
+        """Internal: Snake.is_on_body of one cell for every slot in rows"""
+        inside, words, bits = self._board_bits(rows, x, y)
+        found = inside & (self._flat_bits[words] & bits != 0)
+        # off the board look through the body itself, when it has cells there
+        far = np.nonzero(~inside & (self._outside[rows] > 0))[0]
+        if far.size:
+            cells = _cell_code(x[far], y[far])
+            found[far] = (self._body[rows[far]] == cells[:, None]).any(axis=1)
+        return found
+
+    def _tail(self) -> "np.ndarray":
+        """Internal: the code of every snake's last cell, _EMPTY for an empty body"""
+        return self._body[self._slots, (self._head - self._body_len + 1) % self._capacity]
+
+    def _push_head(self, rows: "np.ndarray", cells: "np.ndarray") -> None:
+        """Internal: deque.appendleft"""
+        self._head[rows] += 1
+        self._body[rows, self._head[rows] % self._capacity] = cells
+        self._body_len[rows] += 1
+        self._mark(rows, cells, 1)
+
+    def _append_tail(self, rows: "np.ndarray", cells: "np.ndarray") -> None:
+        """Internal: deque.append, the first cell of an empty body goes to the head"""
+        self._body[rows, (self._head[rows] - self._body_len[rows]) % self._capacity] = cells
+        self._body_len[rows] += 1
+        self._mark(rows, cells, 1)
+
+    def _pop_tail(self, rows: "np.ndarray") -> None:
+        """Internal: deque.pop"""
+        slots = (self._head[rows] - self._body_len[rows] + 1) % self._capacity
+        self._mark(rows, self._body[rows, slots], -1)
+        self._body[rows, slots] = _EMPTY
+        self._body_len[rows] -= 1
+
+    def _kill(self, mask: "np.ndarray") -> None:
+        """
+        Internal: Snake.kill, which takes the head cell off the body but
+        keeps the length. Snake.kill fails on an empty body, here the
+        body just stays empty.
+        """
+        mask = mask & (self._length != 0)
+        self._alive[mask] = False
+        rows = np.nonzero(mask & (self._body_len > 0))[0]
+        slots = self._head[rows] % self._capacity
+        self._mark(rows, self._body[rows, slots], -1)
+        self._body[rows, slots] = _EMPTY
+        self._head[rows] -= 1
+        self._body_len[rows] -= 1
+
+    def _set_death(self, mask: "np.ndarray", cause: int) -> None:
+        """Internal: SnakeGame.__set_death_cause"""
+        self._death[mask & ~self._alive & (self._death == 0)] = cause
+
+    def _move(self, mask: "np.ndarray") -> "np.ndarray":
+        """
+        Internal: Snake.move
+        :return: mask of the slots whose snake failed to move and died
+        """
+        self._x += np.where(mask, np.array(_DX, dtype=_INT)[self._direction], 0)
+        self._y += np.where(mask, np.array(_DY, dtype=_INT)[self._direction], 0)
+        head = _cell_code(self._x, self._y)
+        tail = self._tail()
+        moved = mask & ~(self._on_body(self._slots, self._x, self._y) & (head != tail))
+        # with food in the belly the tail stays, moving into it is a collision
+        fed = moved & (self._food > 0)
+        moved &= ~(fed & (head == tail))
+        fed &= moved
+        self._food -= fed
+        self._length += fed
+        self._pop_tail(np.nonzero(moved & ~fed)[0])
+        rows = np.nonzero(moved)[0]
+        self._push_head(rows, head[rows])
+        failed = mask & ~moved
+        if failed.any():
+            self._kill(failed)
+        return failed
+
+    def _move_snake(self, act: "np.ndarray", keys: "np.ndarray") -> None:
+        """Internal: SnakeGame.move_snake"""
+        x, y = self._x, self._y
+        last_x, last_y = self.width - 1, self.height - 1
+        by_key = act & (((keys == LEFT) & (x > 0)) | ((keys == RIGHT) & (x < last_x)) |
+                        ((keys == UP) & (y < last_y)) | ((keys == DOWN) & (y > 0)))
+        rest = act & ~by_key
+        inside = rest & (0 < x) & (x < last_x) & (0 < y) & (y < last_y)
+        edge = rest & ~inside & ((x == 0) | (y == 0) | (x == last_x) | (y == last_y))
+        # Snake.set_direction never turns the snake around
+        opposite = np.array(_OPPOSITE, dtype=_INT)[self._direction]
+        turn = (by_key | (edge & (keys != 0))) & (keys != opposite)
+        self._direction = np.where(turn, keys, self._direction)
+        # move_snake_edge
+        direction = self._direction
+        border = edge & (((x == 0) & (direction == LEFT)) |
+                         ((x == last_x) & (direction == RIGHT)) |
+                         ((y == 0) & (direction == DOWN)) |
+                         ((y == last_y) & (direction == UP)))
+        if border.any():
+            self._kill(border)
+            self._set_death(border, _BORDER)
+        failed = self._move(by_key | inside | (edge & ~border))
+        # move_snake kills once more when the move failed, move_snake_edge does not
+        if failed.any():
+            self._kill(failed & (by_key | inside))
+            self._set_death(act, _SELF)
+
+    # walls and apples
+
+    def _move_walls(self, act: "np.ndarray") -> None:
+        """Internal: SnakeGame.move_wall, walls move every other round"""
+        move = act & self._move_wall
+        self._move_wall ^= act
+        if not move.any():
+            return
+        walls = self._active_walls
+        move = move[:, None] & _entries(self._active_wall_count, walls.shape[1])
+        walls[:, :, _WX] += move * walls[:, :, _WDX]
+        walls[:, :, _WY] += move * walls[:, :, _WDY]
+
+    @staticmethod
+    def _wall_covers(walls: "np.ndarray", x: "np.ndarray", y: "np.ndarray") -> "np.ndarray":
+        """
+        Internal: whether cell (x, y) is in Wall.get_wall_body, walls and
+        cells broadcast. The body lies along the direction of travel, the
+        cell is on it when it is on that axis at most one cell from the center.
+        """
+        dx, dy = x - walls[..., _WX], y - walls[..., _WY]
+        return (dx * walls[..., _WDY] == dy * walls[..., _WDX]) & (abs(dx) + abs(dy) <= 1)
+
+    def _valid_loc(self, rows: "np.ndarray", x: "np.ndarray", y: "np.ndarray") -> "np.ndarray":
+        """
+        Internal: SnakeGame.valid_loc of one cell for every slot in rows,
+        apples never block
+        """
+        inside = (0 <= x) & (x < self.width) & (0 <= y) & (y < self.height)
+        walls = self._active_walls[rows]
+        on_wall = (self._wall_covers(walls, x[:, None], y[:, None]) &
+                   _entries(self._active_wall_count[rows], walls.shape[1])).any(axis=1)
+        return inside & ~on_wall & ~self._on_body(rows, x, y)
+
+    def _snake_eat(self, act: "np.ndarray") -> None:
+        """Internal: SnakeGame.snake_eat"""
+        apples = self._active_apples
+        match = (apples[:, :, 0] == self._x[:, None]) & (apples[:, :, 1] == self._y[:, None])
+        match &= act[:, None] & _entries(self._active_apple_count, apples.shape[1])
+        if not match.any():
+            return
+        eaten = _pop_skip(match)
+        count = eaten.sum(axis=1)
+        self._score += count * np.floor(np.sqrt(self._length)).astype(np.int64)
+        self._food += 3 * count.astype(_INT)
+        _move_removed(apples, self._active_apple_count, self._apples, self._apple_count, eaten)
+
+    def _cut(self, mask: "np.ndarray", cells: "np.ndarray") -> None:
+        """Internal: Snake.cut, for snakes whose body holds the cell"""
+        rows = np.nonzero(mask)[0]
+        body, head = self._body[rows], self._head[rows]
+        index = (head - np.argmax(body == cells[rows, None], axis=1)) % self._capacity
+        positions = (head[:, None] - np.arange(self._capacity)[None, :]) % self._capacity
+        dropped = (positions >= index[:, None]) & (positions < self._body_len[rows, None])
+        drop_rows, drop_cols = np.nonzero(dropped)
+        self._mark(rows[drop_rows], body[drop_rows, drop_cols], -1, unique=False)
+        body[dropped] = _EMPTY
+        self._body[rows] = body
+        self._body_len[rows] = index
+        # cutting right behind the head kills the snake and leaves it on the cut cell
+        behind_head = rows[index == 1]
+        if behind_head.size:
+            kill = np.zeros_like(mask)
+            kill[behind_head] = True
+            self._kill(kill)
+            self._append_tail(behind_head, cells[behind_head])
+        self._length[rows] = index
+
+    def _wall_eat_snake(self, act: "np.ndarray") -> None:
+        """Internal: SnakeGame.wall_eat_snake, wall after wall in list order"""
+        walls = self._active_walls
+        for index in range(walls.shape[1]):
+            present = act & (index < self._active_wall_count)
+            if not present.any():
+                break
+            wall = walls[:, index]
+            hit = present & self._wall_covers(wall, self._x, self._y)
+            if hit.any():
+                self._kill(hit)
+            # the edge is the cell ahead of the center
+            edge_x, edge_y = wall[:, _WX] + wall[:, _WDX], wall[:, _WY] + wall[:, _WDY]
+            rows = np.nonzero(present & ~hit)[0]
+            cut = np.zeros_like(present)
+            cut[rows] = self._on_body(rows, edge_x[rows], edge_y[rows])
+            if cut.any():
+                self._cut(cut, _cell_code(edge_x, edge_y))
+        self._set_death(act, _WALL)
+
+    def _wall_eat_apple(self, act: "np.ndarray") -> None:
+        """Internal: SnakeGame.wall_eat_apple"""
+        walls, apples = self._active_walls, self._active_apples
+        entries = _entries(self._active_apple_count, apples.shape[1])
+        for index in range(walls.shape[1]):
+            present = act & (index < self._active_wall_count)
+            if not present.any():
+                break
+            edge_x = walls[:, index, _WX] + walls[:, index, _WDX]
+            edge_y = walls[:, index, _WY] + walls[:, index, _WDY]
+            match = (apples[:, :, 0] == edge_x[:, None]) & (apples[:, :, 1] == edge_y[:, None])
+            match &= present[:, None] & entries
+            if match.any():
+                _move_removed(apples, self._active_apple_count, self._apples, self._apple_count,
+                              _pop_skip(match))
+                entries = _entries(self._active_apple_count, apples.shape[1])
+
+    def _add_wall(self, act: "np.ndarray") -> None:
+        """Internal: SnakeGame.add_wall with legacy spawning"""
+        rows = np.nonzero(act & (self._wall_count > 0))[0]
+        if not rows.size:
+            return
+        wall = self._walls[rows, 0]
+        step_x, step_y = abs(wall[:, _WDX]), abs(wall[:, _WDY])
+        add = np.ones(len(rows), dtype=bool)
+        for offset in (-1, 0, 1):
+            add &= self._valid_loc(rows, wall[:, _WX] + offset * step_x,
+                                   wall[:, _WY] + offset * step_y)
+        _pop_front(self._walls, self._wall_count, self._active_walls, self._active_wall_count,
+                   rows[add])
+
+    def _wall_out(self, act: "np.ndarray") -> None:
+        """
+        Internal: SnakeGame.wall_out. Walls start on the board and move one
+        way, so a wall is out once the cell furthest behind its edge is off
+        the board.
+        """
+        walls = self._active_walls
+        x = walls[:, :, _WX] - walls[:, :, _WDX]
+        y = walls[:, :, _WY] - walls[:, :, _WDY]
+        out = (x < 0) | (x >= self.width) | (y < 0) | (y >= self.height)
+        out &= act[:, None] & _entries(self._active_wall_count, walls.shape[1])
+        if out.any():
+            _move_removed(walls, self._active_wall_count, self._walls, self._wall_count,
+                          _pop_skip(out))
+
+    def _add_apple(self, act: "np.ndarray") -> None:
+        """Internal: SnakeGame.add_apple with legacy spawning"""
+        rows = np.nonzero(act & (self._apple_count > 0))[0]
+        if not rows.size:
+            return
+        apple = self._apples[rows, 0]
+        add = self._valid_loc(rows, apple[:, 0], apple[:, 1])
+        _pop_front(self._apples, self._apple_count, self._active_apples,
+                   self._active_apple_count, rows[add])
+
+    def _slot(self, game: int) -> int:
+        """Internal: the slot of a game, which must still be held"""
+        slot = self._slot_of[game]
+        if slot < 0:
+            raise ValueError("game is over and no longer held: " + str(game))
+        return slot
+
+    def get_board(self, game: int) -> Dict[Tuple[int, int], str]:
+        """
+        Returns the cells SnakeGame.draw_board draws for a game. Games that
+        are over are only held until the next step.
+        """
+        slot = self._slot(game)
+        cells: Dict[Tuple[int, int], str] = {}
+        for x, y in self._active_apples[slot, :self._active_apple_count[slot]].tolist():
+            cells[x, y] = COLOR_APPLE
+        body = self._body[slot]
+        for code in body[body != _EMPTY].tolist():
+            cells[code // _STRIDE - _OFFSET, code % _STRIDE - _OFFSET] = COLOR_SNAKE
+        for x, y, dx, dy in self._active_walls[slot, :self._active_wall_count[slot]].tolist():
+            for offset in (-1, 0, 1):
+                cell = (x + offset * abs(dx), y + offset * abs(dy))
+                if 0 <= cell[0] < self.width and 0 <= cell[1] < self.height:
+                    cells[cell] = COLOR_WALL
+        return cells
+
+    def get_head(self, game: int) -> Tuple[int, int, str]:
+        """
+        Returns (x, y, direction) of the snake's head of a game still held
+        """
+        slot = self._slot(game)
+        return int(self._x[slot]), int(self._y[slot]), KEYS[self._direction[slot]]
+
+
+def random_keys(gen: "np.random.Generator", count: int) -> "np.ndarray":
+    """
+    Key codes for count games, drawn as batch_runner.policy_random draws
+    keys: no key half of the time, else any of the four keys
+    """
+    choice = gen.integers(0, 8, count)
+    return np.where(choice < 4, choice + 1, 0)
+
+
+def check_conformance(seeds: Sequence[Any], width: int, height: int, apples: int, walls: int,
+                      max_rounds: int) -> List[Tuple[Any, Optional[int], str]]:
+    """
+    Plays every seed both with SnakeGame and VectorGames, with the keys of
+    batch_runner.policy_random, and compares the two traces frame by frame.
+
+    :return: (seed, first differing frame or None, message) of every game that differs.
+    """
+    args = {'width': width, 'height': height, 'apples': apples, 'walls': walls,
+            'debug': False}
+    policies = [policy_random(seed) for seed in seeds]
+    keys = [[next(policy) for _ in range(max_rounds)] for policy in policies]
+    games = VectorGames(seeds, width, height, apples, walls)
+    traces = [TraceBuffer() for _ in seeds]
+
+    def write_frames(played: "np.ndarray", round_keys: List[Optional[str]]) -> None:
+        for game in np.nonzero(played)[0]:
+            cells = games.get_board(game)
+            # HeadlessDisplay writes no frame when nothing was drawn
+            if cells:
+                traces[game].write(int(games.score[game]), round_keys[game], cells)
+
+    write_frames(np.ones(len(seeds), dtype=bool), [None] * len(seeds))
+    for round_num in range(max_rounds):
+        round_keys = [game_keys[round_num] for game_keys in keys]
+        played = games.step(np.array([DIRECTION_CODES[key] for key in round_keys]))
+        if not played.any():
+            break
+        write_frames(played, round_keys)
+
+    mismatches = []
+    for game, seed in enumerate(seeds):
+        expected = TraceBuffer()
+        try:
+            play_case(Replay(str(seed), args, [(key, 1) for key in keys[game]]), expected)
+        except Exception as e:
+            mismatches.append((seed, None, f'SnakeGame raised {type(e).__name__}: {e}'))
+            continue
+        diff = find_divergence(traces[game], expected)
+        if diff is not None:
+            mismatches.append((seed, diff.round_num,
+                               f'score {diff.actual_score}, expected {diff.expected_score}, '
+                               f'{len(diff.cells)} cells differ'))
+    return mismatches
+
+
+def parse_args(argv: List[str]) -> Namespace:
+    parser = argparse.ArgumentParser(
+        prog='vector_engine.py',
+        description='Plays many snake games at once with numpy arrays',
+    )
+    parser.add_argument('-s', '--seeds', type=parse_seeds, default=range(10000),
+                        help="Seed range as 'start:stop' or a count")
+    parser.add_argument('-x', '--width', type=int, default=game_utils.WIDTH,
+                        help='Game board width')
+    parser.add_argument('-y', '--height', type=int, default=game_utils.HEIGHT,
+                        help='Game board height')
+    parser.add_argument('-a', '--apples', type=int, default=3,
+                        help='Number of apples')
+    parser.add_argument('-w', '--walls', type=int, default=2,
+                        help='Number of walls')
+    parser.add_argument('-m', '--max-rounds', type=int, default=1000,
+                        help='Turns after which a game is stopped')
+    parser.add_argument('--rng', choices=RNG_MODES, default=RNG_FAST,
+                        help='compat draws the same apples and walls as the game, fast draws them with numpy')
+    parser.add_argument('--check', action='store_true',
+                        help='Compare every seed with the object engine instead of timing')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    require_numpy()
+    if args.check:
+        start = time.perf_counter()
+        mismatches = check_conformance(list(args.seeds), args.width, args.height, args.apples,
+                                       args.walls, args.max_rounds)
+        for seed, frame, message in mismatches:
+            where = f'frame {frame}: ' if frame is not None else ''
+            print(f'FAIL seed={seed} {where}{message}')
+        print(f'{len(args.seeds) - len(mismatches)} of {len(args.seeds)} games match the '
+              f'object engine ({time.perf_counter() - start:.2f}s)')
+        sys.exit(1 if mismatches else 0)
+    gen = np.random.default_rng(args.seeds.start)
+    start = time.perf_counter()
+    games = VectorGames(list(args.seeds), args.width, args.height, args.apples, args.walls,
+                        args.rng, args.seeds.start)
+    steps = games.run(lambda round_num, playing: random_keys(gen, len(playing)),
+                      args.max_rounds)
+    elapsed = time.perf_counter() - start
+    print(f'{len(games)} games, {steps} board steps in {elapsed:.2f}s '
+          f'({steps / elapsed if elapsed else 0:.0f} steps/sec), '
+          f'mean score {games.score.mean():.2f}')
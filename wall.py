@@ -7,6 +7,7 @@ RIGHT = "Right"
 
 
 class Wall:
+    __slots__ = ('_x', '_y', '_length', '_color', '_direction', '_wall_body', '_wall_edge')
 
     def __init__(self, x, y, direction):
         self._x = x
@@ -14,36 +15,46 @@ class Wall:
         self._length = WALL_LENGTH
         self._color = COLOR_BLUE
         self._direction = direction
-        self._wall_body = self.get_wall_body()
+        self._update_geometry()
 
-    def get_wall_body(self) -> list:
-        """return the body of the wall"""
+    def _update_geometry(self):
+        """recompute the cached body and edge, only after the wall moved or changed"""
+        x, y = self._x, self._y
         if self._direction == UP or self._direction == DOWN:
-            return [(self._x, self._y - 1), (self._x, self._y), (self._x, self._y + 1)]
+            self._wall_body = ((x, y - 1), (x, y), (x, y + 1))
+        else:
+            self._wall_body = ((x - 1, y), (x, y), (x + 1, y))
+        if self._direction == UP or self._direction == RIGHT:
+            self._wall_edge = self._wall_body[2]
         else:
-            return [(self._x - 1, self._y), (self._x, self._y), (self._x + 1, self._y)]
+            self._wall_edge = self._wall_body[0]
+
+    def get_wall_body(self) -> tuple:
+        """return the body of the wall"""
+        return self._wall_body
+
+    def get_direction(self):
+        """return the direction the wall moves in"""
+        return self._direction
 
     def get_wall_edge(self):
         """return the edge of the wall"""
-        if self._direction == UP or self._direction == RIGHT:
-            return  self._wall_body[2]
-        else:
-            return self._wall_body[0]
+        return self._wall_edge
 
     def move_wall(self):
         """move the wall one stap in hid direction"""
         if self._direction == UP:
             self._y += 1
-            self._wall_body = self.get_wall_body()
+            self._update_geometry()
         elif self._direction == DOWN:
             self._y -= 1
-            self._wall_body = self.get_wall_body()
+            self._update_geometry()
         elif self._direction == RIGHT:
             self._x += 1
-            self._wall_body = self.get_wall_body()
+            self._update_geometry()
         elif self._direction == LEFT:
             self._x -= 1
-            self._wall_body = self.get_wall_body()
+            self._update_geometry()
 
 
 
@@ -52,33 +63,25 @@ class Wall:
         self._x = x
         self._y = y
         self._direction = direction
-        self._wall_body = self.get_wall_body()
+        self._update_geometry()
 
 
     def draw_cell(self, loc, gd):
         """draw a given cell if it is in the wall"""
-        if loc in self.get_wall_body():
+        if loc in self._wall_body:
             x, y = loc
             gd.draw_cell(x, y, self._color)
 
 
     def is_wall_out(self, len_x, len_y):
         """check if the wall is after agiven length or higth"""
-        for cell in self._wall_body:
-            x, y = cell
-            if self._direction == UP:
-                if y < len_y:
-                    return False
-            elif self._direction == DOWN:
-                if y >= 0:
-                    return False
-            elif self._direction == RIGHT:
-                if x < len_x:
-                    return False
-            elif self._direction == LEFT:
-                if x >= 0:
-                    return False
+        # the whole body is out once the cell furthest behind the edge is out
+        if self._direction == UP:
+            return self._y - 1 >= len_y
+        elif self._direction == DOWN:
+            return self._y + 1 < 0
+        elif self._direction == RIGHT:
+            return self._x - 1 >= len_x
+        elif self._direction == LEFT:
+            return self._x + 1 < 0
         return True
-
-
-